@@ -33,9 +33,10 @@ const config = {
   llmNumPredict: parseInt(process.env.LLM_NUM_PREDICT, 10) || 400,
 
   // Microservices
-  rerankerApiUrl: process.env.RERANKER_API_URL || 'http://reranker:8000',
+  rerankerApiUrl: process.env.RERANKER_API_URL || 'http://reranker:8001',
   llmApiUrl: process.env.LLM_API_URL || 'http://ollama:11434',
   llmModelName: process.env.LLM_MODEL_NAME || 'qwen2:7b-instruct',
+  adminToken: process.env.ADMIN_TOKEN || '',
 
   // URL Configuration
   backendExternalUrl: process.env.BACKEND_EXTERNAL_URL || '',
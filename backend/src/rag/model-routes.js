@@ -2,6 +2,7 @@ const express = require('express');
 const router = express.Router();
 const modelSwitcher = require('./model-switcher');
 const logger = require('../utils/logger');
+const { requireAdminToken } = require('../utils/admin');
 
 /**
  * GET /models - Get all available models and current selection
@@ -61,6 +62,52 @@ router.post('/models/switch', async (req, res) => {
   }
 });
 
+/**
+ * POST /models/:service/swap - Hot-swap the model of the embedder or reranker
+ * Header: X-Admin-Token (ADMIN_TOKEN)
+ * Body: { "model": "BAAI/bge-reranker-base", "engine": "sentence-transformers" }
+ */
+router.post('/models/:service/swap', requireAdminToken, async (req, res) => {
+  try {
+    const { model, engine } = req.body;
+    
+    if (!model) {
+      return res.status(400).json({
+        error: 'MISSING_MODEL',
+        message: 'Model name is required'
+      });
+    }
+    
+    const result = await modelSwitcher.switchServiceModel(req.params.service, model, engine);
+    res.status(202).json(result);
+    
+  } catch (error) {
+    logger.error(`[model-routes] Service model swap failed: ${error.message}`);
+    res.status(error.response?.status || 400).json({
+      error: 'MODEL_SWAP_FAILED',
+      message: error.response?.data?.detail || error.message
+    });
+  }
+});
+
+/**
+ * GET /models/:service/swap - Active model and last swap status of the embedder or reranker
+ * Header: X-Admin-Token (ADMIN_TOKEN)
+ */
+router.get('/models/:service/swap', requireAdminToken, async (req, res) => {
+  try {
+    const status = await modelSwitcher.getServiceModelStatus(req.params.service);
+    res.json(status);
+    
+  } catch (error) {
+    logger.error(`[model-routes] Service model status failed: ${error.message}`);
+    res.status(error.response?.status || 400).json({
+      error: 'MODEL_STATUS_FAILED',
+      message: error.response?.data?.detail || error.message
+    });
+  }
+});
+
 /**
  * POST /models/test - Test a specific model
  * Body: { "model": "phi3:mini", "prompt": "What is AI?" }
@@ -0,0 +1,87 @@
+const express = require('express');
+const config = require('../config');
+
+jest.mock('./model-switcher');
+const modelSwitcher = require('./model-switcher');
+const modelRoutes = require('./model-routes');
+
+describe('Service model swap routes', () => {
+  const originalToken = config.adminToken;
+  let server;
+  let baseUrl;
+
+  beforeAll((done) => {
+    const app = express();
+    app.use(express.json());
+    app.use('/api/rag', modelRoutes);
+    server = app.listen(0, () => {
+      baseUrl = `http://[::1]:${server.address().port}/api/rag`;
+      done();
+    });
+  });
+
+  afterAll((done) => {
+    config.adminToken = originalToken;
+    server.close(done);
+  });
+
+  beforeEach(() => {
+    jest.clearAllMocks();
+    config.adminToken = 'secret';
+    modelSwitcher.switchServiceModel.mockResolvedValue({ swapping: true });
+    modelSwitcher.getServiceModelStatus.mockResolvedValue({ model: 'current-model', swapping: false });
+  });
+
+  const swap = (headers = {}) => fetch(`${baseUrl}/models/reranker/swap`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', ...headers },
+    body: JSON.stringify({ model: 'new-model' })
+  });
+
+  test('should reject a swap without the admin token', async () => {
+    const response = await swap();
+
+    expect(response.status).toBe(401);
+    expect((await response.json()).error).toBe('UNAUTHORIZED');
+    expect(modelSwitcher.switchServiceModel).not.toHaveBeenCalled();
+  });
+
+  test('should reject a swap with a wrong admin token', async () => {
+    const response = await swap({ 'X-Admin-Token': 'wrong' });
+
+    expect(response.status).toBe(401);
+    expect(modelSwitcher.switchServiceModel).not.toHaveBeenCalled();
+  });
+
+  test('should reject the swap status without the admin token', async () => {
+    const response = await fetch(`${baseUrl}/models/embedder/swap`);
+
+    expect(response.status).toBe(401);
+    expect(modelSwitcher.getServiceModelStatus).not.toHaveBeenCalled();
+  });
+
+  test('should disable the swap routes when ADMIN_TOKEN is not set', async () => {
+    config.adminToken = '';
+
+    const response = await swap({ 'X-Admin-Token': '' });
+
+    expect(response.status).toBe(403);
+    expect((await response.json()).error).toBe('ADMIN_DISABLED');
+    expect(modelSwitcher.switchServiceModel).not.toHaveBeenCalled();
+  });
+
+  test('should start the swap with the admin token', async () => {
+    const response = await swap({ 'X-Admin-Token': 'secret' });
+
+    expect(response.status).toBe(202);
+    expect(await response.json()).toEqual({ swapping: true });
+    expect(modelSwitcher.switchServiceModel).toHaveBeenCalledWith('reranker', 'new-model', undefined);
+  });
+
+  test('should read the swap status with the admin token', async () => {
+    const response = await fetch(`${baseUrl}/models/embedder/swap`, { headers: { 'X-Admin-Token': 'secret' } });
+
+    expect(response.status).toBe(200);
+    expect((await response.json()).model).toBe('current-model');
+  });
+});
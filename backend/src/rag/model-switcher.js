@@ -70,6 +70,51 @@ function switchLLMModel(modelName) {
   };
 }
 
+// Python microservices whose local model can be hot-swapped through /admin/model
+const SERVICE_URLS = {
+  embedder: () => config.embedApiUrl,
+  reranker: () => config.rerankerApiUrl
+};
+
+function serviceRequest(service) {
+  if (!SERVICE_URLS[service]) {
+    throw new Error(`Unknown service ${service} (expected: ${Object.keys(SERVICE_URLS).join(', ')})`);
+  }
+  return {
+    url: `${SERVICE_URLS[service]()}/admin/model`,
+    options: {
+      timeout: 10000,
+      headers: config.adminToken ? { 'X-Admin-Token': config.adminToken } : {}
+    }
+  };
+}
+
+/**
+ * Ask the embedder or reranker to load a new model in the background and switch to it
+ * without downtime. Resolves as soon as the load has started (the service answers 202);
+ * follow progress with getServiceModelStatus().
+ */
+async function switchServiceModel(service, modelName, engine = null) {
+  const { url, options } = serviceRequest(service);
+  const body = { model_name: modelName };
+  if (engine) {
+    body.engine = engine;
+  }
+
+  const response = await axios.post(url, body, options);
+  logger.info(`[model-switcher] ${service} model swap started: ${modelName}`);
+  return response.data;
+}
+
+/**
+ * Active model of the embedder or reranker and state of its last swap (timings, memory)
+ */
+async function getServiceModelStatus(service) {
+  const { url, options } = serviceRequest(service);
+  const response = await axios.get(url, options);
+  return response.data;
+}
+
 /**
  * Get current active models
  */
@@ -175,6 +220,8 @@ async function compareModels(prompt, models = null) {
 module.exports = {
   getAvailableModels,
   switchLLMModel,
+  switchServiceModel,
+  getServiceModelStatus,
   getCurrentModels,
   testModel,
   generateWithCurrentModel,
@@ -0,0 +1,63 @@
+const config = require('../config');
+
+jest.mock('axios');
+const axios = require('axios');
+
+const { switchServiceModel, getServiceModelStatus } = require('./model-switcher');
+
+describe('Service model hot-swap', () => {
+  const originalToken = config.adminToken;
+
+  beforeEach(() => {
+    jest.clearAllMocks();
+    config.adminToken = '';
+  });
+
+  afterAll(() => {
+    config.adminToken = originalToken;
+  });
+
+  test('should start a reranker swap through /admin/model', async () => {
+    axios.post.mockResolvedValue({
+      data: { model: 'old-model', swapping: true, last_swap: { state: 'loading' } }
+    });
+
+    const result = await switchServiceModel('reranker', 'new-model');
+
+    expect(result.swapping).toBe(true);
+    expect(axios.post).toHaveBeenCalledWith(
+      `${config.rerankerApiUrl}/admin/model`,
+      { model_name: 'new-model' },
+      expect.objectContaining({ headers: {} })
+    );
+  });
+
+  test('should forward the engine and the admin token', async () => {
+    config.adminToken = 'secret';
+    axios.post.mockResolvedValue({ data: { swapping: true } });
+
+    await switchServiceModel('embedder', 'new-model', 'ollama');
+
+    expect(axios.post).toHaveBeenCalledWith(
+      `${config.embedApiUrl}/admin/model`,
+      { model_name: 'new-model', engine: 'ollama' },
+      expect.objectContaining({ headers: { 'X-Admin-Token': 'secret' } })
+    );
+  });
+
+  test('should read the swap status', async () => {
+    axios.get.mockResolvedValue({
+      data: { model: 'new-model', swapping: false, last_swap: { state: 'done', load_s: 4.2 } }
+    });
+
+    const status = await getServiceModelStatus('embedder');
+
+    expect(status.last_swap.state).toBe('done');
+    expect(axios.get.mock.calls[0][0]).toBe(`${config.embedApiUrl}/admin/model`);
+  });
+
+  test('should reject unknown services', async () => {
+    await expect(switchServiceModel('ollama', 'new-model')).rejects.toThrow('Unknown service ollama');
+    expect(axios.post).not.toHaveBeenCalled();
+  });
+});
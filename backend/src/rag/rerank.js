@@ -6,9 +6,10 @@ const logger = require('../utils/logger');
  * Réordonne les candidats selon leur pertinence par rapport à la requête
  * @param {string} query - La requête utilisateur
  * @param {Array} candidates - Liste des candidats à réordonner
+ * @param {number[]|null} queryVector - Embedding de la requête, transmis pour le cache sémantique du reranker
  * @returns {Promise<Array>} - Candidats réordonnés avec scores
  */
-async function rerank(query, candidates) {
+async function rerank(query, candidates, queryVector = null) {
   if (!query || !query.trim()) {
     throw new Error('Query cannot be empty');
   }
@@ -72,14 +73,19 @@ async function rerank(query, candidates) {
     });
 
     // Appel au microservice reranker
-    const response = await axios.post(`${config.rerankerApiUrl}/rerank`, {
+    const payload = {
       query: query.trim(),
       candidates: candidateTexts
-    }, {
+    };
+    if (Array.isArray(queryVector) && queryVector.length > 0) {
+      payload.query_vector = queryVector;
+    }
+
+    const response = await axios.post(`${config.rerankerApiUrl}/rerank`, payload, {
       timeout: config.rerankerTimeoutMs
     });
 
-    const { scores, processing_time_ms, model } = response.data;
+    const { scores, processing_time_ms, model, semantic_cache_similarity } = response.data;
 
     if (!scores || !Array.isArray(scores) || scores.length !== candidates.length) {
       throw new Error(`Réponse reranker invalide: ${scores?.length} scores pour ${candidates.length} candidats`);
@@ -106,6 +112,9 @@ async function rerank(query, candidates) {
     
     logger.info(`[rag/rerank] Réordonnancement terminé en ${processingTime}ms (reranker: ${processing_time_ms}ms)`);
     logger.info(`[rag/rerank] Modèle utilisé: ${model}`);
+    if (semantic_cache_similarity !== undefined && semantic_cache_similarity !== null) {
+      logger.info(`[rag/rerank] Scores issus du cache sémantique (similarité ${semantic_cache_similarity.toFixed(4)})`);
+    }
     logger.info(`[rag/rerank] Scores rerank: min=${Math.min(...rerankScores).toFixed(4)}, max=${Math.max(...rerankScores).toFixed(4)}, avg=${(rerankScores.reduce((a, b) => a + b, 0) / rerankScores.length).toFixed(4)}`);
     logger.info(`[rag/rerank] Scores finaux: min=${Math.min(...finalScores).toFixed(4)}, max=${Math.max(...finalScores).toFixed(4)}, avg=${(finalScores.reduce((a, b) => a + b, 0) / finalScores.length).toFixed(4)}`);
 
@@ -110,6 +110,28 @@ describe('Reranking with Environment Limits', () => {
     expect(result[1].text).toBe('Second candidate');
   });
 
+  test('should forward the query embedding for the semantic cache', async () => {
+    const candidates = [
+      { text: 'First candidate', score_cosine: 0.8 },
+      { text: 'Second candidate', score_cosine: 0.6 }
+    ];
+
+    axios.post.mockResolvedValue({
+      data: {
+        scores: [0.7, 0.3],
+        processing_time_ms: 0,
+        model: 'test-model',
+        semantic_cache_similarity: 0.97
+      }
+    });
+
+    await rerank('test query', candidates, [0.1, 0.2, 0.3]);
+    expect(axios.post.mock.calls[0][1].query_vector).toEqual([0.1, 0.2, 0.3]);
+
+    await rerank('test query', candidates);
+    expect(axios.post.mock.calls[1][1]).not.toHaveProperty('query_vector');
+  });
+
   test('should fallback to cosine scores on reranker error', async () => {
     const candidates = [
       { text: 'First candidate', score_cosine: 0.8 },
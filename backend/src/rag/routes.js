@@ -174,7 +174,7 @@ router.post('/answer', async (req, res) => {
     }
 
     // 2. Réordonnancement des candidats
-    const rerankedCandidates = await rerank(query.trim(), retrievedCandidates);
+    const rerankedCandidates = await rerank(query.trim(), retrievedCandidates, retrievalResult.embedding.vector);
     
     // 3. Sélection des meilleurs candidats pour le contexte
     const selectedCandidates = selectTopCandidates(rerankedCandidates, 8);
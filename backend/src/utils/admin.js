@@ -0,0 +1,28 @@
+const crypto = require('crypto');
+const config = require('../config');
+
+/**
+ * Express middleware for admin routes: the caller must send an X-Admin-Token header
+ * equal to ADMIN_TOKEN. When ADMIN_TOKEN is not set, admin routes are disabled.
+ */
+function requireAdminToken(req, res, next) {
+  if (!config.adminToken) {
+    return res.status(403).json({
+      error: 'ADMIN_DISABLED',
+      message: 'Admin routes are disabled (ADMIN_TOKEN is not set)'
+    });
+  }
+
+  const expected = Buffer.from(config.adminToken);
+  const given = Buffer.from(req.get('x-admin-token') || '');
+  if (given.length !== expected.length || !crypto.timingSafeEqual(given, expected)) {
+    return res.status(401).json({
+      error: 'UNAUTHORIZED',
+      message: 'Missing or invalid X-Admin-Token header'
+    });
+  }
+
+  next();
+}
+
+module.exports = { requireAdminToken };
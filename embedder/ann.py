@@ -0,0 +1,562 @@
+"""
+Index vectoriel approximatif (IVF-PQ) co-localisé avec l'embedder
+
+Chaque index est un répertoire de fichiers mappés en mémoire, étendus par ajout:
+  vectors.f32   vecteurs normalisés (float32), utilisés pour le re-scoring exact
+  codes.u8      codes PQ (pq_m octets par élément), après entraînement
+  lists.i32     liste inversée (centroïde IVF) de chaque élément, après entraînement
+  alive.u8      1 si l'élément est actif, 0 s'il a été remplacé ou supprimé
+  ids.txt       identifiant externe de chaque élément, un par ligne
+  meta.json, centroids.npy, codebooks.npy: paramètres et quantificateurs entraînés
+
+Tant que l'index compte moins de `train_size` éléments actifs, la recherche est exacte.
+Au-delà, les quantificateurs sont entraînés; la recherche sonde alors les `nprobe` listes
+les plus proches, classe leurs éléments par produit scalaire asymétrique (requête exacte
+contre codes PQ) puis re-score exactement les `rerank` meilleurs.
+
+La maintenance tourne en arrière-plan, jamais dans l'appel qui ajoute ou supprime:
+  - entraînement quand l'index atteint `train_size` éléments actifs, puis ré-entraînement
+    quand il dépasse `retrain_factor` fois la taille sur laquelle il a été entraîné
+  - compactage (suppression des lignes remplacées ou supprimées) quand elles dépassent
+    la proportion `compact_ratio` des lignes
+Les fichiers compactés sont écrits dans compact.tmp/, renommé compact/ une fois complet,
+puis déplacés dans l'index: une interruption est terminée ou annulée à la réouverture.
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+KMEANS_ITERATIONS = 12
+MAX_TRAIN_SAMPLES = 50000
+ENCODE_CHUNK = 65536
+
+
+class _RowFile:
+    """Fichier binaire de lignes de largeur fixe, étendu par ajout et lu via np.memmap"""
+
+    def __init__(self, path: str, dtype, width: int, rows: int):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.width = width
+        # Ignorer une éventuelle écriture interrompue au-delà du nombre de lignes validé
+        expected = rows * width * self.dtype.itemsize
+        if os.path.exists(path) and os.path.getsize(path) > expected:
+            os.truncate(path, expected)
+        self.array = self._map()
+
+    def _map(self) -> np.ndarray:
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return np.empty((0, self.width), dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode='r+').reshape(-1, self.width)
+
+    def append(self, rows: np.ndarray):
+        rows = np.ascontiguousarray(rows, dtype=self.dtype).reshape(-1, self.width)
+        with open(self.path, 'ab') as f:
+            f.write(rows.tobytes())
+        self.array = self._map()
+
+    def flush(self):
+        if isinstance(self.array, np.memmap):
+            self.array.flush()
+
+
+def _nearest(data: np.ndarray, centroids: np.ndarray, chunk: int = 8192) -> np.ndarray:
+    """Indice du centroïde le plus proche (L2) de chaque ligne de `data`"""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    assign = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), chunk):
+        block = data[start:start + chunk]
+        assign[start:start + chunk] = np.argmin(centroid_norms - 2 * block @ centroids.T, axis=1)
+    return assign
+
+
+def _kmeans(data: np.ndarray, k: int, rng: np.random.Generator, iterations: int = KMEANS_ITERATIONS) -> np.ndarray:
+    """k-means de Lloyd; les clusters vides sont réinitialisés sur des points tirés au hasard"""
+    centroids = data[rng.choice(len(data), k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assign = _nearest(data, centroids)
+        counts = np.bincount(assign, minlength=k)
+        order = np.argsort(assign, kind='stable')
+        starts = np.searchsorted(assign[order], np.arange(k))
+        nonempty = counts > 0
+        centroids[nonempty] = np.add.reduceat(data[order], starts[nonempty]) / counts[nonempty, None]
+        empty = np.flatnonzero(~nonempty)
+        if empty.size:
+            centroids[empty] = data[rng.choice(len(data), empty.size, replace=False)]
+    return centroids
+
+
+def _encode(vectors: np.ndarray, centroids: np.ndarray, codebooks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Liste IVF et codes PQ (sur le résidu par rapport au centroïde) de chaque vecteur"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    lists = _nearest(vectors, centroids)
+    residuals = vectors - centroids[lists]
+    pq_m, _, sub_dim = codebooks.shape
+    codes = np.empty((len(vectors), pq_m), dtype=np.uint8)
+    for j in range(pq_m):
+        codes[:, j] = _nearest(residuals[:, j * sub_dim:(j + 1) * sub_dim], codebooks[j])
+    return lists, codes
+
+
+def _write_rows(path: str, array: np.ndarray, rows: np.ndarray, mode: str = 'wb'):
+    """Écrit les lignes `rows` de `array` dans `path`, par blocs pour borner la mémoire"""
+    with open(path, mode) as f:
+        for start in range(0, len(rows), ENCODE_CHUNK):
+            f.write(np.ascontiguousarray(array[rows[start:start + ENCODE_CHUNK]]).tobytes())
+
+
+def default_pq_m(dim: int) -> int:
+    """Nombre de sous-espaces PQ par défaut: sous-vecteurs de 16 dimensions (ou du plus grand diviseur <= 16)"""
+    for sub_dim in (16, 8, 4, 2, 1):
+        if dim % sub_dim == 0:
+            return dim // sub_dim
+    return dim
+
+
+class VectorIndex:
+    """Index IVF-PQ persistant, mis à jour par upsert/suppression d'éléments identifiés"""
+
+    def __init__(self, directory: str, dim: Optional[int] = None, model: Optional[str] = None,
+                 train_size: int = 2048, nlist: int = 0, pq_m: int = 0,
+                 retrain_factor: float = 2.0, compact_ratio: float = 0.3, background: bool = True):
+        self.directory = directory
+        self.name = os.path.basename(directory.rstrip('/'))
+        self.retrain_factor = retrain_factor
+        self.compact_ratio = compact_ratio
+        self.background = background
+        self._lock = threading.RLock()
+        self._maintenance_lock = threading.Lock()
+        self._maintenance_thread: Optional[threading.Thread] = None
+        self.maintenance: Dict[str, Any] = {"state": "idle"}
+        os.makedirs(directory, exist_ok=True)
+        self._finish_compaction()
+
+        meta_path = self._path('meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+        else:
+            if dim is None:
+                raise ValueError(f"Index {self.name} inexistant: dimension requise pour le créer")
+            self.meta = {
+                "dim": dim,
+                "model": model,
+                "count": 0,
+                "train_size": train_size,
+                "nlist": nlist,
+                "pq_m": pq_m or default_pq_m(dim),
+                "trained": False,
+                "trained_rows": 0
+            }
+            if dim % self.meta["pq_m"]:
+                raise ValueError(f"pq_m={self.meta['pq_m']} doit diviser la dimension {dim}")
+            self._save_meta()
+
+        self._open_files()
+        # Index antérieur au ré-entraînement: entraîné sur ses éléments actifs à l'ouverture
+        self.meta.setdefault("trained_rows", len(self.rows) if self.trained else 0)
+
+    def _open_files(self):
+        """(Ré)ouvre les fichiers de lignes et reconstruit les structures en mémoire depuis meta"""
+        count = self.meta["count"]
+        self.vectors = _RowFile(self._path('vectors.f32'), np.float32, self.dim, count)
+        self.alive = _RowFile(self._path('alive.u8'), np.uint8, 1, count)
+        self.codes = _RowFile(self._path('codes.u8'), np.uint8, self.meta["pq_m"], count if self.trained else 0)
+        self.lists = _RowFile(self._path('lists.i32'), np.int32, 1, count if self.trained else 0)
+
+        with open(self._path('ids.txt'), 'a+') as f:
+            f.seek(0)
+            self.ids = f.read().split('\n')[:count]
+        if len(self.ids) < count:
+            raise ValueError(f"Index {self.name} corrompu: {len(self.ids)} identifiants pour {count} vecteurs")
+        # Réécrire ids.txt s'il contenait une ligne partielle
+        self._write_ids()
+
+        alive = self.alive.array[:, 0]
+        self.rows = {self.ids[row]: row for row in np.flatnonzero(alive)}
+
+        self.centroids = None
+        self.codebooks = None
+        self._list_rows: List[np.ndarray] = []
+        if self.trained:
+            self.centroids = np.load(self._path('centroids.npy'))
+            self.codebooks = np.load(self._path('codebooks.npy'))
+            self._build_inverted_lists()
+
+    def _finish_compaction(self):
+        """Termine un compactage interrompu après son point de validation, annule les autres"""
+        shutil.rmtree(self._path('compact.tmp'), ignore_errors=True)
+        compact_dir = self._path('compact')
+        if os.path.isdir(compact_dir):
+            for filename in os.listdir(compact_dir):
+                os.replace(os.path.join(compact_dir, filename), self._path(filename))
+            os.rmdir(compact_dir)
+
+    @property
+    def dim(self) -> int:
+        return self.meta["dim"]
+
+    @property
+    def model(self) -> Optional[str]:
+        return self.meta["model"]
+
+    @property
+    def trained(self) -> bool:
+        return self.meta["trained"]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    def _save_meta(self):
+        tmp_path = self._path('meta.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, self._path('meta.json'))
+
+    def _write_ids(self):
+        with open(self._path('ids.txt'), 'w') as f:
+            f.write(''.join(item_id + '\n' for item_id in self.ids))
+
+    def _build_inverted_lists(self):
+        lists = self.lists.array[:, 0]
+        order = np.argsort(lists, kind='stable')
+        bounds = np.searchsorted(lists[order], np.arange(len(self.centroids) + 1))
+        self._list_rows = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+
+    def upsert(self, ids: Sequence[str], vectors: np.ndarray) -> Dict[str, Any]:
+        """Ajoute ou remplace des éléments; planifie l'entraînement ou le compactage s'il est dû"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise ValueError(f"Dimension attendue {self.dim}, reçue {vectors.shape[-1]}")
+        if len(ids) != len(vectors):
+            raise ValueError("Autant d'identifiants que de vecteurs attendus")
+        if any('\n' in item_id for item_id in ids):
+            raise ValueError("Identifiant invalide (retour à la ligne)")
+
+        # En cas de doublon dans le lot, la dernière occurrence l'emporte
+        last = {item_id: i for i, item_id in enumerate(ids)}
+        keep = sorted(last.values())
+        ids = [ids[i] for i in keep]
+        vectors = vectors[keep]
+
+        with self._lock:
+            replaced = 0
+            for item_id in ids:
+                old_row = self.rows.get(item_id)
+                if old_row is not None:
+                    self.alive.array[old_row, 0] = 0
+                    replaced += 1
+
+            start = self.meta["count"]
+            new_rows = np.arange(start, start + len(ids))
+            self.vectors.append(vectors)
+            self.alive.append(np.ones(len(ids), dtype=np.uint8))
+            with open(self._path('ids.txt'), 'a') as f:
+                f.write(''.join(item_id + '\n' for item_id in ids))
+            self.ids.extend(ids)
+            self.rows.update(zip(ids, new_rows.tolist()))
+
+            if self.trained:
+                self._encode_append(vectors, new_rows)
+
+            self.alive.flush()
+            self.meta["count"] = start + len(ids)
+            self._save_meta()
+            maintenance = self._schedule_maintenance()
+
+        return {"added": len(ids) - replaced, "replaced": replaced, "maintenance": maintenance}
+
+    def remove(self, ids: Sequence[str]) -> int:
+        """Désactive des éléments; retourne le nombre d'éléments effectivement supprimés"""
+        with self._lock:
+            removed = 0
+            for item_id in ids:
+                row = self.rows.pop(item_id, None)
+                if row is not None:
+                    self.alive.array[row, 0] = 0
+                    removed += 1
+            self.alive.flush()
+            self._schedule_maintenance()
+        return removed
+
+    def _encode_append(self, vectors: np.ndarray, rows: np.ndarray):
+        lists, codes = _encode(vectors, self.centroids, self.codebooks)
+        self.lists.append(lists)
+        self.codes.append(codes)
+        for list_id in np.unique(lists):
+            self._list_rows[list_id] = np.concatenate([self._list_rows[list_id], rows[lists == list_id]])
+
+    def maintenance_due(self) -> Optional[str]:
+        """Maintenance à lancer: 'train' (premier entraînement, ou index devenu `retrain_factor`
+        fois plus grand que lors de son entraînement), 'compact' (trop de lignes mortes) ou None"""
+        with self._lock:
+            items = len(self.rows)
+            if not self.trained:
+                if items >= self.meta["train_size"]:
+                    return 'train'
+            elif self.retrain_factor > 0 and items > self.retrain_factor * max(self.meta["trained_rows"], 1):
+                return 'train'
+
+            dead = self.meta["count"] - items
+            if self.compact_ratio > 0 and dead > 0 and dead >= self.compact_ratio * self.meta["count"]:
+                return 'compact'
+            return None
+
+    def _schedule_maintenance(self) -> Optional[str]:
+        if not self.background:
+            return None
+        operation = self.maintenance_due()
+        if operation is not None:
+            self.start_maintenance(operation)
+        return operation
+
+    def start_maintenance(self, operation: str = 'train') -> bool:
+        """Lance `operation` ('train' ou 'compact') en arrière-plan, puis les maintenances
+        devenues dues entre-temps; False si une maintenance est déjà en cours"""
+        with self._lock:
+            if self._maintenance_thread is not None and self._maintenance_thread.is_alive():
+                return False
+            self._maintenance_thread = threading.Thread(
+                target=self._maintenance_loop,
+                args=(operation,),
+                name=f"index-{self.name}",
+                daemon=True
+            )
+            self._maintenance_thread.start()
+            return True
+
+    def _maintenance_loop(self, operation: Optional[str]):
+        while operation is not None:
+            self.maintenance = {"state": "running", "operation": operation, "started_at": time.time()}
+            try:
+                self.rebuild(retrain=operation == 'train')
+            except Exception as e:
+                logger.error(f"Maintenance de l'index {self.name} ({operation}) en échec: {e}")
+                self.maintenance = {"state": "failed", "operation": operation, "error": str(e), "finished_at": time.time()}
+                return
+            self.maintenance = {"state": "idle", "operation": operation, "finished_at": time.time()}
+            operation = self.maintenance_due()
+
+    def wait_maintenance(self, timeout: Optional[float] = None):
+        """Attend la fin de la maintenance en arrière-plan en cours, s'il y en a une"""
+        thread = self._maintenance_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _train_quantizers(self, vectors: np.ndarray, rows: np.ndarray, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        """Centroïdes IVF et dictionnaires PQ appris sur un échantillon des lignes `rows`
+
+        meta['nlist'] à 0 dimensionne les listes sur la taille courante à chaque entraînement.
+        """
+        sample_rows = np.sort(rng.choice(rows, min(len(rows), MAX_TRAIN_SAMPLES), replace=False))
+        sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+
+        nlist = self.meta["nlist"] or int(max(1, min(4 * np.sqrt(len(rows)), len(sample) // 39)))
+        nlist = min(nlist, len(sample))
+        centroids = _kmeans(sample, nlist, rng)
+
+        residuals = sample - centroids[_nearest(sample, centroids)]
+        pq_m = self.meta["pq_m"]
+        sub_dim = self.dim // pq_m
+        ksub = min(256, len(sample))
+        codebooks = np.stack([
+            _kmeans(np.ascontiguousarray(residuals[:, j * sub_dim:(j + 1) * sub_dim]), ksub, rng)
+            for j in range(pq_m)
+        ])
+        return centroids, codebooks
+
+    def rebuild(self, retrain: bool = True, seed: int = 0) -> Dict[str, Any]:
+        """Compacte l'index (seuls les éléments actifs sont conservés) et, avec `retrain`,
+        ré-entraîne les quantificateurs sur ces éléments
+
+        Les fichiers n'étant modifiés que par ajout en dehors de la maintenance, l'entraînement,
+        l'encodage et l'écriture portent sur un instantané hors verrou: recherches et mises à
+        jour continuent. Seuls les éléments ajoutés entre-temps sont traités sous le verrou, à la
+        bascule; ceux supprimés entre-temps restent des lignes mortes jusqu'au prochain compactage.
+        """
+        with self._maintenance_lock:
+            start_time = time.time()
+            with self._lock:
+                snapshot_count = self.meta["count"]
+                snapshot_rows = np.flatnonzero(self.alive.array[:snapshot_count, 0])
+                vectors, codes, lists = self.vectors.array, self.codes.array, self.lists.array
+                centroids, codebooks = self.centroids, self.codebooks
+            if retrain and len(snapshot_rows) == 0:
+                raise ValueError(f"Index {self.name} vide: rien à entraîner")
+
+            trained = retrain or centroids is not None
+            if retrain:
+                centroids, codebooks = self._train_quantizers(vectors, snapshot_rows, np.random.default_rng(seed))
+
+            tmp_dir = self._path('compact.tmp')
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+
+            def tmp_path(filename: str) -> str:
+                return os.path.join(tmp_dir, filename)
+
+            _write_rows(tmp_path('vectors.f32'), vectors, snapshot_rows)
+            if trained:
+                with open(tmp_path('lists.i32'), 'wb') as lists_file, open(tmp_path('codes.u8'), 'wb') as codes_file:
+                    for start in range(0, len(snapshot_rows), ENCODE_CHUNK):
+                        block = snapshot_rows[start:start + ENCODE_CHUNK]
+                        if retrain:
+                            block_lists, block_codes = _encode(vectors[block], centroids, codebooks)
+                        else:
+                            block_lists, block_codes = lists[block, 0], codes[block]
+                        lists_file.write(np.ascontiguousarray(block_lists, dtype=np.int32).tobytes())
+                        codes_file.write(np.ascontiguousarray(block_codes, dtype=np.uint8).tobytes())
+                np.save(tmp_path('centroids.npy'), centroids)
+                np.save(tmp_path('codebooks.npy'), codebooks)
+
+            with self._lock:
+                # Éléments ajoutés pendant la maintenance, encodés avec les nouveaux quantificateurs
+                count = self.meta["count"]
+                new_rows = np.arange(snapshot_count, count)
+                kept_rows = np.concatenate([snapshot_rows, new_rows])
+                if len(new_rows):
+                    _write_rows(tmp_path('vectors.f32'), self.vectors.array, new_rows, mode='ab')
+                    if trained:
+                        new_lists, new_codes = _encode(self.vectors.array[new_rows], centroids, codebooks)
+                        with open(tmp_path('lists.i32'), 'ab') as f:
+                            f.write(np.ascontiguousarray(new_lists, dtype=np.int32).tobytes())
+                        with open(tmp_path('codes.u8'), 'ab') as f:
+                            f.write(np.ascontiguousarray(new_codes, dtype=np.uint8).tobytes())
+
+                _write_rows(tmp_path('alive.u8'), self.alive.array, kept_rows)
+                with open(tmp_path('ids.txt'), 'w') as f:
+                    f.write(''.join(self.ids[row] + '\n' for row in kept_rows))
+
+                meta = dict(self.meta, count=len(kept_rows), trained=trained)
+                if retrain:
+                    meta["trained_rows"] = len(snapshot_rows)
+                with open(tmp_path('meta.json'), 'w') as f:
+                    json.dump(meta, f)
+
+                # Point de validation: compact/ complet est repris à la réouverture en cas d'arrêt
+                os.replace(tmp_dir, self._path('compact'))
+                self._finish_compaction()
+                self.meta = meta
+                self._open_files()
+
+            dropped = count - len(kept_rows)
+            logger.info(
+                f"Index {self.name} {'ré-entraîné et ' if retrain else ''}compacté en {time.time() - start_time:.2f}s: "
+                f"{len(self.rows)} éléments, {dropped} lignes mortes retirées, nlist={len(centroids) if trained else 0}"
+            )
+            return {"retrained": retrain, "rows": len(kept_rows), "dropped": dropped}
+
+    def search(self, query: np.ndarray, k: int, nprobe: int = 8, rerank: int = 256) -> Tuple[List[str], List[float], bool]:
+        """Top-k (identifiants, produits scalaires); le booléen indique une recherche exacte"""
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        with self._lock:
+            count = self.meta["count"]
+            vectors = self.vectors.array[:count]
+            alive = self.alive.array[:count, 0].astype(bool)
+
+            if not self.trained:
+                candidates = np.flatnonzero(alive)
+                exact = True
+            else:
+                coarse = self.centroids @ query
+                probed = np.argsort(-coarse)[:nprobe]
+                candidates = np.concatenate([self._list_rows[list_id] for list_id in probed])
+                candidates = candidates[alive[candidates]]
+                exact = False
+
+                if len(candidates) > max(rerank, k):
+                    # Produit scalaire asymétrique: <q, c> + somme des <q_j, dictionnaire_j[code_j]>
+                    pq_m, _, sub_dim = self.codebooks.shape
+                    table = np.einsum('jkd,jd->jk', self.codebooks, query.reshape(pq_m, sub_dim))
+                    approx = coarse[self.lists.array[candidates, 0]] + table[np.arange(pq_m), self.codes.array[candidates]].sum(axis=1)
+                    candidates = candidates[np.argpartition(-approx, max(rerank, k) - 1)[:max(rerank, k)]]
+
+            if len(candidates) == 0:
+                return [], [], exact
+
+            candidates = np.sort(candidates)
+            scores = vectors[candidates] @ query
+            top = np.argsort(-scores, kind='stable')[:k]
+            return [self.ids[row] for row in candidates[top]], scores[top].tolist(), exact
+
+    def stats(self) -> Dict[str, Any]:
+        count = self.meta["count"]
+        disk_bytes = sum(
+            os.path.getsize(self._path(filename))
+            for filename in os.listdir(self.directory)
+            if os.path.isfile(self._path(filename))
+        )
+        return {
+            "name": self.name,
+            "model": self.model,
+            "dim": self.dim,
+            "items": len(self.rows),
+            "rows": count,
+            "dead_rows": count - len(self.rows),
+            "trained": self.trained,
+            "trained_rows": self.meta["trained_rows"],
+            "train_size": self.meta["train_size"],
+            "nlist": len(self.centroids) if self.trained else self.meta["nlist"],
+            "pq_m": self.meta["pq_m"],
+            "disk_bytes": disk_bytes,
+            "maintenance": self.maintenance
+        }
+
+
+class IndexRegistry:
+    """Index nommés sous un répertoire racine, ouverts à la demande"""
+
+    NAME_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+    def __init__(self, root: str, train_size: int = 2048, nlist: int = 0, pq_m: int = 0,
+                 retrain_factor: float = 2.0, compact_ratio: float = 0.3):
+        self.root = root
+        self.train_size = train_size
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.retrain_factor = retrain_factor
+        self.compact_ratio = compact_ratio
+        self._indexes: Dict[str, VectorIndex] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def get(self, name: str, create: bool = False, dim: Optional[int] = None, model: Optional[str] = None) -> Optional[VectorIndex]:
+        if not self.NAME_PATTERN.match(name):
+            raise ValueError(f"Nom d'index invalide: {name}")
+
+        with self._lock:
+            index = self._indexes.get(name)
+            if index is None:
+                directory = os.path.join(self.root, name)
+                if not create and not os.path.exists(os.path.join(directory, 'meta.json')):
+                    return None
+                index = VectorIndex(
+                    directory, dim=dim, model=model, train_size=self.train_size, nlist=self.nlist, pq_m=self.pq_m,
+                    retrain_factor=self.retrain_factor, compact_ratio=self.compact_ratio
+                )
+                # Maintenance due à l'ouverture (paramètres modifiés, arrêt pendant une maintenance)
+                index._schedule_maintenance()
+                self._indexes[name] = index
+            return index
+
+    def names(self) -> List[str]:
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, 'meta.json'))
+        )
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [self.get(name).stats() for name in self.names()]
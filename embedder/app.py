@@ -1,49 +1,90 @@
 #!/usr/bin/env python3
 """
-Microservice d'embeddings réels pour Regalica Notebook
-Utilise sentence-transformers pour générer des embeddings locaux
+Microservice d'embeddings pour Regalica Notebook
+Serveur commun (validation, ordonnancement en batches, cache, métriques, profilage)
+au-dessus d'un moteur interchangeable choisi par EMBED_ENGINE:
+sentence-transformers (défaut, modèle local), ollama ou mock
+Index vectoriel optionnel (ANN_ENABLED) pour rechercher les chunks sans passer par la base
 """
 
 import os
 import time
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import numpy as np
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Depends, Response
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 import uvicorn
-from sentence_transformers import SentenceTransformer
+
+from ann import IndexRegistry
+from autotune import CHUNK_MEDIAN_WORDS, QUERY_MEDIAN_WORDS, EngineTuning, synthetic_texts
+from cache import LRUCache, text_key
+from engines import ENGINES, EngineUnavailable, create_engine
+from hotswap import EngineSlot
+from metrics import ServiceMetrics
+from profiling import PROFILE_MODES, ProfileCapture, StageTimer, timed_json_response
+from scheduler import BatchScheduler
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Configuration
-EMBED_MODEL_NAME = os.getenv('EMBED_MODEL_NAME', 'intfloat/multilingual-e5-large')
+EMBED_ENGINE = os.getenv('EMBED_ENGINE', 'sentence-transformers')
+EMBED_MODEL_NAME = os.getenv('EMBED_MODEL_NAME', '')  # vide: modèle par défaut du moteur
 HOST = os.getenv('HOST', '0.0.0.0')
 PORT = int(os.getenv('PORT', 8000))
-
-# Modèles supportés avec leurs dimensions
-SUPPORTED_MODELS = {
-    'intfloat/multilingual-e5-large': 1024,
-    'nomic-ai/nomic-embed-text-v1.5': 768,
-    'sentence-transformers/all-MiniLM-L6-v2': 384,
-    'intfloat/e5-large-v2': 1024
-}
+MAX_TEXTS = 100
+EMBED_CACHE_SIZE = int(os.getenv('EMBED_CACHE_SIZE', 10000))
+SCHEDULER_MAX_BATCH = int(os.getenv('SCHEDULER_MAX_BATCH', 128))
+SCHEDULER_MAX_WAIT_MS = float(os.getenv('SCHEDULER_MAX_WAIT_MS', 0))
+SCHEDULER_WORKERS = int(os.getenv('SCHEDULER_WORKERS', 1))
+AUTOTUNE = os.getenv('AUTOTUNE', 'off').lower()  # off | auto (profil enregistré, sinon calibration) | force
+AUTOTUNE_DIR = os.getenv('AUTOTUNE_DIR', '/root/.cache/regalica-autotune')
+AUTOTUNE_LATENCY_MS = float(os.getenv('AUTOTUNE_LATENCY_MS', 1000))  # cible p95 d'un appel au moteur
+AUTOTUNE_TRIAL_S = float(os.getenv('AUTOTUNE_TRIAL_S', 2))
+AUTOTUNE_CALL_ITEMS = int(os.getenv('AUTOTUNE_CALL_ITEMS', 32))
+AUTOTUNE_BATCH_SIZES = [int(size) for size in os.getenv('AUTOTUNE_BATCH_SIZES', '8,16,32,64').split(',') if size.strip()]
+AUTOTUNE_COMPILE_MODES = [mode.strip() for mode in os.getenv('AUTOTUNE_COMPILE_MODES', '').split(',') if mode.strip()]
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'false').lower() == 'true'
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+SWAP_DRAIN_WARNING_S = float(os.getenv('SWAP_DRAIN_WARNING_S', 60))
+SWAP_LOADER_NICE = int(os.getenv('SWAP_LOADER_NICE', 10))
+ANN_ENABLED = os.getenv('ANN_ENABLED', 'false').lower() == 'true'
+ANN_DIR = os.getenv('ANN_DIR', '/root/.cache/regalica-ann')
+ANN_TRAIN_SIZE = int(os.getenv('ANN_TRAIN_SIZE', 2048))
+ANN_RETRAIN_FACTOR = float(os.getenv('ANN_RETRAIN_FACTOR', 2))  # ré-entraînement quand l'index a grossi de ce facteur (0: jamais)
+ANN_COMPACT_RATIO = float(os.getenv('ANN_COMPACT_RATIO', 0.3))  # compactage au-delà de cette part de lignes mortes (0: jamais)
+ANN_NLIST = int(os.getenv('ANN_NLIST', 0))  # 0: 4 * sqrt(n) à l'entraînement
+ANN_PQ_M = int(os.getenv('ANN_PQ_M', 0))  # 0: sous-vecteurs de 16 dimensions
+ANN_NPROBE = int(os.getenv('ANN_NPROBE', 8))
+ANN_RERANK = int(os.getenv('ANN_RERANK', 256))
+SEARCH_MAX_K = 200
 
 # Application FastAPI
 app = FastAPI(
     title="Regalica Embedder",
-    description="Microservice de génération d'embeddings réels",
+    description="Microservice de génération d'embeddings",
     version="1.0.0"
 )
 
-# Variable globale pour le modèle
-model = None
-model_dim = None
+# Moteur actif (remplaçable à chaud) et couches partagées par tous les moteurs
+slot = EngineSlot(drain_warning_s=SWAP_DRAIN_WARNING_S, loader_nice=SWAP_LOADER_NICE)
+profiler = ProfileCapture()
+metrics = ServiceMetrics()
+cache = LRUCache(EMBED_CACHE_SIZE)
+indexes = IndexRegistry(
+    ANN_DIR, train_size=ANN_TRAIN_SIZE, nlist=ANN_NLIST, pq_m=ANN_PQ_M,
+    retrain_factor=ANN_RETRAIN_FACTOR, compact_ratio=ANN_COMPACT_RATIO
+) if ANN_ENABLED else None
+tuning = EngineTuning(AUTOTUNE, AUTOTUNE_DIR, AUTOTUNE_LATENCY_MS, AUTOTUNE_TRIAL_S, AUTOTUNE_CALL_ITEMS,
+                      AUTOTUNE_BATCH_SIZES, AUTOTUNE_COMPILE_MODES)
 
 class EmbedRequest(BaseModel):
     texts: List[str]
+    index: Optional[str] = None
+    ids: Optional[List[str]] = None
 
 class EmbedResponse(BaseModel):
     vectors: List[List[float]]
@@ -51,110 +92,401 @@ class EmbedResponse(BaseModel):
     model: str
     processing_time_ms: int
 
-def load_model():
-    """Charge le modèle d'embeddings"""
-    global model, model_dim
-    
-    logger.info(f"Chargement du modèle: {EMBED_MODEL_NAME}")
-    start_time = time.time()
+class SearchRequest(BaseModel):
+    query: str
+    index: str
+    k: int = 10
+    nprobe: Optional[int] = None
+    rerank: Optional[int] = None
+
+class SearchResponse(BaseModel):
+    ids: List[str]
+    scores: List[float]
+    exact: bool
+    model: str
+    processing_time_ms: int
+
+class RemoveRequest(BaseModel):
+    ids: List[str]
+
+class ModelSwapRequest(BaseModel):
+    model_name: str
+    engine: Optional[str] = None
+
+class ProfileRequest(BaseModel):
+    mode: str = "cpu"
+    requests: Optional[int] = None
+    seconds: Optional[float] = None
+    interval_ms: float = 5.0
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Protège les endpoints d'administration si ADMIN_TOKEN est défini"""
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Jeton d'administration invalide")
+
+def run_engine(texts: List[str], timer: StageTimer, engine) -> np.ndarray:
+    """Calcule un batch avec le moteur des requêtes regroupées (appelé par l'ordonnanceur, hors boucle d'événements)"""
+    with profiler.trace():
+        return engine.embed(texts, timer, inline=profiler.torch_tracing)
+
+scheduler = BatchScheduler(run_engine, max_batch_items=SCHEDULER_MAX_BATCH, max_wait_ms=SCHEDULER_MAX_WAIT_MS, workers=SCHEDULER_WORKERS)
+
+def calibration_texts(rng: np.random.Generator) -> List[str]:
+    """Appel type pour la calibration: des chunks d'ingestion et quelques requêtes de recherche"""
+    queries = AUTOTUNE_CALL_ITEMS // 10
+    return (synthetic_texts(AUTOTUNE_CALL_ITEMS - queries, CHUNK_MEDIAN_WORDS, rng)
+            + synthetic_texts(queries, QUERY_MEDIAN_WORDS, rng))
+
+def build_engine(engine_name: str, model_name: str, startup: bool = False):
+    """Instancie, charge et préchauffe un moteur d'embeddings, avec ses réglages calibrés"""
+    logger.info(f"Chargement du moteur: {engine_name}")
     
     try:
-        model = SentenceTransformer(EMBED_MODEL_NAME)
-        model_dim = SUPPORTED_MODELS.get(EMBED_MODEL_NAME, model.get_sentence_embedding_dimension())
-        
-        load_time = time.time() - start_time
-        logger.info(f"Modèle chargé en {load_time:.2f}s - Dimension: {model_dim}")
-        
-        # Test du modèle avec un texte simple
-        test_embedding = model.encode(["test"], normalize_embeddings=True)
-        logger.info(f"Test réussi - Shape: {test_embedding.shape}")
+        loaded = create_engine(engine_name, model_name)
+        loaded.load()
+        tuning.apply(loaded, scheduler, calibration_texts, lambda texts: loaded.embed(texts, StageTimer()), startup)
+        logger.info(f"Moteur {loaded.name} prêt - Modèle: {loaded.model_name}")
+        return loaded
         
     except Exception as e:
         logger.error(f"Erreur lors du chargement du modèle: {e}")
         raise
 
+def load_model():
+    """Charge le moteur configuré au démarrage"""
+    if EMBED_ENGINE in ENGINES:
+        tuning.prepare(ENGINES[EMBED_ENGINE], EMBED_MODEL_NAME)
+    loaded = build_engine(EMBED_ENGINE, EMBED_MODEL_NAME, startup=True)
+    if not tuning.calibrating:
+        slot.engine = loaded
+        return
+
+    # Moteur publié à la fin du balayage: pas de trafic pendant les mesures, /health répond 503 d'ici là
+    def publish():
+        slot.engine = loaded
+        logger.info(f"Moteur {loaded.name} publié après calibration")
+    tuning.start_calibration(publish)
+
+async def embed_texts(texts: List[str], timer: StageTimer, engine) -> np.ndarray:
+    """Embeddings des textes: cache d'abord, puis ordonnanceur pour les textes manquants"""
+    with timer.stage("cache"):
+        keys = [text_key(engine.model_name, text) for text in texts]
+        vectors = cache.get_many(keys)
+    
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        computed = await scheduler.submit([texts[i] for i in missing], timer, key=engine)
+        cache.put_many([keys[i] for i in missing], [np.array(vector) for vector in computed])
+        for i, vector in zip(missing, computed):
+            vectors[i] = vector
+    
+    return np.stack(vectors)
+
+def get_index(name: str, engine, create: bool = False):
+    """Index vectoriel `name` compatible avec le moteur `engine` (HTTPException sinon)"""
+    if indexes is None:
+        raise HTTPException(status_code=400, detail="Index vectoriel désactivé (ANN_ENABLED=false)")
+    
+    try:
+        index = indexes.get(name, create=create, dim=engine.dim, model=engine.model_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"Index inconnu: {name}")
+    
+    if index.model != engine.model_name or index.dim != engine.dim:
+        raise HTTPException(status_code=409, detail=f"Index {name} construit avec un autre modèle ({index.model}, dim {index.dim})")
+    
+    return index
+
 @app.on_event("startup")
 async def startup_event():
     """Initialisation au démarrage"""
     logger.info("Démarrage du microservice embedder")
     load_model()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    if slot.engine is not None:
+        slot.engine.close()
+
 @app.get("/health")
 async def health_check():
     """Endpoint de santé"""
-    if model is None:
-        raise HTTPException(status_code=503, detail="Modèle non chargé")
+    engine = slot.engine
+    if engine is None:
+        raise HTTPException(status_code=503, detail="Calibration en cours" if tuning.calibrating else "Modèle non chargé")
+    
+    try:
+        details = engine.health()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Health check failed: {str(e)}")
     
     return {
         "status": "healthy",
-        "model": EMBED_MODEL_NAME,
-        "dimension": model_dim,
+        "engine": engine.name,
+        "model": engine.model_name,
+        "dimension": engine.dim,
+        **details,
         "timestamp": time.time()
     }
 
 @app.get("/info")
 async def model_info():
     """Informations sur le modèle"""
-    if model is None:
+    engine = slot.engine
+    if engine is None:
         raise HTTPException(status_code=503, detail="Modèle non chargé")
     
     return {
-        "model_name": EMBED_MODEL_NAME,
-        "dimension": model_dim,
-        "supported_models": list(SUPPORTED_MODELS.keys()),
-        "max_seq_length": getattr(model, 'max_seq_length', 'unknown')
+        "engine": engine.name,
+        "model_name": engine.model_name,
+        "dimension": engine.dim,
+        "engines": sorted(ENGINES),
+        **engine.info(),
+        "tuning": tuning.info(engine, scheduler)
+    }
+
+@app.get("/metrics")
+async def service_metrics():
+    """Métriques partagées par tous les moteurs: compteurs, latences par étape, cache, ordonnanceur"""
+    engine = slot.engine
+    return {
+        "engine": engine.name if engine is not None else None,
+        "model": engine.model_name if engine is not None else None,
+        **metrics.snapshot(),
+        "cache": cache.stats(),
+        "scheduler": scheduler.stats()
     }
 
 @app.post("/embed", response_model=EmbedResponse)
-async def generate_embeddings(request: EmbedRequest):
+async def generate_embeddings(request: EmbedRequest, x_admin_token: Optional[str] = Header(None)):
     """Génère des embeddings pour une liste de textes"""
-    if model is None:
+    if slot.engine is None:
         raise HTTPException(status_code=503, detail="Modèle non chargé")
     
     if not request.texts:
         raise HTTPException(status_code=400, detail="Liste de textes vide")
     
-    if len(request.texts) > 100:
-        raise HTTPException(status_code=400, detail="Trop de textes (max 100)")
+    if len(request.texts) > MAX_TEXTS:
+        raise HTTPException(status_code=400, detail=f"Trop de textes (max {MAX_TEXTS})")
     
-    try:
-        start_time = time.time()
-        
-        # Génération des embeddings avec normalisation L2
-        embeddings = model.encode(
-            request.texts,
-            normalize_embeddings=True,
-            show_progress_bar=False
-        )
-        
-        processing_time = int((time.time() - start_time) * 1000)
+    # Le moteur reste celui de la requête même si une bascule de modèle survient entre-temps
+    with slot.acquire() as engine:
+        index = None
+        if request.index is not None:
+            # L'indexation crée ou modifie un index: protégée comme /index/{name}/remove et /train
+            require_admin(x_admin_token)
+            if request.ids is None or len(request.ids) != len(request.texts):
+                raise HTTPException(status_code=400, detail="'ids' doit fournir un identifiant par texte pour l'indexation")
+            index = get_index(request.index, engine, create=True)
+    
+        metrics.incr("requests")
+        metrics.incr("texts", len(request.texts))
+    
+        try:
+            start_time = time.time()
+            timer = StageTimer()
         
-        # Conversion en liste Python pour JSON
-        vectors = embeddings.tolist()
+            with profiler.track():
+                # Génération des embeddings avec normalisation L2
+                embeddings = await embed_texts(request.texts, timer, engine)
+            
+                processing_time = int((time.time() - start_time) * 1000)
+            
+                # Vérification de la normalisation (tolérance pour les erreurs de précision)
+                with timer.stage("norm_check"):
+                    norms = np.linalg.norm(embeddings, axis=1)
+                    for i in np.flatnonzero(np.abs(norms - 1.0) > 0.01):
+                        logger.warning(f"Vecteur {i} non normalisé: norme = {norms[i]}")
+            
+                logger.info(f"Embeddings générés: {len(request.texts)} textes en {processing_time}ms")
+            
+                # Indexation incrémentale des chunks embeddés
+                if index is not None:
+                    with timer.stage("index"):
+                        update = await run_in_threadpool(index.upsert, request.ids, embeddings)
+                    logger.info(f"Index {index.name}: {update['added']} ajoutés, {update['replaced']} remplacés")
+                    if update['maintenance']:
+                        logger.info(f"Index {index.name}: maintenance '{update['maintenance']}' planifiée en arrière-plan")
+            
+                response = timed_json_response(EmbedResponse, {
+                    "vectors": embeddings,
+                    "dim": int(embeddings.shape[1]),
+                    "model": engine.model_name,
+                    "processing_time_ms": processing_time
+                }, timer, SERVER_TIMING_ENABLED)
+                metrics.observe_timer("embed", timer)
+                return response
         
-        # Vérification de la normalisation
-        for i, vector in enumerate(vectors):
-            norm = np.linalg.norm(vector)
-            if abs(norm - 1.0) > 0.01:  # Tolérance pour les erreurs de précision
-                logger.warning(f"Vecteur {i} non normalisé: norme = {norm}")
+        except EngineUnavailable as e:
+            metrics.incr("errors")
+            logger.error(f"Moteur indisponible: {e}")
+            raise HTTPException(status_code=503, detail=str(e))
+        except Exception as e:
+            metrics.incr("errors")
+            logger.error(f"Erreur lors de la génération d'embeddings: {e}")
+            raise HTTPException(status_code=500, detail=f"Erreur interne: {str(e)}")
+
+@app.post("/embed/batch")
+async def generate_embeddings_batch(request: EmbedRequest, x_admin_token: Optional[str] = Header(None)):
+    """Génère des embeddings par batch (alias pour /embed)"""
+    return await generate_embeddings(request, x_admin_token)
+
+@app.post("/search", response_model=SearchResponse)
+async def search_index(request: SearchRequest):
+    """Embed la requête et retourne les identifiants des k chunks les plus proches dans l'index"""
+    if slot.engine is None:
+        raise HTTPException(status_code=503, detail="Modèle non chargé")
+    
+    if not request.query.strip():
+        raise HTTPException(status_code=400, detail="Requête vide")
+    
+    if request.k <= 0 or request.k > SEARCH_MAX_K:
+        raise HTTPException(status_code=400, detail=f"k doit être entre 1 et {SEARCH_MAX_K}")
+    
+    with slot.acquire() as engine:
+        index = get_index(request.index, engine)
+        metrics.incr("searches")
+    
+        try:
+            start_time = time.time()
+            timer = StageTimer()
         
-        logger.info(f"Embeddings générés: {len(request.texts)} textes en {processing_time}ms")
+            with profiler.track():
+                embedding = await embed_texts([request.query], timer, engine)
+            
+                with timer.stage("search"):
+                    ids, scores, exact = await run_in_threadpool(
+                        index.search,
+                        embedding[0],
+                        request.k,
+                        request.nprobe or ANN_NPROBE,
+                        request.rerank or ANN_RERANK
+                    )
+            
+                processing_time = int((time.time() - start_time) * 1000)
+                logger.info(f"Recherche dans {index.name}: {len(ids)} résultats en {processing_time}ms ({'exacte' if exact else 'IVF-PQ'})")
+            
+                response = timed_json_response(SearchResponse, {
+                    "ids": ids,
+                    "scores": scores,
+                    "exact": exact,
+                    "model": engine.model_name,
+                    "processing_time_ms": processing_time
+                }, timer, SERVER_TIMING_ENABLED)
+                metrics.observe_timer("search", timer)
+                return response
         
-        return EmbedResponse(
-            vectors=vectors,
-            dim=model_dim,
-            model=EMBED_MODEL_NAME,
-            processing_time_ms=processing_time
+        except EngineUnavailable as e:
+            metrics.incr("errors")
+            logger.error(f"Moteur indisponible: {e}")
+            raise HTTPException(status_code=503, detail=str(e))
+        except Exception as e:
+            metrics.incr("errors")
+            logger.error(f"Erreur lors de la recherche: {e}")
+            raise HTTPException(status_code=500, detail=f"Erreur interne: {str(e)}")
+
+@app.get("/index")
+async def list_indexes():
+    """État des index vectoriels"""
+    if indexes is None:
+        return {"enabled": False, "indexes": []}
+    
+    return {"enabled": True, "indexes": await run_in_threadpool(indexes.stats)}
+
+@app.post("/index/{name}/remove", dependencies=[Depends(require_admin)])
+async def remove_from_index(name: str, request: RemoveRequest):
+    """Retire des chunks de l'index (documents supprimés ou ré-ingérés)"""
+    if slot.engine is None:
+        raise HTTPException(status_code=503, detail="Modèle non chargé")
+    
+    index = get_index(name, slot.engine)
+    removed = await run_in_threadpool(index.remove, request.ids)
+    return {"removed": removed, **index.stats()}
+
+@app.post("/index/{name}/train", status_code=202, dependencies=[Depends(require_admin)])
+async def train_index(name: str, response: Response, wait: bool = False):
+    """Ré-entraîne et compacte l'index en arrière-plan (ou avant de répondre avec wait=true)"""
+    if slot.engine is None:
+        raise HTTPException(status_code=503, detail="Modèle non chargé")
+    
+    index = get_index(name, slot.engine)
+    if wait:
+        try:
+            await run_in_threadpool(index.rebuild, True)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        response.status_code = 200
+    elif not index.start_maintenance('train'):
+        raise HTTPException(status_code=409, detail=f"Maintenance de l'index {name} déjà en cours")
+    
+    return index.stats()
+
+@app.post("/admin/model", status_code=202, dependencies=[Depends(require_admin)])
+async def swap_model(request: ModelSwapRequest):
+    """Charge un nouveau modèle en arrière-plan puis bascule dessus sans interruption de service"""
+    if slot.engine is None:
+        raise HTTPException(status_code=503, detail="Modèle non chargé")
+    
+    engine_name = request.engine or slot.engine.name
+    if engine_name not in ENGINES:
+        raise HTTPException(status_code=400, detail=f"Moteur inconnu (attendu: {', '.join(sorted(ENGINES))})")
+    
+    try:
+        return slot.start_swap(
+            lambda: build_engine(engine_name, request.model_name),
+            {"engine": engine_name, "model": request.model_name}
         )
-        
-    except Exception as e:
-        logger.error(f"Erreur lors de la génération d'embeddings: {e}")
-        raise HTTPException(status_code=500, detail=f"Erreur interne: {str(e)}")
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
-@app.post("/embed/batch")
-async def generate_embeddings_batch(request: EmbedRequest):
-    """Génère des embeddings par batch (alias pour /embed)"""
-    return await generate_embeddings(request)
+@app.get("/admin/model", dependencies=[Depends(require_admin)])
+async def swap_status():
+    """État du modèle actif et de la dernière bascule (durées, mémoire)"""
+    return slot.status()
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def start_profile(request: ProfileRequest):
+    """Démarre une capture de profil pour les N prochaines requêtes et/ou T secondes"""
+    if request.mode not in PROFILE_MODES:
+        raise HTTPException(status_code=400, detail=f"Mode inconnu (attendu: {', '.join(PROFILE_MODES)})")
+    
+    if not request.requests and not request.seconds:
+        raise HTTPException(status_code=400, detail="Préciser 'requests' et/ou 'seconds'")
+    
+    try:
+        profiler.start(request.mode, request.requests, request.seconds, request.interval_ms)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ImportError as e:
+        raise HTTPException(status_code=400, detail=f"Mode indisponible: {str(e)}")
+    
+    return profiler.status()
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_status():
+    """État de la capture de profil"""
+    return profiler.status()
+
+@app.delete("/admin/profile", dependencies=[Depends(require_admin)])
+async def stop_profile():
+    """Termine la capture en cours sans attendre ses bornes"""
+    profiler.stop()
+    return profiler.status()
+
+@app.get("/admin/profile/artifact", dependencies=[Depends(require_admin)])
+async def download_profile():
+    """Télécharge l'artefact de la dernière capture terminée"""
+    if profiler.artifact is None:
+        raise HTTPException(status_code=404, detail="Aucun profil disponible")
+    
+    return Response(
+        content=profiler.artifact,
+        media_type=profiler.artifact_media_type,
+        headers={"Content-Disposition": f'attachment; filename="{profiler.artifact_name}"'}
+    )
 
 if __name__ == "__main__":
     logger.info(f"Démarrage du serveur sur {HOST}:{PORT}")
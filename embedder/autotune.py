@@ -0,0 +1,428 @@
+"""
+Calibration du moteur local au démarrage: taille de batch, threads torch et workers
+
+Un court balayage mesure le débit du moteur sur des entrées synthétiques dont les longueurs
+suivent une loi log-normale proche des chunks et des requêtes réels. Il procède par
+coordonnées pour rester court: d'abord les couples (workers, threads intra-op) qui occupent
+les cœurs disponibles, à la taille de batch courante, puis les tailles de batch avec le
+meilleur couple, enfin les modes de compilation demandés. La configuration retenue est celle
+de meilleur débit dont la latence p95 d'un appel reste sous `latency_target_ms` (à défaut,
+celle de plus faible latence). Le profil est enregistré par modèle et par type de nœud
+(cœurs, CPU, version de torch), puis relu aux démarrages suivants. Le balayage précède la
+publication du moteur: aucune requête ne partage les cœurs avec les mesures.
+
+Les threads inter-op ne peuvent être fixés qu'une fois par processus, avant tout calcul
+parallèle: ils ne sont pas mesurés mais déduits du couple retenu, et appliqués au démarrage
+suivant, avant le chargement du modèle.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import platform
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import torch
+except ImportError:  # moteurs sans modèle local (ollama, mock)
+    torch = None
+
+logger = logging.getLogger(__name__)
+
+AUTOTUNE_MODES = ('off', 'auto', 'force')
+
+# Longueurs des entrées synthétiques (en mots): chunks d'ingestion et requêtes utilisateur
+CHUNK_MEDIAN_WORDS = 250
+QUERY_MEDIAN_WORDS = 12
+
+# Mots courants (français et anglais): un mot réel donne à peu près un token, comme dans les
+# chunks, là où des suites de lettres aléatoires seraient découpées en nombreux sous-mots
+WORDS = (
+    "le", "la", "les", "de", "des", "un", "une", "et", "est", "dans", "pour", "par", "sur", "avec",
+    "que", "qui", "pas", "plus", "ce", "cette", "son", "leur", "nous", "vous", "ils", "elle",
+    "document", "contrat", "article", "rapport", "analyse", "projet", "données", "résultat",
+    "clause", "partie", "date", "montant", "annexe", "section", "page", "version", "service",
+    "client", "équipe", "processus", "système", "modèle", "question", "réponse", "source",
+    "the", "of", "and", "to", "in", "is", "for", "on", "with", "that", "by", "as", "are", "this",
+    "from", "be", "or", "an", "which", "report", "results", "model", "data", "section", "table",
+    "figure", "value", "total", "period", "agreement", "terms", "payment", "notice", "policy",
+    "2023", "2024", "12", "100", "%", "€", "(", ")", ",", "."
+)
+
+
+def synthetic_texts(count: int, median_words: int, rng: np.random.Generator, sigma: float = 0.6, max_words: int = 600) -> List[str]:
+    """`count` textes dont le nombre de mots suit une loi log-normale de médiane `median_words`"""
+    lengths = np.clip(np.round(rng.lognormal(np.log(median_words), sigma, count)), 1, max_words).astype(int)
+    return [' '.join(rng.choice(WORDS, size=length)) for length in lengths]
+
+
+def cpu_count() -> int:
+    return len(os.sched_getaffinity(0))
+
+
+def node_signature() -> Dict[str, Any]:
+    """Caractéristiques du nœud qui déterminent les bons réglages"""
+    cpu = platform.processor() or platform.machine()
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    cpu = line.split(':', 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    return {
+        "cores": cpu_count(),
+        "cpu": cpu,
+        "torch": torch.__version__ if torch is not None else None
+    }
+
+
+def thread_layouts(cores: int) -> List[Tuple[int, int]]:
+    """Couples (workers, threads intra-op) occupant entre la moitié et la totalité des cœurs"""
+    counts = sorted({1 << i for i in range(cores.bit_length())} | {n for n in range(1, cores + 1) if cores % n == 0})
+    return [
+        (workers, intra)
+        for workers in counts
+        for intra in counts
+        if cores / 2 <= workers * intra <= cores
+    ]
+
+
+def inter_op_threads(cores: int, workers: int, intra: int) -> int:
+    """Threads inter-op laissés aux cœurs que les workers n'occupent pas (au moins un)"""
+    return max(1, cores // (workers * intra))
+
+
+def set_torch_threads(intra: int, inter: Optional[int] = None) -> bool:
+    """Fixe les threads intra-op (et inter-op si possible); False si inter-op n'a pas pu l'être"""
+    if torch is None:
+        return False
+    torch.set_num_threads(intra)
+    if inter is None or inter == torch.get_num_interop_threads():
+        return True
+    try:
+        torch.set_num_interop_threads(inter)
+        return True
+    except RuntimeError:
+        # Déjà utilisés par un calcul parallèle: pris en compte au prochain démarrage
+        return False
+
+
+def profile_path(directory: str, engine_name: str, model_name: str, call_items: int, latency_target_ms: float) -> str:
+    """Fichier du profil propre au modèle, au nœud et aux conditions de mesure"""
+    identity = json.dumps([engine_name, model_name, call_items, latency_target_ms, node_signature()], sort_keys=True)
+    digest = hashlib.blake2b(identity.encode('utf-8'), digest_size=8).hexdigest()
+    slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+    return os.path.join(directory, f"{slug}-{digest}.json")
+
+
+def load_profile(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Profil de calibration illisible {path}: {e}")
+        return None
+
+
+def save_profile(path: str, profile: Dict[str, Any]):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class Autotuner:
+    """Mesure le débit du moteur pour chaque configuration essayée et retient la meilleure
+
+    `call(items)` exécute un appel au moteur, `configure(settings)` applique une configuration
+    (threads intra-op, taille de batch, mode de compilation); les workers sont des threads qui
+    appellent le moteur en parallèle, comme l'ordonnanceur de batches.
+    """
+
+    def __init__(self, call: Callable[[List[Any]], Any], configure: Callable[[Dict[str, Any]], None],
+                 workload: Sequence[List[Any]], latency_target_ms: float, trial_s: float = 2.0, min_calls: int = 2):
+        self.call = call
+        self.configure = configure
+        self.workload = list(workload)
+        self.latency_target_ms = latency_target_ms
+        self.trial_s = trial_s
+        self.min_calls = min_calls
+        self.trials: List[Dict[str, Any]] = []
+
+    def measure(self, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Débit (éléments/s) et latences d'appel de `settings`, après un appel de préchauffage par worker"""
+        self.configure(settings)
+        workers = settings['workers']
+        latencies: List[float] = []
+        counts = [0] * workers
+        errors: List[BaseException] = []
+        lock = threading.Lock()
+        window = {}
+
+        def start_window():
+            window['start'] = time.perf_counter()
+            window['deadline'] = window['start'] + self.trial_s
+
+        barrier = threading.Barrier(workers, action=start_window)
+
+        def worker(index: int):
+            position = index
+            try:
+                self.call(self.workload[position % len(self.workload)])
+                barrier.wait()
+                calls = 0
+                while calls < self.min_calls or time.perf_counter() < window['deadline']:
+                    position += workers
+                    items = self.workload[position % len(self.workload)]
+                    start = time.perf_counter()
+                    self.call(items)
+                    with lock:
+                        latencies.append((time.perf_counter() - start) * 1000)
+                        counts[index] += len(items)
+                    calls += 1
+            except threading.BrokenBarrierError:
+                pass
+            except BaseException as e:
+                errors.append(e)
+                barrier.abort()
+
+        threads = [threading.Thread(target=worker, args=(index,), name=f"autotune-{index}") for index in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+        elapsed = time.perf_counter() - window['start']
+        return {
+            "settings": dict(settings),
+            "items_per_s": round(sum(counts) / elapsed, 2),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+            "calls": len(latencies)
+        }
+
+    def choose(self) -> Dict[str, Any]:
+        """Meilleur débit sous la cible de latence, ou plus faible latence si aucun essai ne la tient"""
+        within = [trial for trial in self.trials if not self.latency_target_ms or trial["p95_ms"] <= self.latency_target_ms]
+        if within:
+            return max(within, key=lambda trial: trial["items_per_s"])
+        return min(self.trials, key=lambda trial: trial["p95_ms"])
+
+    def _try(self, settings: Dict[str, Any]):
+        if any(trial["settings"] == settings for trial in self.trials):
+            return
+        try:
+            trial = self.measure(settings)
+        except Exception as e:
+            logger.warning(f"Calibration: essai {settings} en échec: {e}")
+            return
+        self.trials.append(trial)
+        logger.info(
+            f"Calibration: workers={settings['workers']} threads={settings['intra_op_threads']} "
+            f"batch={settings['batch_size']} compile={settings['compile_mode']}: "
+            f"{trial['items_per_s']} éléments/s, p95 {trial['p95_ms']}ms"
+        )
+
+    def calibrate(self, base: Dict[str, Any], cores: int, batch_sizes: Sequence[int], compile_modes: Sequence[str]) -> Dict[str, Any]:
+        """Balayage par coordonnées à partir de `base`; retourne l'essai retenu"""
+        for workers, intra in thread_layouts(cores):
+            self._try({**base, "workers": workers, "intra_op_threads": intra})
+        if not self.trials:
+            raise RuntimeError("Calibration impossible: aucun essai n'a abouti")
+
+        best = self.choose()["settings"]
+        for batch_size in batch_sizes:
+            self._try({**best, "batch_size": batch_size})
+
+        best = self.choose()["settings"]
+        for compile_mode in compile_modes:
+            self._try({**best, "compile_mode": compile_mode})
+
+        return self.choose()
+
+
+class EngineTuning:
+    """Réglages du moteur local: profil enregistré, calibration au démarrage, état exposé dans /info"""
+
+    def __init__(self, mode: str, directory: str, latency_target_ms: float, trial_s: float, call_items: int,
+                 batch_sizes: Sequence[int], compile_modes: Sequence[str]):
+        if mode not in AUTOTUNE_MODES:
+            raise ValueError(f"Mode de calibration inconnu: {mode} (attendu: {', '.join(AUTOTUNE_MODES)})")
+        self.mode = mode
+        self.directory = directory
+        self.latency_target_ms = latency_target_ms
+        self.trial_s = trial_s
+        self.call_items = call_items
+        self.batch_sizes = [size for size in batch_sizes if size <= call_items] or [call_items]
+        self.compile_modes = list(compile_modes)
+        self.source = 'defaults'
+        self.profile: Optional[Dict[str, Any]] = None
+        self.path: Optional[str] = None
+        self.pending_inter_op: Optional[int] = None
+        self.thread: Optional[threading.Thread] = None
+        self._pending: Optional[Tuple] = None  # calibration préparée par apply(), lancée par start_calibration()
+
+    def _path(self, engine_name: str, model_name: str) -> str:
+        return profile_path(self.directory, engine_name, model_name, self.call_items, self.latency_target_ms)
+
+    def prepare(self, engine_cls, model_name: str):
+        """Avant le chargement du modèle: threads torch du profil enregistré (seul moment où inter-op peut être fixé)"""
+        if self.mode != 'auto' or not engine_cls.tunable:
+            return
+        profile = load_profile(self._path(engine_cls.name, model_name or engine_cls.default_model))
+        if profile is not None:
+            settings = profile["settings"]
+            set_torch_threads(settings["intra_op_threads"], settings["inter_op_threads"])
+
+    def apply(self, engine, scheduler, workload: Callable[[np.random.Generator], List[Any]], call: Callable[[List[Any]], Any], startup: bool):
+        """Applique le profil enregistré du moteur; au démarrage sans profil (ou AUTOTUNE=force), prépare sa calibration
+
+        La calibration préparée est lancée par start_calibration(), avant que le moteur ne serve:
+        les mesures ne sont jamais faites sous le trafic. Lors d'un changement de modèle à chaud,
+        seuls les réglages propres au moteur (taille de batch, compilation) d'un profil existant
+        sont appliqués: threads et workers concernent tout le processus et restent ceux du démarrage.
+        """
+        if self.mode == 'off':
+            return
+        if not engine.tunable:
+            self.source, self.profile, self.path = 'defaults', None, None
+            return
+
+        path = self._path(engine.name, engine.model_name)
+        profile = load_profile(path) if self.mode == 'auto' or not startup else None
+
+        if profile is None and startup:
+            self.source, self.profile, self.path = 'calibrating', None, None
+            self._pending = (engine, scheduler, path, workload, call)
+            return
+        if profile is not None:
+            logger.info(f"Profil de calibration relu: {path}")
+            self.source = 'profile'
+        else:
+            logger.info(f"Aucun profil de calibration pour {engine.model_name}: réglages par défaut du moteur")
+            self.source = 'defaults'
+            self.profile = None
+            return
+
+        self._use(engine, scheduler, profile, path, startup)
+
+    def _use(self, engine, scheduler, profile: Dict[str, Any], path: str, startup: bool):
+        settings = profile["settings"]
+        engine.configure(batch_size=settings["batch_size"], compile_mode=settings["compile_mode"])
+        if startup:
+            if not set_torch_threads(settings["intra_op_threads"], settings["inter_op_threads"]):
+                self.pending_inter_op = settings["inter_op_threads"]
+                logger.info(f"Threads inter-op ({settings['inter_op_threads']}) appliqués au prochain démarrage")
+            scheduler.workers = settings["workers"]
+        self.profile = profile
+        self.path = path
+
+    @property
+    def calibrating(self) -> bool:
+        return self._pending is not None
+
+    def start_calibration(self, ready: Callable[[], None]):
+        """Lance en arrière-plan la calibration préparée par apply(); `ready` publie le moteur une fois
+        le balayage terminé, en succès comme en échec (réglages par défaut rétablis)"""
+        self.thread = threading.Thread(target=self._calibrate_then, args=(ready,), name="autotune", daemon=True)
+        self.thread.start()
+
+    def _calibrate_then(self, ready: Callable[[], None]):
+        engine, scheduler, path, workload, call = self._pending
+        try:
+            profile = self.calibrate(engine, workload, call)
+            save_profile(path, profile)
+            logger.info(f"Profil de calibration enregistré: {path}")
+            self._use(engine, scheduler, profile, path, startup=True)
+            self.source = 'calibrated'
+        except Exception as e:
+            logger.error(f"{e}: réglages par défaut du moteur")
+            self.source = 'defaults'
+        finally:
+            self._pending = None
+            ready()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Attend la fin de la calibration; False si elle tourne encore après `timeout`"""
+        if self.thread is not None:
+            self.thread.join(timeout)
+        return self.thread is None or not self.thread.is_alive()
+
+    def calibrate(self, engine, workload: Callable[[np.random.Generator], List[Any]], call: Callable[[List[Any]], Any]) -> Dict[str, Any]:
+        cores = cpu_count()
+        rng = np.random.default_rng(0)
+        calls = [workload(rng) for _ in range(16)]
+        base = {
+            "workers": 1,
+            "intra_op_threads": torch.get_num_threads(),
+            **engine.tuning()
+        }
+        compile_modes = [mode for mode in self.compile_modes if mode != base["compile_mode"]]
+
+        def configure(settings: Dict[str, Any]):
+            set_torch_threads(settings["intra_op_threads"])
+            engine.configure(batch_size=settings["batch_size"], compile_mode=settings["compile_mode"])
+
+        logger.info(f"Calibration de {engine.model_name} sur {cores} cœurs (cible p95 {self.latency_target_ms}ms)")
+        start = time.perf_counter()
+        tuner = Autotuner(call, configure, calls, self.latency_target_ms, self.trial_s)
+        try:
+            chosen = tuner.calibrate(base, cores, self.batch_sizes, compile_modes)
+        finally:
+            # Le moteur et les threads torch sortent du balayage dans leur état initial: le profil
+            # retenu est appliqué ensuite, et un échec laisse les réglages par défaut
+            configure(base)
+        duration = time.perf_counter() - start
+
+        settings = dict(chosen["settings"])
+        settings["inter_op_threads"] = inter_op_threads(cores, settings["workers"], settings["intra_op_threads"])
+        logger.info(f"Calibration terminée en {duration:.1f}s: {settings} ({chosen['items_per_s']} éléments/s, p95 {chosen['p95_ms']}ms)")
+        return {
+            "engine": engine.name,
+            "model": engine.model_name,
+            "node": node_signature(),
+            "call_items": self.call_items,
+            "latency_target_ms": self.latency_target_ms,
+            "settings": settings,
+            "items_per_s": chosen["items_per_s"],
+            "p95_ms": chosen["p95_ms"],
+            "within_target": not self.latency_target_ms or chosen["p95_ms"] <= self.latency_target_ms,
+            "calibrated_at": time.time(),
+            "calibration_s": round(duration, 2),
+            "trials": tuner.trials
+        }
+
+    def info(self, engine, scheduler) -> Dict[str, Any]:
+        """Réglages en vigueur et leur origine"""
+        settings = {
+            **engine.tuning(),
+            "workers": scheduler.workers,
+            "intra_op_threads": torch.get_num_threads() if torch is not None else None,
+            "inter_op_threads": torch.get_num_interop_threads() if torch is not None else None
+        }
+        info = {"mode": self.mode, "source": self.source, "settings": settings}
+        if self.profile is not None:
+            info.update({
+                "profile": self.path,
+                "node": self.profile["node"],
+                "items_per_s": self.profile["items_per_s"],
+                "p95_ms": self.profile["p95_ms"],
+                "latency_target_ms": self.profile["latency_target_ms"],
+                "within_target": self.profile["within_target"],
+                "calibrated_at": self.profile["calibrated_at"],
+                "pending_inter_op_threads": self.pending_inter_op
+            })
+        return info
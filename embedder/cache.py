@@ -0,0 +1,74 @@
+"""
+Cache LRU borné partagé par tous les moteurs du microservice
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+
+
+def text_key(*parts: str) -> bytes:
+    """Empreinte compacte (16 octets) d'un ou plusieurs textes, utilisée comme clé de cache"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.digest()
+
+
+class LRUCache:
+    """Cache LRU thread-safe avec compteurs de hits/misses (désactivé si max_entries <= 0)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get_many(self, keys: Sequence[Hashable]) -> List[Optional[Any]]:
+        if not self.enabled:
+            return [None] * len(keys)
+
+        values = []
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key)
+                if value is None:
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                values.append(value)
+        return values
+
+    def put_many(self, keys: Sequence[Hashable], values: Sequence[Any]):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
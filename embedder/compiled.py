@@ -0,0 +1,198 @@
+"""
+Exécution compilée (TorchScript ou torch.compile) par buckets de longueur
+
+Les batches tokenisés sont paddés à la longueur de bucket immédiatement supérieure,
+et les batches incomplets (fin d'une requête) complétés jusqu'à la taille de batch
+préchauffée suivante, de sorte que le modèle compilé ne voit qu'un petit nombre de
+formes, toutes préchauffées au démarrage: aucune recompilation en service. Les
+séquences plus longues que le plus grand bucket sont exécutées en mode eager.
+"""
+
+import bisect
+import logging
+import statistics
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+COMPILE_MODES = ('none', 'torchscript', 'compile')
+
+
+def parse_buckets(spec: str) -> List[int]:
+    """Parse une liste de longueurs séparées par des virgules ('64,128,256')"""
+    return sorted({int(item) for item in spec.split(',') if item.strip()})
+
+
+def batch_ladder(max_batch_size: int) -> List[int]:
+    """Tailles de batch à préchauffer: puissances de deux jusqu'à `max_batch_size`, plus celle-ci
+
+    Un batch incomplet est complété jusqu'à la taille suivante: au plus deux fois plus de lignes.
+    """
+    sizes = {max_batch_size}
+    size = 1
+    while size < max_batch_size:
+        sizes.add(size)
+        size *= 2
+    return sorted(sizes)
+
+
+def release_module(module: torch.nn.Module):
+    """Libère tout de suite le stockage des paramètres et buffers de `module`
+
+    Le graphe d'objets Python d'un modèle contient des cycles: sans cela, sa mémoire
+    attendrait une collecte complète du ramasse-miettes, qui bloque le GIL plusieurs
+    centaines de millisecondes sur un gros modèle.
+    """
+    with torch.no_grad():
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            tensor.data = torch.empty(0, dtype=tensor.dtype, device=tensor.device)
+
+
+class BucketedRunner:
+    """Route chaque batch vers le modèle compilé du bucket de longueur le plus proche
+
+    `module` prend les tenseurs d'entrée en positionnel, dans l'ordre de `input_names`.
+    """
+
+    def __init__(self, module: torch.nn.Module, input_names: Sequence[str], pad_values: Dict[str, int],
+                 mode: str = 'none', buckets: Sequence[int] = ()):
+        if mode not in COMPILE_MODES:
+            raise ValueError(f"Mode de compilation inconnu: {mode} (attendu: {', '.join(COMPILE_MODES)})")
+        self.module = module.eval()
+        self.input_names = list(input_names)
+        self.pad_values = pad_values
+        self.mode = mode
+        self.buckets = sorted(buckets) if mode != 'none' else []
+        self.compiled: Dict[int, Callable] = {}
+        self.batch_sizes: List[int] = []
+        self.hits: Counter = Counter()
+        self.padded_rows = 0
+        self.report: Dict[str, Any] = {"mode": mode, "buckets": self.buckets}
+
+    def bucket_for(self, length: int) -> Optional[int]:
+        """Plus petit bucket >= length, None si la séquence dépasse le plus grand bucket"""
+        index = bisect.bisect_left(self.buckets, length)
+        return self.buckets[index] if index < len(self.buckets) else None
+
+    def batch_size_for(self, rows: int) -> Optional[int]:
+        """Plus petite taille de batch préchauffée >= rows, None au-delà de la plus grande"""
+        index = bisect.bisect_left(self.batch_sizes, rows)
+        return self.batch_sizes[index] if index < len(self.batch_sizes) else None
+
+    def __call__(self, features: Dict[str, torch.Tensor]) -> torch.Tensor:
+        tensors = [features[name] for name in self.input_names]
+        rows, length = tensors[0].shape
+        bucket = self.bucket_for(length) if self.compiled else None
+        batch_size = self.batch_size_for(rows) if bucket is not None else None
+
+        if batch_size is None:
+            self.hits['eager'] += 1
+            return self.module(*tensors)
+
+        # Entrées ordinaires comme au préchauffage, même appelé sous inference_mode: torch.compile
+        # distingue les tenseurs d'inférence des autres et recompilerait
+        with torch.inference_mode(False):
+            tensors = [tensor.clone() if tensor.is_inference() else tensor for tensor in tensors]
+            if bucket > length:
+                tensors = [
+                    torch.nn.functional.pad(tensor, (0, bucket - length), value=self.pad_values.get(name, 0))
+                    for name, tensor in zip(self.input_names, tensors)
+                ]
+            if batch_size > rows:
+                # Lignes de complément: copies de la dernière ligne (entrée valide), retirées de la sortie
+                tensors = [torch.cat([tensor, tensor[-1:].expand(batch_size - rows, -1)]) for tensor in tensors]
+                self.padded_rows += batch_size - rows
+        self.hits[bucket] += 1
+        return self.compiled[bucket](*tensors)[:rows]
+
+    def example_inputs(self, batch_size: int, length: int, vocab_size: int) -> List[torch.Tensor]:
+        """Entrées synthétiques de forme (batch_size, length) pour le traçage et le préchauffage"""
+        tensors = []
+        for name in self.input_names:
+            if name == 'input_ids':
+                tensors.append(torch.randint(0, vocab_size, (batch_size, length)))
+            elif name == 'attention_mask':
+                tensors.append(torch.ones(batch_size, length, dtype=torch.long))
+            else:
+                tensors.append(torch.zeros(batch_size, length, dtype=torch.long))
+        return tensors
+
+    def compile(self, vocab_size: int, batch_sizes: Sequence[int], device: torch.device, bench_runs: int = 3):
+        """Compile/trace le modèle pour chaque bucket, le préchauffe et mesure le gain face au mode eager
+
+        Chaque bucket est préchauffé pour toutes les tailles de `batch_sizes` (voir batch_ladder()):
+        les batches plus petits y sont complétés, les plus grands passent en mode eager.
+        """
+        if self.mode == 'none' or not self.buckets:
+            return
+
+        logger.info(f"Compilation du modèle ({self.mode}) pour les buckets {self.buckets}")
+        start_time = time.perf_counter()
+        shared = torch.compile(self.module) if self.mode == 'compile' else None
+        self.batch_sizes = sorted(set(batch_sizes))
+        bucket_reports = []
+
+        for bucket in self.buckets:
+            bucket_start = time.perf_counter()
+            examples = {
+                batch_size: [t.to(device) for t in self.example_inputs(batch_size, bucket, vocab_size)]
+                for batch_size in self.batch_sizes
+            }
+            with torch.inference_mode():
+                if shared is not None:
+                    compiled = shared
+                else:
+                    traced = torch.jit.trace(self.module, tuple(examples[max(batch_sizes)]), check_trace=False, strict=False)
+                    compiled = torch.jit.freeze(traced)
+
+                # Préchauffage: déclenche la (re)compilation et les allocations pour chaque forme
+                for tensors in examples.values():
+                    for _ in range(2):
+                        compiled(*tensors)
+                warmup_s = time.perf_counter() - bucket_start
+
+                tensors = examples[max(batch_sizes)]
+                eager_ms = self._median_ms(self.module, tensors, bench_runs)
+                compiled_ms = self._median_ms(compiled, tensors, bench_runs)
+                self.compiled[bucket] = compiled
+                bucket_reports.append({
+                    "length": bucket,
+                    "warmup_s": round(warmup_s, 3),
+                    "eager_ms": round(eager_ms, 2),
+                    "compiled_ms": round(compiled_ms, 2),
+                    "speedup": round(eager_ms / compiled_ms, 3) if compiled_ms > 0 else None
+                })
+
+        compile_time = time.perf_counter() - start_time
+        self.report = {
+            "mode": self.mode,
+            "buckets": self.buckets,
+            "startup_s": round(compile_time, 3),
+            "batch_sizes": self.batch_sizes,
+            "bench_batch_size": max(batch_sizes),
+            "per_bucket": bucket_reports
+        }
+        for item in bucket_reports:
+            logger.info(f"Bucket {item['length']}: eager {item['eager_ms']}ms, compilé {item['compiled_ms']}ms (x{item['speedup']})")
+        logger.info(f"Compilation terminée en {compile_time:.2f}s")
+
+    def release(self):
+        """Libère les modèles compilés et les paramètres du modèle (moteur remplacé)"""
+        self.compiled.clear()
+        release_module(self.module)
+
+    @staticmethod
+    def _median_ms(fn: Callable, tensors: List[torch.Tensor], runs: int) -> float:
+        durations = []
+        for _ in range(max(runs, 1)):
+            start = time.perf_counter()
+            fn(*tensors)
+            durations.append((time.perf_counter() - start) * 1000)
+        return statistics.median(durations)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.report, "hits": {str(key): count for key, count in self.hits.items()}, "padded_rows": self.padded_rows}
@@ -0,0 +1,359 @@
+"""
+Moteurs d'embeddings interchangeables
+
+Le serveur commun (app.py) instancie le moteur désigné par EMBED_ENGINE depuis le
+registre ENGINES; tous les moteurs partagent ainsi l'ordonnanceur de batches, le cache
+et l'instrumentation du serveur. Un nouveau moteur (ONNX Runtime par exemple) s'ajoute
+en sous-classant EmbeddingEngine et en le décorant avec @register_engine("nom").
+"""
+
+import os
+import time
+import zlib
+import logging
+from typing import Any, Dict, List, Optional, Type
+
+import numpy as np
+
+from ollama_pool import OllamaPool, OllamaUnavailable
+from profiling import StageTimer
+
+try:
+    import torch
+except ImportError:  # moteurs sans modèle local (ollama, mock)
+    torch = None
+
+logger = logging.getLogger(__name__)
+
+# Configuration sentence-transformers
+ENCODE_BATCH_SIZE = int(os.getenv('ENCODE_BATCH_SIZE', 32))
+COMPILE_MODE = os.getenv('COMPILE_MODE', 'none')  # none | torchscript | compile
+COMPILE_BUCKETS = os.getenv('COMPILE_BUCKETS', '32,64,128,256,512')
+# auto: pipeline actif seulement si plusieurs cœurs sont disponibles (sinon les étapes ne peuvent pas se chevaucher)
+PIPELINE_MODE = os.getenv('PIPELINE_ENABLED', 'auto').lower()
+PIPELINE_ENABLED = PIPELINE_MODE == 'true' or (PIPELINE_MODE == 'auto' and len(os.sched_getaffinity(0)) > 1)
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 2))
+
+# Configuration Ollama (OLLAMA_URLS: plusieurs endpoints séparés par des virgules)
+OLLAMA_URL = os.getenv('OLLAMA_URL', 'http://localhost:11434')
+OLLAMA_URLS = [url.strip() for url in os.getenv('OLLAMA_URLS', OLLAMA_URL).split(',') if url.strip()]
+OLLAMA_TIMEOUT = float(os.getenv('OLLAMA_TIMEOUT', 30))
+OLLAMA_HEDGE_PERCENTILE = float(os.getenv('OLLAMA_HEDGE_PERCENTILE', 95))
+OLLAMA_HEDGE_MIN_MS = float(os.getenv('OLLAMA_HEDGE_MIN_MS', 50))
+OLLAMA_BREAKER_FAILURES = int(os.getenv('OLLAMA_BREAKER_FAILURES', 5))
+OLLAMA_BREAKER_COOLDOWN_S = float(os.getenv('OLLAMA_BREAKER_COOLDOWN_S', 30))
+OLLAMA_CONCURRENCY = int(os.getenv('OLLAMA_CONCURRENCY', 0))  # 0: un appel simultané par endpoint
+
+# Modèles supportés avec leurs dimensions
+SUPPORTED_MODELS = {
+    'intfloat/multilingual-e5-large': 1024,
+    'nomic-ai/nomic-embed-text-v1.5': 768,
+    'sentence-transformers/all-MiniLM-L6-v2': 384,
+    'intfloat/e5-large-v2': 1024
+}
+
+ENGINES: Dict[str, Type['EmbeddingEngine']] = {}
+
+
+class EngineUnavailable(Exception):
+    """Le backend du moteur (service distant, modèle) est momentanément indisponible"""
+
+
+def register_engine(name: str):
+    """Enregistre une classe de moteur sous `name` dans le registre ENGINES"""
+    def decorator(cls):
+        cls.name = name
+        ENGINES[name] = cls
+        return cls
+    return decorator
+
+
+def create_engine(name: str, model_name: Optional[str] = None) -> 'EmbeddingEngine':
+    """Instancie le moteur `name` (modèle par défaut du moteur si `model_name` est vide)"""
+    if name not in ENGINES:
+        raise ValueError(f"Moteur inconnu: {name} (disponibles: {', '.join(sorted(ENGINES))})")
+    engine_cls = ENGINES[name]
+    return engine_cls(model_name or engine_cls.default_model)
+
+
+def create_ollama_pool() -> OllamaPool:
+    """Client des endpoints OLLAMA_URLS (sélection par latence, couverture, disjoncteurs)"""
+    return OllamaPool(
+        OLLAMA_URLS,
+        OLLAMA_TIMEOUT,
+        hedge_percentile=OLLAMA_HEDGE_PERCENTILE,
+        hedge_min_ms=OLLAMA_HEDGE_MIN_MS,
+        breaker_failures=OLLAMA_BREAKER_FAILURES,
+        breaker_cooldown_s=OLLAMA_BREAKER_COOLDOWN_S,
+        concurrency=OLLAMA_CONCURRENCY
+    )
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class EmbeddingEngine:
+    """Interface commune des moteurs d'embeddings"""
+
+    name = 'base'
+    default_model = ''
+    tunable = False  # réglages calibrables au démarrage (voir autotune.py)
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.dim: Optional[int] = None
+
+    def load(self):
+        """Charge et préchauffe le modèle"""
+
+    def embed(self, texts: List[str], timer: StageTimer, inline: bool = False) -> np.ndarray:
+        """Vecteurs normalisés L2 (une ligne par texte); `inline` impose l'exécution sur le thread courant"""
+        raise NotImplementedError
+
+    def health(self) -> Dict[str, Any]:
+        """Lève une exception si le moteur n'est pas opérationnel; retourne des détails éventuels"""
+        return {}
+
+    def info(self) -> Dict[str, Any]:
+        return {}
+
+    def configure(self, batch_size: Optional[int] = None, compile_mode: Optional[str] = None):
+        """Applique les réglages retenus par la calibration (moteurs locaux seulement)"""
+
+    def tuning(self) -> Dict[str, Any]:
+        """Réglages propres au moteur (taille de batch, compilation), vides pour un moteur distant"""
+        return {}
+
+    def close(self):
+        """Libère les ressources du moteur"""
+
+
+@register_engine('sentence-transformers')
+class SentenceTransformerEngine(EmbeddingEngine):
+    """Modèle sentence-transformers local, exécuté par étapes (pipeline) et optionnellement compilé"""
+
+    default_model = 'intfloat/multilingual-e5-large'
+    tunable = True
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        self.model = None
+        self.runner = None
+        self.pipeline = None
+        self.batch_size = ENCODE_BATCH_SIZE
+        self.compile_mode = COMPILE_MODE
+
+    def load(self):
+        from sentence_transformers import SentenceTransformer
+        from pipeline import StagedPipeline
+
+        logger.info(f"Chargement du modèle: {self.model_name}")
+        start_time = time.time()
+
+        self.model = SentenceTransformer(self.model_name)
+        self.model.eval()
+        self.dim = SUPPORTED_MODELS.get(self.model_name, self.model.get_sentence_embedding_dimension())
+
+        load_time = time.time() - start_time
+        logger.info(f"Modèle chargé en {load_time:.2f}s - Dimension: {self.dim}")
+
+        self.runner = self._build_runner()
+        if PIPELINE_ENABLED:
+            self.pipeline = StagedPipeline(self.stages(), queue_size=PIPELINE_QUEUE_SIZE)
+
+        # Test du modèle avec un texte simple
+        test_embedding = self.embed(["test"], StageTimer())
+        logger.info(f"Test réussi - Shape: {test_embedding.shape}")
+
+    def _build_runner(self):
+        """Prépare l'exécution du modèle (eager ou compilée par buckets selon le mode de compilation)"""
+        from compiled import BucketedRunner, batch_ladder, parse_buckets
+
+        model = self.model
+        input_names = list(model.tokenize(["test"]).keys())
+        tokenizer = model.tokenizer
+        runner = BucketedRunner(
+            _sentence_embedding_module(model, input_names),
+            input_names,
+            pad_values={'input_ids': tokenizer.pad_token_id or 0},
+            mode=self.compile_mode,
+            buckets=[bucket for bucket in parse_buckets(COMPILE_BUCKETS) if bucket <= model.max_seq_length]
+        )
+        runner.compile(len(tokenizer), batch_sizes=batch_ladder(self.batch_size), device=model.device)
+        return runner
+
+    def tokenize_stage(self, batch: List[str]):
+        from sentence_transformers.util import batch_to_device
+        return batch_to_device(self.model.tokenize(batch), self.model.device)
+
+    def forward_stage(self, features):
+        with torch.inference_mode():
+            return self.runner(features)
+
+    def normalize_stage(self, embeddings) -> np.ndarray:
+        return torch.nn.functional.normalize(embeddings, p=2, dim=1).cpu().numpy()
+
+    def stages(self):
+        return (
+            ("tokenize", self.tokenize_stage),
+            ("forward", self.forward_stage),
+            ("normalize", self.normalize_stage)
+        )
+
+    def embed(self, texts: List[str], timer: StageTimer, inline: bool = False) -> np.ndarray:
+        """Équivalent de model.encode(normalize_embeddings=True), chronométré par étape
+
+        Les batches passent dans le pipeline par étapes s'il est actif; avec `inline` (capture
+        torch.profiler en cours), ils sont traités sur le thread courant pour que la trace les contienne.
+        """
+        length_sorted_idx = np.argsort([-self.model._text_length(text) for text in texts])
+        sorted_texts = [texts[idx] for idx in length_sorted_idx]
+        batch_size = self.batch_size
+        batches = [sorted_texts[start:start + batch_size] for start in range(0, len(sorted_texts), batch_size)]
+
+        if self.pipeline is not None and not inline:
+            outputs, durations = self.pipeline.run(batches)
+            for batch_durations in durations:
+                for name, duration in batch_durations.items():
+                    timer.add(name, duration)
+        else:
+            outputs = []
+            for payload in batches:
+                for name, stage_fn in self.stages():
+                    with timer.stage(name):
+                        payload = stage_fn(payload)
+                outputs.append(payload)
+
+        embeddings = np.concatenate(outputs)
+        return embeddings[np.argsort(length_sorted_idx)]
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "supported_models": list(SUPPORTED_MODELS.keys()),
+            "max_seq_length": getattr(self.model, 'max_seq_length', 'unknown'),
+            "compile": self.runner.stats() if self.runner is not None else None,
+            "pipeline": self.pipeline.occupancy() if self.pipeline is not None else None
+        }
+
+    def configure(self, batch_size: Optional[int] = None, compile_mode: Optional[str] = None):
+        # Les formes compilées sont préchauffées pour batch_ladder(batch_size): tout changement reconstruit le runner
+        rebuild = compile_mode is not None and compile_mode != self.compile_mode
+        if batch_size is not None and batch_size != self.batch_size:
+            self.batch_size = batch_size
+            rebuild = rebuild or self.compile_mode != 'none'
+        if compile_mode is not None:
+            self.compile_mode = compile_mode
+        if rebuild and self.model is not None:
+            self.runner.compiled.clear()
+            self.runner = self._build_runner()
+
+    def tuning(self) -> Dict[str, Any]:
+        return {"batch_size": self.batch_size, "compile_mode": self.compile_mode}
+
+    def close(self):
+        if self.pipeline is not None:
+            self.pipeline.close()
+        if self.runner is not None:
+            self.runner.release()
+
+
+def _sentence_embedding_module(st_model, input_names: List[str]):
+    """Enveloppe traçable du SentenceTransformer: tenseurs positionnels -> sentence_embedding"""
+
+    class SentenceEmbeddingModule(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.st_model = st_model
+            self.input_names = input_names
+
+        def forward(self, *tensors):
+            return self.st_model(dict(zip(self.input_names, tensors)))['sentence_embedding']
+
+    return SentenceEmbeddingModule()
+
+
+@register_engine('ollama')
+class OllamaEngine(EmbeddingEngine):
+    """Embeddings calculés par un serveur Ollama (API /api/embeddings, un texte par appel)"""
+
+    default_model = 'nomic-embed-text:latest'
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        self.dim = 768  # nomic-embed-text dimension, mise à jour au premier appel
+        self.pool = create_ollama_pool()
+
+    def embed_one(self, text: str) -> List[float]:
+        try:
+            response = self.pool.post(
+                "/api/embeddings",
+                {
+                    "model": self.model_name,
+                    "prompt": text.strip()
+                }
+            )
+        except OllamaUnavailable as e:
+            raise EngineUnavailable(str(e))
+
+        if response.status_code != 200:
+            raise RuntimeError(f"Ollama embedding failed: {response.text}")
+
+        embedding_data = response.json()
+        if "embedding" not in embedding_data:
+            raise RuntimeError("Invalid embedding response from Ollama")
+
+        return embedding_data["embedding"]
+
+    def embed(self, texts: List[str], timer: StageTimer, inline: bool = False) -> np.ndarray:
+        with timer.stage("ollama"):
+            vectors = self.pool.map(self.embed_one, texts)
+
+        with timer.stage("normalize"):
+            embeddings = l2_normalize(np.asarray(vectors, dtype=np.float32))
+        self.dim = embeddings.shape[1]
+        return embeddings
+
+    def health(self) -> Dict[str, Any]:
+        try:
+            endpoints = self.pool.health()
+        except OllamaUnavailable as e:
+            raise EngineUnavailable(str(e))
+        return {"ollama_urls": self.pool.urls, "ollama_endpoints": endpoints}
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "ollama_urls": self.pool.urls,
+            "ollama": self.pool.stats(),
+            "type": "real_embedding"
+        }
+
+    def close(self):
+        self.pool.close()
+
+
+@register_engine('mock')
+class RandomEngine(EmbeddingEngine):
+    """Vecteurs pseudo-aléatoires normalisés de dimension 1024, pour les tests sans modèle
+
+    Le vecteur d'un texte est tiré d'un générateur initialisé par le hash du texte: il est
+    stable d'un appel et d'un redémarrage à l'autre (recherche dans un index persistant).
+    """
+
+    default_model = 'mock-embedder'
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        self.dim = 1024
+
+    def embed(self, texts: List[str], timer: StageTimer, inline: bool = False) -> np.ndarray:
+        with timer.stage("generate"):
+            vectors = [
+                np.random.default_rng(zlib.crc32(text.encode('utf-8'))).normal(0, 0.1, size=self.dim)
+                for text in texts
+            ]
+            return l2_normalize(np.stack(vectors))
+
+    def info(self) -> Dict[str, Any]:
+        return {"max_seq_length": 512}
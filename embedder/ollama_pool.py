@@ -0,0 +1,280 @@
+"""
+Appels à plusieurs serveurs Ollama: sélection selon la latence, requêtes couvertes et disjoncteurs
+
+Chaque appel part vers l'endpoint dont la latence attendue (moyenne glissante multipliée par
+le nombre d'appels en cours + 1) est la plus faible. Si la réponse tarde au-delà du
+percentile `hedge_percentile` des latences récentes, une copie est envoyée à un second
+endpoint et la première réponse valide l'emporte: un serveur lent ou bloqué ne retient plus
+les requêtes au-delà de ce seuil. Après `breaker_failures` échecs consécutifs (erreur réseau,
+délai dépassé, réponse 5xx), le disjoncteur de l'endpoint s'ouvre: il est écarté pendant
+`breaker_cooldown_s`, puis un seul appel d'essai décide de sa réintégration.
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaUnavailable(Exception):
+    """Aucun endpoint Ollama n'a pu répondre"""
+
+
+class CircuitBreaker:
+    """Disjoncteur fermé / ouvert / semi-ouvert (un seul appel d'essai après le délai de refroidissement)"""
+
+    def __init__(self, failure_threshold: int, cooldown_s: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Vrai si un appel peut être envoyé, sans le réserver"""
+        with self._lock:
+            if self.state == 'open':
+                return time.monotonic() - self.opened_at >= self.cooldown_s
+            return self.state == 'closed'
+
+    def acquire(self) -> bool:
+        """Réserve un appel; en semi-ouvert, seul l'appel d'essai passe"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.cooldown_s:
+                self.state = 'half_open'
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self) -> bool:
+        """Compte un échec; retourne True si le disjoncteur vient de s'ouvrir"""
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self.trips += 1
+                return True
+            return False
+
+
+class Endpoint:
+    """Un serveur Ollama, sa session HTTP, son disjoncteur et ses latences récentes"""
+
+    def __init__(self, url: str, breaker: CircuitBreaker, window: int = 512, ewma_alpha: float = 0.2):
+        self.url = url.rstrip('/')
+        self.breaker = breaker
+        self.session = requests.Session()
+        self.latencies: deque = deque(maxlen=window)
+        self.ewma_ms: Optional[float] = None
+        self.ewma_alpha = ewma_alpha
+        self.inflight = 0
+        self.requests = 0
+        self.errors = 0
+        self.hedges = 0  # copies envoyées à cet endpoint
+        self.hedges_won = 0
+
+    def expected_ms(self) -> float:
+        """Latence attendue d'un nouvel appel (0 tant qu'aucune mesure: l'endpoint est essayé en priorité)"""
+        return (self.ewma_ms or 0.0) * (self.inflight + 1)
+
+    def observe(self, latency_ms: float):
+        self.latencies.append(latency_ms)
+        self.ewma_ms = latency_ms if self.ewma_ms is None else self.ewma_alpha * latency_ms + (1 - self.ewma_alpha) * self.ewma_ms
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = np.array(self.latencies)
+        return {
+            "url": self.url,
+            "state": self.breaker.state,
+            "trips": self.breaker.trips,
+            "inflight": self.inflight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "hedges": self.hedges,
+            "hedges_won": self.hedges_won,
+            "latency_ms": {
+                "ewma": round(self.ewma_ms, 3),
+                "p50": round(float(np.percentile(latencies, 50)), 3),
+                "p95": round(float(np.percentile(latencies, 95)), 3),
+                "p99": round(float(np.percentile(latencies, 99)), 3)
+            } if latencies.size else None
+        }
+
+
+class OllamaPool:
+    """Répartit les appels Ollama sur plusieurs endpoints avec couverture et disjoncteurs"""
+
+    def __init__(self, urls: Sequence[str], timeout: float, hedge_percentile: float = 95.0, hedge_min_ms: float = 50.0,
+                 hedge_min_samples: int = 20, breaker_failures: int = 5, breaker_cooldown_s: float = 30.0, concurrency: int = 0):
+        if not urls:
+            raise ValueError("Aucun endpoint Ollama configuré")
+        self.endpoints = [Endpoint(url, CircuitBreaker(breaker_failures, breaker_cooldown_s)) for url in urls]
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_ms = hedge_min_ms
+        self.hedge_min_samples = hedge_min_samples
+        self.concurrency = concurrency or len(self.endpoints)
+        # Latences vues par l'appelant (réponse gagnante), pour le seuil de couverture: les appels
+        # perdants d'un endpoint bloqué n'y entrent pas et ne relèvent donc pas le seuil
+        self._recent: deque = deque(maxlen=512)
+        self._lock = threading.Lock()
+        # Appels unitaires (copies comprises) et lots d'appels: deux exécuteurs pour qu'un lot ne bloque jamais ses propres appels
+        self._calls = ThreadPoolExecutor(max_workers=4 * self.concurrency + 2 * len(self.endpoints), thread_name_prefix="ollama-call")
+        self._batches = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="ollama-batch")
+
+    @property
+    def urls(self) -> List[str]:
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def hedge_delay_s(self) -> Optional[float]:
+        """Délai avant l'envoi d'une copie (percentile des latences récentes), None sans historique suffisant"""
+        with self._lock:
+            if len(self._recent) < self.hedge_min_samples:
+                return None
+            threshold = float(np.percentile(np.array(self._recent), self.hedge_percentile))
+        return max(threshold, self.hedge_min_ms) / 1000
+
+    def _select(self, exclude: set) -> Optional[Endpoint]:
+        """Endpoint disponible de plus faible latence attendue, réservé auprès de son disjoncteur"""
+        with self._lock:
+            candidates = sorted(
+                (endpoint for endpoint in self.endpoints if endpoint.url not in exclude and endpoint.breaker.available()),
+                key=lambda endpoint: (endpoint.expected_ms(), endpoint.inflight)
+            )
+        for endpoint in candidates:
+            if endpoint.breaker.acquire():
+                with self._lock:
+                    endpoint.inflight += 1
+                    endpoint.requests += 1
+                return endpoint
+        return None
+
+    def _call(self, endpoint: Endpoint, method: str, path: str, payload: Optional[Dict[str, Any]]) -> requests.Response:
+        """Un appel à `endpoint` (déjà compté en cours par _select); 5xx et erreurs réseau comptent comme échecs"""
+        start = time.perf_counter()
+        try:
+            response = endpoint.session.request(method, f"{endpoint.url}{path}", json=payload, timeout=self.timeout)
+            if response.status_code >= 500:
+                raise OllamaUnavailable(f"{endpoint.url}: HTTP {response.status_code} {response.text[:200]}")
+        except (requests.exceptions.RequestException, OllamaUnavailable) as e:
+            with self._lock:
+                endpoint.errors += 1
+            if endpoint.breaker.record_failure():
+                logger.warning(f"Disjoncteur ouvert pour {endpoint.url} ({endpoint.breaker.failures} échecs consécutifs): {e}")
+            raise
+        finally:
+            with self._lock:
+                endpoint.inflight -= 1
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        endpoint.breaker.record_success()
+        with self._lock:
+            endpoint.observe(latency_ms)
+        return response
+
+    def request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> requests.Response:
+        """Premier résultat valide parmi l'appel principal, sa copie éventuelle et les reprises après échec
+
+        Les réponses 4xx (modèle inconnu par exemple) sont retournées telles quelles à l'appelant.
+        """
+        start = time.perf_counter()
+        tried = set()
+        pending: Dict[Any, Endpoint] = {}
+        errors: List[str] = []
+        hedge = None
+
+        def launch():
+            endpoint = self._select(tried)
+            if endpoint is None:
+                return None
+            tried.add(endpoint.url)
+            future = self._calls.submit(self._call, endpoint, method, path, payload)
+            pending[future] = endpoint
+            return future
+
+        if launch() is None:
+            raise OllamaUnavailable(f"Aucun endpoint Ollama disponible (disjoncteurs ouverts): {', '.join(self.urls)}")
+
+        while pending:
+            delay = self.hedge_delay_s() if hedge is None else None
+            done, _ = wait(list(pending), timeout=delay, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # Réponse plus lente que le percentile des latences récentes: copie vers un second endpoint
+                hedge = launch() or False
+                if hedge:
+                    with self._lock:
+                        pending[hedge].hedges += 1
+                continue
+
+            for future in done:
+                endpoint = pending.pop(future)
+                try:
+                    response = future.result()
+                except (requests.exceptions.RequestException, OllamaUnavailable) as e:
+                    errors.append(f"{endpoint.url}: {e}")
+                    continue
+                with self._lock:
+                    if future is hedge:
+                        endpoint.hedges_won += 1
+                    self._recent.append((time.perf_counter() - start) * 1000)
+                return response
+
+            # Échec sans autre appel en cours: reprise immédiate sur un autre endpoint
+            if not pending:
+                launch()
+
+        raise OllamaUnavailable(f"Ollama service unavailable: {'; '.join(errors)}")
+
+    def post(self, path: str, payload: Dict[str, Any]) -> requests.Response:
+        return self.request("POST", path, payload)
+
+    def map(self, function: Callable[[Any], Any], items: Sequence[Any]) -> List[Any]:
+        """`function` appliquée à chaque élément, jusqu'à `concurrency` appels simultanés, dans l'ordre"""
+        if self.concurrency <= 1 or len(items) <= 1:
+            return [function(item) for item in items]
+        return list(self._batches.map(function, items))
+
+    def health(self) -> Dict[str, Any]:
+        """État de chaque endpoint (/api/tags); OllamaUnavailable si aucun ne répond"""
+        statuses = {}
+        for endpoint in self.endpoints:
+            try:
+                response = endpoint.session.get(f"{endpoint.url}/api/tags", timeout=5)
+                statuses[endpoint.url] = "ok" if response.status_code == 200 else f"HTTP {response.status_code}"
+            except requests.exceptions.RequestException as e:
+                statuses[endpoint.url] = type(e).__name__
+        if "ok" not in statuses.values():
+            raise OllamaUnavailable("Ollama not accessible")
+        return statuses
+
+    def stats(self) -> Dict[str, Any]:
+        delay = self.hedge_delay_s()
+        return {
+            "endpoints": [endpoint.stats() for endpoint in self.endpoints],
+            "hedge_percentile": self.hedge_percentile,
+            "hedge_delay_ms": round(delay * 1000, 3) if delay is not None else None,
+            "concurrency": self.concurrency
+        }
+
+    def close(self):
+        self._batches.shutdown(wait=False)
+        self._calls.shutdown(wait=False)
+        for endpoint in self.endpoints:
+            endpoint.session.close()
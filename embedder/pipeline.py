@@ -0,0 +1,136 @@
+"""
+Pipeline d'inférence par étapes reliées par des files bornées
+
+Chaque étape (tokenisation, forward, post-traitement) tourne sur son propre thread:
+le batch n+1 est tokenisé pendant que le batch n passe dans le modèle. Les files
+bornées limitent le nombre de batches en vol (backpressure).
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Batch:
+    """Batch en transit dans le pipeline, avec les durées de chaque étape"""
+
+    __slots__ = ('index', 'payload', 'error', 'durations', 'job')
+
+    def __init__(self, index: int, payload: Any, job: '_Job'):
+        self.index = index
+        self.payload = payload
+        self.error: Optional[BaseException] = None
+        self.durations: Dict[str, float] = {}
+        self.job = job
+
+
+class _Job:
+    """Ensemble des batches d'un appel à run(), terminé quand tous sont sortis du pipeline"""
+
+    def __init__(self, size: int):
+        self.results: List[Optional[_Batch]] = [None] * size
+        self.remaining = size
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        if size == 0:
+            self.done.set()
+
+    def complete(self, batch: _Batch):
+        with self.lock:
+            self.results[batch.index] = batch
+            self.remaining -= 1
+            if self.remaining == 0:
+                self.done.set()
+
+
+class _StageStats:
+    def __init__(self):
+        self.busy_s = 0.0
+        self.batches = 0
+        self.errors = 0
+
+
+class StagedPipeline:
+    """Enchaîne des fonctions `payload -> payload` sur des threads dédiés"""
+
+    def __init__(self, stages: Sequence[Tuple[str, Callable[[Any], Any]]], queue_size: int = 2):
+        self.stage_names = [name for name, _ in stages]
+        self.queues: List[queue.Queue] = [queue.Queue(maxsize=max(queue_size, 1)) for _ in stages]
+        self.stats = {name: _StageStats() for name in self.stage_names}
+        self.started_at = time.perf_counter()
+        self.threads = []
+        for position, (name, fn) in enumerate(stages):
+            thread = threading.Thread(
+                target=self._stage_loop,
+                args=(position, name, fn),
+                name=f"pipeline-{name}",
+                daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def _stage_loop(self, position: int, name: str, fn: Callable[[Any], Any]):
+        inbox = self.queues[position]
+        outbox = self.queues[position + 1] if position + 1 < len(self.queues) else None
+        stats = self.stats[name]
+
+        while True:
+            batch = inbox.get()
+            if batch is None:
+                if outbox is not None:
+                    outbox.put(None)
+                return
+
+            if batch.error is None:
+                start = time.perf_counter()
+                try:
+                    batch.payload = fn(batch.payload)
+                except Exception as e:
+                    batch.error = e
+                    stats.errors += 1
+                duration = time.perf_counter() - start
+                batch.durations[name] = duration * 1000
+                stats.busy_s += duration
+                stats.batches += 1
+
+            if outbox is not None:
+                outbox.put(batch)
+            else:
+                batch.job.complete(batch)
+
+    def run(self, payloads: Sequence[Any]) -> Tuple[List[Any], List[Dict[str, float]]]:
+        """Fait passer les payloads dans toutes les étapes; retourne les résultats dans l'ordre
+        et les durées (ms) par étape de chaque batch. Relève la première erreur rencontrée."""
+        job = _Job(len(payloads))
+        for index, payload in enumerate(payloads):
+            self.queues[0].put(_Batch(index, payload, job))
+        job.done.wait()
+
+        for batch in job.results:
+            if batch.error is not None:
+                raise batch.error
+        return [batch.payload for batch in job.results], [batch.durations for batch in job.results]
+
+    def close(self):
+        """Arrête les threads après vidage des files"""
+        self.queues[0].put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def occupancy(self) -> Dict[str, Any]:
+        """Taux d'occupation de chaque étape depuis le démarrage et profondeur des files"""
+        elapsed = max(time.perf_counter() - self.started_at, 1e-9)
+        return {
+            name: {
+                "busy_pct": round(100 * self.stats[name].busy_s / elapsed, 2),
+                "busy_s": round(self.stats[name].busy_s, 3),
+                "batches": self.stats[name].batches,
+                "errors": self.stats[name].errors,
+                "queue_depth": self.queues[position].qsize()
+            }
+            for position, name in enumerate(self.stage_names)
+        }
@@ -0,0 +1,259 @@
+"""
+Profilage à la demande et en-tête Server-Timing
+
+- StageTimer: chronomètre les étapes d'une requête (tokenisation, forward, sérialisation)
+- ProfileCapture: capture un profil CPU échantillonné ou des traces torch.profiler
+  pour les N prochaines requêtes ou pendant T secondes, téléchargeable ensuite
+"""
+
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import logging
+import zipfile
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Type
+
+import numpy as np
+from fastapi import Response
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('cpu', 'torch')
+
+# Feuilles de pile correspondant à une attente (E/S, verrou, file vide), exclues des échantillons
+IDLE_FRAMES = {
+    ('selectors.py', 'select'),
+    ('threading.py', 'wait'),
+    ('queue.py', 'get'),
+    ('thread.py', '_worker'),
+}
+
+
+class StageTimer:
+    """Chronomètre les étapes d'une requête, cumulées par nom dans l'ordre d'apparition"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def add(self, name: str, duration_ms: float):
+        self.stages[name] = self.stages.get(name, 0.0) + duration_ms
+
+    def merge(self, other: 'StageTimer'):
+        for name, duration in other.stages.items():
+            self.add(name, duration)
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def header(self) -> str:
+        """Valeur de l'en-tête Server-Timing (durées en millisecondes)"""
+        parts = [f"{name};dur={duration:.2f}" for name, duration in self.stages.items()]
+        parts.append(f"total;dur={self.total_ms():.2f}")
+        return ", ".join(parts)
+
+
+def timed_json_response(response_model: Type[BaseModel], payload: Dict[str, Any], timer: StageTimer, server_timing: bool) -> Response:
+    """Valide `payload` avec `response_model` et le sérialise en JSON, le tout dans la seule étape
+    'serialize' (conversion des tableaux numpy comprise), puis ajoute l'en-tête Server-Timing si activé
+
+    La réponse est construite ici plutôt que par FastAPI pour que l'en-tête couvre la sérialisation;
+    la validation par le modèle déclaré (response_model de la route) est conservée.
+    """
+    with timer.stage("serialize"):
+        values = {key: value.tolist() if isinstance(value, np.ndarray) else value for key, value in payload.items()}
+        content = response_model.model_validate(values).model_dump_json(exclude_unset=True)
+    headers = {"Server-Timing": timer.header()} if server_timing else None
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+class ProfileCapture:
+    """Capture de profil bornée en nombre de requêtes et/ou en durée
+
+    Mode 'cpu': un thread échantillonne les piles de tous les threads pendant qu'une
+    requête est en cours; l'artefact est au format folded (flamegraph.pl, speedscope).
+    Mode 'torch': chaque exécution du moteur est tracée avec torch.profiler sur le thread
+    qui l'exécute (voir trace()); l'artefact est une archive zip de traces Chrome
+    (chrome://tracing, Perfetto).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = False
+        self.mode: Optional[str] = None
+        self.max_requests: Optional[int] = None
+        self.deadline: Optional[float] = None
+        self.interval_s = 0.005
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.requests_seen = 0
+        self.samples_taken = 0
+        self.artifact: Optional[bytes] = None
+        self.artifact_name: Optional[str] = None
+        self.artifact_media_type: Optional[str] = None
+        self._inflight = 0
+        self._stacks: Counter = Counter()
+        self._traces: list = []
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, mode: str, max_requests: Optional[int], seconds: Optional[float], interval_ms: float):
+        """Démarre une capture; lève RuntimeError si une capture est déjà en cours"""
+        with self._lock:
+            if self.active:
+                raise RuntimeError("Capture de profil déjà en cours")
+            if mode == 'torch':
+                import torch.profiler  # noqa: F401  (échoue tôt si torch est absent)
+            self.active = True
+            self.mode = mode
+            self.max_requests = max_requests
+            self.deadline = time.time() + seconds if seconds else None
+            self.interval_s = max(interval_ms, 1.0) / 1000
+            self.started_at = time.time()
+            self.finished_at = None
+            self.requests_seen = 0
+            self.samples_taken = 0
+            self.artifact = None
+            self.artifact_name = None
+            self.artifact_media_type = None
+            self._stacks = Counter()
+            self._traces = []
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._run, name="profile-capture", daemon=True)
+            self._thread.start()
+        logger.info(f"Capture de profil démarrée: mode={mode}, requêtes={max_requests}, durée={seconds}")
+
+    def stop(self):
+        """Termine la capture en cours et construit l'artefact"""
+        with self._lock:
+            if not self.active:
+                return
+            self.active = False
+            self._stop_event.set()
+            self.finished_at = time.time()
+            if self.mode == 'cpu':
+                self._build_folded_artifact()
+            else:
+                self._build_trace_archive()
+        logger.info(f"Capture de profil terminée: {self.requests_seen} requêtes, artefact {self.artifact_name}")
+
+    @property
+    def torch_tracing(self) -> bool:
+        """Vrai si une capture torch.profiler est en cours (les ops doivent rester sur le thread tracé)"""
+        return self.active and self.mode == 'torch'
+
+    @contextmanager
+    def track(self):
+        """Enveloppe le traitement d'une requête pour la capture en cours (sans effet sinon)"""
+        if not self.active:
+            yield
+            return
+
+        with self._lock:
+            self._inflight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._inflight -= 1
+                self.requests_seen += 1
+                done = self.max_requests is not None and self.requests_seen >= self.max_requests
+            if done:
+                self.stop()
+
+    @contextmanager
+    def trace(self):
+        """Trace torch.profiler du travail exécuté sur le thread courant (sans effet hors mode 'torch')"""
+        if not self.torch_tracing:
+            yield
+            return
+
+        from torch.profiler import profile, ProfilerActivity
+
+        with profile(activities=[ProfilerActivity.CPU], record_shapes=True) as prof:
+            yield
+        fd, path = tempfile.mkstemp(suffix=".json", prefix="torch-trace-")
+        os.close(fd)
+        try:
+            prof.export_chrome_trace(path)
+            with open(path, 'rb') as trace_file:
+                trace = trace_file.read()
+        finally:
+            os.unlink(path)
+        with self._lock:
+            if self.active:
+                self._traces.append(trace)
+
+    def _run(self):
+        """Boucle d'échantillonnage (mode cpu) et de surveillance de l'échéance"""
+        own_ident = threading.get_ident()
+        while not self._stop_event.wait(self.interval_s):
+            if self.deadline is not None and time.time() >= self.deadline:
+                self.stop()
+                return
+            if self.mode == 'cpu' and self._inflight > 0:
+                self._sample(own_ident)
+
+    def _sample(self, own_ident: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = Counter()
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            stacks[";".join(reversed(stack))] += 1
+        with self._lock:
+            if self.active:
+                self._stacks.update(stacks)
+                self.samples_taken += 1
+
+    def _build_folded_artifact(self):
+        lines = [f"{stack} {count}" for stack, count in self._stacks.most_common()]
+        self.artifact = ("\n".join(lines) + "\n").encode()
+        self.artifact_name = f"profile-{int(self.started_at)}.folded"
+        self.artifact_media_type = "text/plain"
+
+    def _build_trace_archive(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for i, trace in enumerate(self._traces):
+                archive.writestr(f"trace-{i:04d}.json", trace)
+        self.artifact = buffer.getvalue()
+        self.artifact_name = f"torch-traces-{int(self.started_at)}.zip"
+        self.artifact_media_type = "application/zip"
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "mode": self.mode,
+            "max_requests": self.max_requests,
+            "deadline": self.deadline,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "requests_seen": self.requests_seen,
+            "samples_taken": self.samples_taken,
+            "artifact": self.artifact_name,
+            "artifact_bytes": len(self.artifact) if self.artifact is not None else 0
+        }
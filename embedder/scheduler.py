@@ -0,0 +1,130 @@
+"""
+Ordonnanceur de batches partagé par tous les moteurs
+
+Les éléments des requêtes concurrentes sont regroupés en un seul appel au moteur
+(jusqu'à `max_batch_items` éléments, en attendant au plus `max_wait_ms` après le
+premier). Le moteur est exécuté hors de la boucle d'événements, `workers` batches à la
+fois (un par défaut): avec max_wait_ms = 0, les requêtes arrivées pendant un batch forment
+le suivant.
+Seules les requêtes de même clé (le moteur qui les sert) partagent un batch.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, List, Optional, Sequence
+
+from starlette.concurrency import run_in_threadpool
+
+from profiling import StageTimer
+
+
+class _Job:
+    __slots__ = ('items', 'timer', 'key', 'future', 'enqueued_at')
+
+    def __init__(self, items: Sequence[Any], timer: StageTimer, key: Any, future: asyncio.Future):
+        self.items = items
+        self.timer = timer
+        self.key = key
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class BatchScheduler:
+    """Regroupe les requêtes concurrentes en batches pour `process(items, timer, key) -> résultats`"""
+
+    def __init__(self, process: Callable[[List[Any], StageTimer, Any], Sequence[Any]], max_batch_items: int = 64, max_wait_ms: float = 0.0,
+                 workers: int = 1):
+        self.process = process
+        self.max_batch_items = max_batch_items
+        self.max_wait_s = max_wait_ms / 1000
+        self.workers = workers  # pris en compte au démarrage des workers (première requête)
+        self.batches = 0
+        self.items = 0
+        self.coalesced_requests = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._deferred: deque = deque()  # jobs d'une autre clé, repris aux batches suivants
+
+    async def submit(self, items: Sequence[Any], timer: StageTimer, key: Any = None) -> List[Any]:
+        """Soumet les éléments d'une requête et attend leurs résultats (dans le même ordre)"""
+        if not items:
+            return []
+        loop = asyncio.get_running_loop()
+        if not self._workers or any(worker.done() for worker in self._workers) or self._loop is not loop:
+            if self._loop is loop:
+                for worker in self._workers:
+                    worker.cancel()
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._deferred.clear()
+            self._workers = [loop.create_task(self._run()) for _ in range(max(self.workers, 1))]
+
+        job = _Job(items, timer, key, loop.create_future())
+        await self._queue.put(job)
+        return await job.future
+
+    async def _collect(self) -> List[_Job]:
+        first = self._deferred.popleft() if self._deferred else await self._queue.get()
+        jobs = [first]
+        count = len(first.items)
+        deadline = time.perf_counter() + self.max_wait_s
+
+        while count < self.max_batch_items:
+            if not self._queue.empty():
+                job = self._queue.get_nowait()
+            else:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    job = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if job.key is not first.key:
+                self._deferred.append(job)
+                continue
+            jobs.append(job)
+            count += len(job.items)
+
+        return jobs
+
+    async def _run(self):
+        while True:
+            jobs = await self._collect()
+            items = [item for job in jobs for item in job.items]
+            started = time.perf_counter()
+            batch_timer = StageTimer()
+
+            try:
+                results = await run_in_threadpool(self.process, items, batch_timer, jobs[0].key)
+            except Exception as e:
+                for job in jobs:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(items)
+            self.coalesced_requests += len(jobs) - 1
+
+            offset = 0
+            for job in jobs:
+                job.timer.add("queue", (started - job.enqueued_at) * 1000)
+                job.timer.merge(batch_timer)
+                if not job.future.done():
+                    job.future.set_result(list(results[offset:offset + len(job.items)]))
+                offset += len(job.items)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_items": round(self.items / self.batches, 2) if self.batches else None,
+            "coalesced_requests": self.coalesced_requests,
+            "queue_depth": (self._queue.qsize() if self._queue is not None else 0) + len(self._deferred),
+            "max_batch_items": self.max_batch_items,
+            "workers": self.workers,
+            "max_wait_ms": self.max_wait_s * 1000
+        }
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Passerelle de répartition pour Regalica Notebook
+Se place devant N réplicas d'un même microservice (embedder ou reranker, choisi par
+GATEWAY_SERVICE) et expose la même API: chaque requête est routée par hachage cohérent
+de ses textes (caches des réplicas chauds) à charge bornée, les réplicas défaillants sont
+éjectés puis réintégrés par les contrôles de santé, et les métriques sont agrégées.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+import uvicorn
+
+from router import Replica, ReplicaPool, hash_key
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Configuration
+GATEWAY_SERVICE = os.getenv('GATEWAY_SERVICE', 'embedder')  # embedder | reranker
+# Réplica par défaut: le service de la composition Docker correspondant à GATEWAY_SERVICE
+DEFAULT_REPLICAS = {'embedder': 'http://embedder:8000', 'reranker': 'http://reranker:8001'}
+GATEWAY_REPLICAS = [url.strip() for url in os.getenv('GATEWAY_REPLICAS', DEFAULT_REPLICAS.get(GATEWAY_SERVICE, '')).split(',') if url.strip()]
+GATEWAY_TIMEOUT_S = float(os.getenv('GATEWAY_TIMEOUT_S', 60))
+GATEWAY_HEALTH_INTERVAL_S = float(os.getenv('GATEWAY_HEALTH_INTERVAL_S', 5))
+GATEWAY_EJECT_AFTER = int(os.getenv('GATEWAY_EJECT_AFTER', 3))
+GATEWAY_LOAD_FACTOR = float(os.getenv('GATEWAY_LOAD_FACTOR', 1.25))
+GATEWAY_VIRTUAL_NODES = int(os.getenv('GATEWAY_VIRTUAL_NODES', 64))
+HOST = os.getenv('HOST', '0.0.0.0')
+PORT = int(os.getenv('PORT', 8000))
+
+# En-têtes des réponses des réplicas transmis au client
+FORWARDED_HEADERS = ('server-timing',)
+
+# Application FastAPI
+app = FastAPI(
+    title=f"Regalica Gateway ({GATEWAY_SERVICE})",
+    description="Passerelle de répartition devant les réplicas d'un microservice",
+    version="1.0.0"
+)
+
+pool = ReplicaPool(GATEWAY_REPLICAS, GATEWAY_VIRTUAL_NODES, GATEWAY_LOAD_FACTOR, GATEWAY_EJECT_AFTER)
+client: Optional[httpx.AsyncClient] = None
+health_task: Optional[asyncio.Task] = None
+
+
+def record_failure(replica: Replica, error: str):
+    if pool.record_failure(replica, error):
+        logger.warning(f"Réplica {replica.url} éjecté après {replica.failures} échecs consécutifs: {error}")
+
+
+def record_success(replica: Replica):
+    if not replica.healthy:
+        logger.info(f"Réplica {replica.url} réintégré")
+    pool.record_success(replica)
+
+
+async def forward(method: str, path: str, key: Optional[int] = None, weight: int = 1, body: Any = None,
+                  headers: Optional[Dict[str, str]] = None, sticky: bool = False) -> httpx.Response:
+    """Envoie la requête au réplica choisi pour `key`; en cas d'échec réseau ou de 503, au suivant
+
+    `sticky` impose le propriétaire de la clé sur l'anneau complet, sans débordement ni repli
+    (index vectoriels, qui n'existent que sur leur réplica): s'il est éjecté ou échoue, 503.
+    """
+    tried = set()
+    while len(tried) < len(pool.replicas):
+        if sticky:
+            replica = pool.home(key)
+            if not replica.healthy or replica.url in tried:
+                raise HTTPException(status_code=503, detail=f"Réplica propriétaire indisponible: {replica.url}")
+        else:
+            replica = pool.pick(key, weight, exclude=tried)
+            if replica is None:
+                break
+        tried.add(replica.url)
+
+        try:
+            with pool.track(replica, weight):
+                response = await client.request(method, f"{replica.url}{path}", json=body, headers=headers)
+        except httpx.TransportError as e:
+            record_failure(replica, f"{type(e).__name__}: {e}")
+            continue
+
+        if response.status_code == 503:
+            # Modèle non chargé ou backend du moteur indisponible sur ce réplica
+            record_failure(replica, response.text[:200])
+            continue
+
+        record_success(replica)
+        return response
+
+    raise HTTPException(status_code=503, detail="Aucun réplica disponible")
+
+
+def relay(response: httpx.Response) -> Response:
+    """Réponse du réplica telle quelle (statut, corps, en-têtes de diagnostic)"""
+    headers = {name: response.headers[name] for name in FORWARDED_HEADERS if name in response.headers}
+    return Response(
+        content=response.content,
+        status_code=response.status_code,
+        media_type=response.headers.get('content-type'),
+        headers=headers
+    )
+
+
+async def json_body(request: Request) -> Dict[str, Any]:
+    """Corps JSON de la requête; 422 s'il est illisible ou n'est pas un objet, comme les réplicas"""
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=422, detail=f"Corps JSON invalide: {e}")
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=422, detail="Le corps de la requête doit être un objet JSON")
+    return body
+
+
+def admin_headers(request: Request) -> Dict[str, str]:
+    token = request.headers.get('x-admin-token')
+    return {'X-Admin-Token': token} if token else {}
+
+
+async def broadcast(method: str, path: str, body: Any = None, headers: Optional[Dict[str, str]] = None,
+                    timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+    """Même requête à tous les réplicas, éjectés compris: {url: {status_code, body, healthy}}
+
+    Un réplica injoignable apparaît avec le statut 502 et le détail de l'erreur.
+    """
+    async def call(replica: Replica):
+        try:
+            response = await client.request(method, f"{replica.url}{path}", json=body, headers=headers,
+                                            timeout=timeout or GATEWAY_TIMEOUT_S)
+            result = {"status_code": response.status_code, "body": response.json()}
+        except (httpx.TransportError, ValueError) as e:
+            result = {"status_code": 502, "body": {"detail": f"{type(e).__name__}: {e}"}}
+        return {**result, "healthy": replica.healthy}
+
+    results = await asyncio.gather(*(call(replica) for replica in pool.replicas))
+    return {replica.url: result for replica, result in zip(pool.replicas, results)}
+
+
+async def check_health():
+    """Contrôle de santé périodique: éjecte les réplicas défaillants, réintègre ceux rétablis"""
+    async def check(replica: Replica):
+        try:
+            response = await client.get(f"{replica.url}/health", timeout=min(GATEWAY_HEALTH_INTERVAL_S, 5.0))
+        except httpx.TransportError as e:
+            record_failure(replica, f"{type(e).__name__}: {e}")
+            return
+        if response.status_code == 200:
+            record_success(replica)
+        else:
+            record_failure(replica, f"/health: HTTP {response.status_code}")
+
+    while True:
+        await asyncio.gather(*(check(replica) for replica in pool.replicas))
+        await asyncio.sleep(GATEWAY_HEALTH_INTERVAL_S)
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Initialisation au démarrage"""
+    global client, health_task
+    logger.info(f"Démarrage de la passerelle {GATEWAY_SERVICE} devant {len(pool.replicas)} réplicas: {', '.join(r.url for r in pool.replicas)}")
+    client = httpx.AsyncClient(timeout=GATEWAY_TIMEOUT_S, limits=httpx.Limits(max_connections=None, max_keepalive_connections=64))
+    health_task = asyncio.create_task(check_health())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if health_task is not None:
+        health_task.cancel()
+    if client is not None:
+        await client.aclose()
+
+
+@app.get("/health")
+async def health_check():
+    """Santé de la passerelle: au moins un réplica sain"""
+    healthy = len(pool.healthy())
+    if not healthy:
+        raise HTTPException(status_code=503, detail="Aucun réplica disponible")
+
+    return {
+        "status": "healthy",
+        "service": GATEWAY_SERVICE,
+        "replicas": len(pool.replicas),
+        "healthy_replicas": healthy,
+        "timestamp": time.time()
+    }
+
+
+@app.get("/info")
+async def service_info():
+    """Informations sur le modèle (d'un réplica sain) et sur la passerelle"""
+    response = await forward("GET", "/info")
+    if response.status_code != 200:
+        return relay(response)
+
+    return {**response.json(), "gateway": {"service": GATEWAY_SERVICE, "replicas": len(pool.replicas)}}
+
+
+@app.get("/metrics")
+async def service_metrics():
+    """Métriques de chaque réplica, compteurs et caches agrégés, routage de la passerelle"""
+    per_replica = await broadcast("GET", "/metrics", timeout=5.0)
+    snapshots = [result["body"] for result in per_replica.values() if result["status_code"] == 200]
+
+    counters: Dict[str, int] = {}
+    caches: Dict[str, Dict[str, int]] = {}
+    for snapshot in snapshots:
+        for name, value in snapshot.get("counters", {}).items():
+            counters[name] = counters.get(name, 0) + value
+        for cache_name in ("cache", "semantic_cache"):
+            stats = snapshot.get(cache_name)
+            if stats:
+                total = caches.setdefault(cache_name, {"entries": 0, "hits": 0, "misses": 0})
+                for field in total:
+                    total[field] += stats.get(field) or 0
+    for total in caches.values():
+        lookups = total["hits"] + total["misses"]
+        total["hit_rate"] = round(total["hits"] / lookups, 4) if lookups else None
+
+    return {
+        "service": GATEWAY_SERVICE,
+        "counters": counters,
+        **caches,
+        "gateway": pool.stats(),
+        "replicas": {url: result["body"] for url, result in per_replica.items()}
+    }
+
+
+@app.post("/admin/model")
+async def swap_model(request: Request):
+    """Remplacement à chaud du modèle sur tous les réplicas, éjectés compris
+
+    202 si tous ont démarré la bascule; sinon le statut du premier échec, avec la liste
+    des réplicas en échec (à relancer une fois rétablis).
+    """
+    results = await broadcast("POST", "/admin/model", body=await json_body(request), headers=admin_headers(request))
+    failed = {url: result["status_code"] for url, result in results.items() if result["status_code"] >= 300}
+    if failed:
+        logger.warning(f"Bascule de modèle en échec sur {len(failed)}/{len(results)} réplicas: {failed}")
+    return JSONResponse(
+        {"replicas": results, "failed": sorted(failed)},
+        status_code=next(iter(failed.values())) if failed else 202
+    )
+
+
+@app.get("/admin/model")
+async def swap_status(request: Request):
+    """État de la bascule de modèle de chaque réplica et modèles actifs: `consistent` est faux
+    quand les réplicas servent des modèles différents ou que l'un d'eux ne répond pas"""
+    results = await broadcast("GET", "/admin/model", headers=admin_headers(request))
+    models: Dict[str, List[str]] = {}
+    for url, result in results.items():
+        model = result["body"].get("model") if result["status_code"] == 200 else None
+        models.setdefault(model or "indisponible", []).append(url)
+    return {
+        "consistent": len(models) == 1 and "indisponible" not in models,
+        "models": models,
+        "replicas": results
+    }
+
+
+if GATEWAY_SERVICE == 'embedder':
+
+    async def embed_split(body: Dict[str, Any]) -> Response:
+        """Répartit les textes par réplica propriétaire puis réassemble les vecteurs dans l'ordre"""
+        texts = body["texts"]
+        keys = [hash_key(text) for text in texts]
+        groups: Dict[str, List[int]] = {}
+        for i, key in enumerate(keys):
+            owner = pool.owner(key)
+            groups.setdefault(owner.url if owner is not None else '', []).append(i)
+
+        if len(groups) == 1:
+            return relay(await forward("POST", "/embed", keys[0], len(texts), body))
+
+        parts = list(groups.values())
+        responses = await asyncio.gather(*(
+            forward("POST", "/embed", keys[indices[0]], len(indices), {**body, "texts": [texts[i] for i in indices]})
+            for indices in parts
+        ))
+        for response in responses:
+            if response.status_code != 200:
+                return relay(response)
+
+        payloads = [response.json() for response in responses]
+        if len({payload["model"] for payload in payloads}) > 1:
+            # Bascule de modèle en cours sur une partie des réplicas: un seul réplica pour tout le lot
+            return relay(await forward("POST", "/embed", keys[0], len(texts), body))
+
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for indices, payload in zip(parts, payloads):
+            for i, vector in zip(indices, payload["vectors"]):
+                vectors[i] = vector
+
+        return JSONResponse({
+            "vectors": vectors,
+            "dim": payloads[0]["dim"],
+            "model": payloads[0]["model"],
+            "processing_time_ms": max(payload["processing_time_ms"] for payload in payloads)
+        })
+
+    @app.post("/embed")
+    @app.post("/embed/batch")
+    async def embed(request: Request):
+        """Embeddings: chaque texte est calculé par le réplica dont le cache le contient probablement"""
+        body = await json_body(request)
+        texts = body.get("texts")
+        if body.get("index") is not None:
+            # L'index vectoriel vit sur un seul réplica: tout le lot va à son propriétaire
+            return relay(await forward("POST", "/embed", hash_key("index", body["index"]), len(texts) if isinstance(texts, list) else 1, body,
+                                       headers=admin_headers(request), sticky=True))
+        if not isinstance(texts, list) or not texts or not all(isinstance(text, str) for text in texts):
+            return relay(await forward("POST", "/embed", None, 1, body))
+        return await embed_split(body)
+
+    @app.post("/search")
+    async def search(request: Request):
+        """Recherche dans un index vectoriel, sur le réplica qui le détient"""
+        body = await json_body(request)
+        return relay(await forward("POST", "/search", hash_key("index", str(body.get("index"))), 1, body, sticky=True))
+
+    @app.get("/index")
+    async def list_indexes():
+        """Index vectoriels de tous les réplicas"""
+        results = await broadcast("GET", "/index")
+        indexes = [
+            {**index, "replica": url}
+            for url, result in results.items() if result["status_code"] == 200
+            for index in result["body"].get("indexes", [])
+        ]
+        return {"enabled": any(result["body"].get("enabled") for result in results.values() if result["status_code"] == 200), "indexes": indexes}
+
+    @app.post("/index/{name}/remove")
+    async def remove_from_index(name: str, request: Request):
+        """Retrait de chunks, sur le réplica qui détient l'index"""
+        return relay(await forward("POST", f"/index/{name}/remove", hash_key("index", name), 1, await json_body(request),
+                                   headers=admin_headers(request), sticky=True))
+
+    @app.post("/index/{name}/train")
+    async def train_index(name: str, request: Request):
+        """Ré-entraînement et compactage, sur le réplica qui détient l'index"""
+        path = f"/index/{name}/train" + (f"?{request.url.query}" if request.url.query else "")
+        return relay(await forward("POST", path, hash_key("index", name), 1, headers=admin_headers(request), sticky=True))
+
+elif GATEWAY_SERVICE == 'reranker':
+
+    @app.post("/rerank")
+    @app.post("/rerank/batch")
+    async def rerank(request: Request):
+        """Reranking, routé par l'ensemble des candidats (indépendamment de leur ordre)
+
+        Les reformulations d'une question ramènent en général les mêmes candidats: elles vont
+        au même réplica, dont le cache sémantique (par query_vector sur ces candidats) et le
+        cache de paires restent chauds.
+        """
+        body = await json_body(request)
+        candidates = body.get("candidates")
+        key = None
+        if isinstance(candidates, list) and candidates and all(isinstance(candidate, str) for candidate in candidates):
+            key = hash_key("candidates", *sorted({candidate.strip() for candidate in candidates}))
+        return relay(await forward("POST", "/rerank", key, len(candidates) if isinstance(candidates, list) else 1, body))
+
+    @app.post("/rerank/multi")
+    async def rerank_multi(request: Request):
+        """Reranking multi-requêtes, routé par l'ensemble des requêtes du lot"""
+        body = await json_body(request)
+        groups = body.get("groups") if isinstance(body.get("groups"), list) else []
+        queries = [str(group.get("query", "")).strip() for group in groups if isinstance(group, dict)]
+        weight = sum(len(group["candidates"]) for group in groups if isinstance(group, dict) and isinstance(group.get("candidates"), list))
+        return relay(await forward("POST", "/rerank/multi", hash_key(*queries) if queries else None, max(weight, 1), body))
+
+else:
+    raise ValueError(f"GATEWAY_SERVICE inconnu: {GATEWAY_SERVICE} (attendu: embedder, reranker)")
+
+
+if __name__ == "__main__":
+    logger.info(f"Démarrage de la passerelle {GATEWAY_SERVICE} sur {HOST}:{PORT}")
+    uvicorn.run(
+        "app:app",
+        host=HOST,
+        port=PORT,
+        log_level="info",
+        access_log=True
+    )
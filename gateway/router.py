@@ -0,0 +1,176 @@
+"""
+Sélection du réplica qui sert une requête
+
+Chaque clé de routage (empreinte d'un texte, d'une requête, d'un nom d'index) est placée
+sur un anneau de hachage cohérent: la même clé revient toujours au même réplica, dont le
+cache reste chaud, et l'ajout ou l'éjection d'un réplica ne déplace qu'une fraction des
+clés. Pour qu'une clé très demandée ne sature pas son réplica, la charge est bornée: un
+réplica dont le travail en cours dépasse `load_factor` fois la moyenne est sauté au profit
+du suivant sur l'anneau. Sans clé, le réplica le moins chargé est choisi.
+"""
+
+import bisect
+import hashlib
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+def hash_key(*parts: str) -> int:
+    """Position d'une clé sur l'anneau (64 bits)"""
+    digest = hashlib.blake2b(digest_size=8)
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return int.from_bytes(digest.digest(), 'big')
+
+
+class Replica:
+    """Un réplica du service et son état vu par la passerelle"""
+
+    def __init__(self, url: str, window: int = 1024):
+        self.url = url.rstrip('/')
+        self.healthy = True
+        self.outstanding = 0  # éléments (textes, paires) en cours de traitement
+        self.failures = 0  # échecs consécutifs
+        self.ejections = 0
+        self.requests = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._latencies: deque = deque(maxlen=window)
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = np.array(self._latencies)
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "ejections": self.ejections,
+            "last_error": self.last_error,
+            "latency_ms": {
+                "p50": round(float(np.percentile(latencies, 50)), 3),
+                "p95": round(float(np.percentile(latencies, 95)), 3),
+                "p99": round(float(np.percentile(latencies, 99)), 3)
+            } if latencies.size else None
+        }
+
+
+class ReplicaPool:
+    """Réplicas d'un service sur un anneau de hachage cohérent à charge bornée"""
+
+    def __init__(self, urls: List[str], virtual_nodes: int = 64, load_factor: float = 1.25, eject_after: int = 3):
+        if not urls:
+            raise ValueError("Aucun réplica configuré")
+        self.replicas = [Replica(url) for url in urls]
+        self.load_factor = load_factor
+        self.eject_after = eject_after
+        self.spills = 0  # clés servies par un autre réplica que leur propriétaire (charge bornée)
+        self._lock = threading.Lock()
+
+        ring = sorted(
+            (hash_key(replica.url, str(i)), index)
+            for index, replica in enumerate(self.replicas)
+            for i in range(virtual_nodes)
+        )
+        self._ring_points = [point for point, _ in ring]
+        self._ring_owners = [index for _, index in ring]
+
+    def healthy(self) -> List[Replica]:
+        return [replica for replica in self.replicas if replica.healthy]
+
+    def _ring_walk(self, key: int, healthy_only: bool = True):
+        """Réplicas (sains par défaut) dans l'ordre de l'anneau à partir de `key`, chacun une seule fois"""
+        start = bisect.bisect_left(self._ring_points, key)
+        seen = set()
+        for offset in range(len(self._ring_owners)):
+            index = self._ring_owners[(start + offset) % len(self._ring_owners)]
+            if index not in seen:
+                seen.add(index)
+                if self.replicas[index].healthy or not healthy_only:
+                    yield self.replicas[index]
+            if len(seen) == len(self.replicas):
+                return
+
+    def owner(self, key: int) -> Optional[Replica]:
+        """Réplica sain propriétaire de `key`, sans tenir compte de la charge"""
+        return next(self._ring_walk(key), None)
+
+    def home(self, key: int) -> Replica:
+        """Réplica propriétaire de `key` sur l'anneau complet, même éjecté
+
+        Pour l'état qui ne vit que sur un réplica (index vectoriels): s'il est indisponible,
+        le suivant sur l'anneau n'a pas les données et ne doit pas répondre à sa place.
+        """
+        return next(self._ring_walk(key, healthy_only=False))
+
+    def pick(self, key: Optional[int] = None, weight: int = 1, exclude: Optional[set] = None) -> Optional[Replica]:
+        """Réplica qui servira `weight` éléments de clé `key` (le moins chargé si `key` est None)"""
+        with self._lock:
+            candidates = [replica for replica in self.healthy() if exclude is None or replica.url not in exclude]
+            if not candidates:
+                return None
+
+            if key is None:
+                return min(candidates, key=lambda replica: replica.outstanding)
+
+            # Borne de charge: ceil(c * (travail total + nouveau) / nombre de réplicas sains)
+            total = sum(replica.outstanding for replica in candidates) + weight
+            bound = math.ceil(self.load_factor * total / len(candidates))
+            first = None
+            for replica in self._ring_walk(key):
+                if exclude is not None and replica.url in exclude:
+                    continue
+                if first is None:
+                    first = replica
+                if replica.outstanding + weight <= bound:
+                    if replica is not first:
+                        self.spills += 1
+                    return replica
+            return first
+
+    @contextmanager
+    def track(self, replica: Replica, weight: int = 1):
+        """Compte le travail en cours sur `replica` et la latence de la requête"""
+        with self._lock:
+            replica.outstanding += weight
+            replica.requests += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                replica.outstanding -= weight
+            replica._latencies.append((time.perf_counter() - start) * 1000)
+
+    def record_success(self, replica: Replica):
+        with self._lock:
+            replica.failures = 0
+            if not replica.healthy:
+                replica.healthy = True
+
+    def record_failure(self, replica: Replica, error: str):
+        """Échec d'une requête ou d'un contrôle de santé; éjecte après `eject_after` échecs consécutifs"""
+        with self._lock:
+            replica.errors += 1
+            replica.failures += 1
+            replica.last_error = error
+            if replica.healthy and replica.failures >= self.eject_after:
+                replica.healthy = False
+                replica.ejections += 1
+                return True
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "replicas": [replica.stats() for replica in self.replicas],
+            "healthy": len(self.healthy()),
+            "load_factor": self.load_factor,
+            "spills": self.spills
+        }
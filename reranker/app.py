@@ -1,27 +1,61 @@
 #!/usr/bin/env python3
 """
 Microservice de reranking pour Regalica Notebook
-Utilise BGE-reranker-v2-m3 pour réordonner les candidats RAG
+Serveur commun (validation, dédoublonnage, ordonnancement en batches, cache, métriques,
+profilage) au-dessus d'un moteur interchangeable choisi par RERANKER_ENGINE:
+sentence-transformers (défaut, BGE-reranker-v2-m3 local), ollama ou mock
 """
 
 import os
 import time
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Depends, Response
 from pydantic import BaseModel
 import uvicorn
-from sentence_transformers import CrossEncoder
+
+from autotune import CHUNK_MEDIAN_WORDS, QUERY_MEDIAN_WORDS, EngineTuning, synthetic_texts
+from cache import LRUCache, text_key
+from dedup import MinHasher, group_near_duplicates, spread_scores
+from engines import ENGINES, EngineUnavailable, create_engine
+from hotswap import EngineSlot
+from metrics import ServiceMetrics
+from profiling import PROFILE_MODES, ProfileCapture, StageTimer, timed_json_response
+from scheduler import BatchScheduler
+from semantic_cache import SemanticCache
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Configuration
-RERANKER_MODEL_NAME = os.getenv('RERANKER_MODEL_NAME', 'BAAI/bge-reranker-v2-m3')
+RERANKER_ENGINE = os.getenv('RERANKER_ENGINE', 'sentence-transformers')
+RERANKER_MODEL_NAME = os.getenv('RERANKER_MODEL_NAME', '')  # vide: modèle par défaut du moteur
 HOST = os.getenv('HOST', '0.0.0.0')
 PORT = int(os.getenv('PORT', 8001))
+RERANK_CACHE_SIZE = int(os.getenv('RERANK_CACHE_SIZE', 50000))
+SCHEDULER_MAX_BATCH = int(os.getenv('SCHEDULER_MAX_BATCH', 256))
+SCHEDULER_MAX_WAIT_MS = float(os.getenv('SCHEDULER_MAX_WAIT_MS', 0))
+SCHEDULER_WORKERS = int(os.getenv('SCHEDULER_WORKERS', 1))
+AUTOTUNE = os.getenv('AUTOTUNE', 'off').lower()  # off | auto (profil enregistré, sinon calibration) | force
+AUTOTUNE_DIR = os.getenv('AUTOTUNE_DIR', '/root/.cache/regalica-autotune')
+AUTOTUNE_LATENCY_MS = float(os.getenv('AUTOTUNE_LATENCY_MS', 1000))  # cible p95 d'un appel au moteur
+AUTOTUNE_TRIAL_S = float(os.getenv('AUTOTUNE_TRIAL_S', 2))
+AUTOTUNE_CALL_ITEMS = int(os.getenv('AUTOTUNE_CALL_ITEMS', 32))
+AUTOTUNE_BATCH_SIZES = [int(size) for size in os.getenv('AUTOTUNE_BATCH_SIZES', '8,16,32,64').split(',') if size.strip()]
+AUTOTUNE_COMPILE_MODES = [mode.strip() for mode in os.getenv('AUTOTUNE_COMPILE_MODES', '').split(',') if mode.strip()]
+SEMANTIC_CACHE_SIZE = int(os.getenv('SEMANTIC_CACHE_SIZE', 1024))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.95))
+MULTI_MAX_GROUPS = int(os.getenv('MULTI_MAX_GROUPS', 256))
+MULTI_MAX_PAIRS = int(os.getenv('MULTI_MAX_PAIRS', 4096))
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'false').lower() == 'true'
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+SWAP_DRAIN_WARNING_S = float(os.getenv('SWAP_DRAIN_WARNING_S', 60))
+SWAP_LOADER_NICE = int(os.getenv('SWAP_LOADER_NICE', 10))
+DEDUP_ENABLED = os.getenv('DEDUP_ENABLED', 'false').lower() == 'true'
+DEDUP_THRESHOLD = float(os.getenv('DEDUP_THRESHOLD', 0.8))
+DEDUP_MARGIN = float(os.getenv('DEDUP_MARGIN', 0.0))
 
 # Application FastAPI
 app = FastAPI(
@@ -30,134 +64,460 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Variable globale pour le modèle
-model = None
+# Moteur actif (remplaçable à chaud) et couches partagées par tous les moteurs
+slot = EngineSlot(drain_warning_s=SWAP_DRAIN_WARNING_S, loader_nice=SWAP_LOADER_NICE)
+profiler = ProfileCapture()
+metrics = ServiceMetrics()
+cache = LRUCache(RERANK_CACHE_SIZE)
+semantic_cache = SemanticCache(SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD)
+minhasher = MinHasher()
+tuning = EngineTuning(AUTOTUNE, AUTOTUNE_DIR, AUTOTUNE_LATENCY_MS, AUTOTUNE_TRIAL_S, AUTOTUNE_CALL_ITEMS,
+                      AUTOTUNE_BATCH_SIZES, AUTOTUNE_COMPILE_MODES)
 
 class RerankRequest(BaseModel):
     query: str
     candidates: List[str]
+    dedup: Optional[bool] = None
+    query_vector: Optional[List[float]] = None
 
 class RerankResponse(BaseModel):
     scores: List[float]
     processing_time_ms: int
     model: str
+    groups: Optional[List[List[int]]] = None
+    semantic_cache_similarity: Optional[float] = None
 
-def load_model():
-    """Charge le modèle de reranking"""
-    global model
+class RerankGroup(BaseModel):
+    query: str
+    candidates: List[str]
+
+class MultiRerankRequest(BaseModel):
+    groups: List[RerankGroup]
+    dedup: Optional[bool] = None
+
+class MultiRerankResponse(BaseModel):
+    scores: List[List[float]]
+    processing_time_ms: int
+    model: str
+    duplicate_groups: Optional[List[List[List[int]]]] = None
+
+class ModelSwapRequest(BaseModel):
+    model_name: str
+    engine: Optional[str] = None
+
+class ProfileRequest(BaseModel):
+    mode: str = "cpu"
+    requests: Optional[int] = None
+    seconds: Optional[float] = None
+    interval_ms: float = 5.0
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Protège les endpoints d'administration si ADMIN_TOKEN est défini"""
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Jeton d'administration invalide")
+
+def run_engine(pairs: List[Tuple[str, str]], timer: StageTimer, engine) -> np.ndarray:
+    """Score un batch de paires avec le moteur des requêtes regroupées (appelé par l'ordonnanceur, hors boucle d'événements)"""
+    with profiler.trace():
+        return engine.score(pairs, timer, inline=profiler.torch_tracing)
+
+scheduler = BatchScheduler(run_engine, max_batch_items=SCHEDULER_MAX_BATCH, max_wait_ms=SCHEDULER_MAX_WAIT_MS, workers=SCHEDULER_WORKERS)
+
+async def score_pairs(pairs: List[Tuple[str, str]], timer: StageTimer, engine) -> np.ndarray:
+    """Scores des paires (requête, candidat): cache d'abord, puis ordonnanceur pour les paires manquantes"""
+    with timer.stage("cache"):
+        keys = [text_key(engine.model_name, query.strip(), candidate.strip()) for query, candidate in pairs]
+        scores = cache.get_many(keys)
+    
+    missing = [i for i, score in enumerate(scores) if score is None]
+    if missing:
+        computed = await scheduler.submit([pairs[i] for i in missing], timer, key=engine)
+        computed = [float(score) for score in computed]
+        cache.put_many([keys[i] for i in missing], computed)
+        for i, score in zip(missing, computed):
+            scores[i] = score
+    
+    return np.array(scores, dtype=np.float64)
+
+def select_valid_candidates(query: str, candidates: List[str], engine, context: str = "") -> Tuple[List[str], List[int]]:
+    """Valide une requête de reranking et retourne les candidats non vides avec leurs indices"""
+    if not query.strip():
+        raise HTTPException(status_code=400, detail=f"{context}Requête vide")
+    
+    if not candidates:
+        raise HTTPException(status_code=400, detail=f"{context}Liste de candidats vide")
+    
+    if len(candidates) > engine.max_candidates:
+        raise HTTPException(status_code=400, detail=f"{context}Trop de candidats (max {engine.max_candidates})")
+    
+    # Rejeter les candidats vides
+    valid_candidates = []
+    valid_indices = []
+    for i, candidate in enumerate(candidates):
+        if candidate and candidate.strip():
+            valid_candidates.append(candidate.strip())
+            valid_indices.append(i)
     
-    logger.info(f"Chargement du modèle de reranking: {RERANKER_MODEL_NAME}")
-    start_time = time.time()
+    if not valid_candidates:
+        raise HTTPException(status_code=400, detail=f"{context}Aucun candidat valide")
+    
+    return valid_candidates, valid_indices
+
+def find_duplicate_groups(valid_candidates: List[str], dedup: Optional[bool]) -> Optional[List[List[int]]]:
+    """Groupes de quasi-doublons (indices dans valid_candidates, représentant en tête), None si désactivé"""
+    enabled = DEDUP_ENABLED if dedup is None else dedup
+    if not enabled:
+        return None
+    return group_near_duplicates(valid_candidates, DEDUP_THRESHOLD, minhasher)
+
+def representatives(valid_candidates: List[str], groups: Optional[List[List[int]]]) -> List[str]:
+    """Candidats effectivement scorés: un représentant par groupe de quasi-doublons"""
+    if groups is None:
+        return valid_candidates
+    return [valid_candidates[group[0]] for group in groups]
+
+def place_scores(scores: np.ndarray, valid_indices: List[int], total: int) -> np.ndarray:
+    """Replace les scores (déjà entre 0 et 1) aux indices d'origine (0 pour les candidats vides)"""
+    full_scores = np.zeros(total)
+    full_scores[valid_indices] = scores
+    return full_scores
+
+def calibration_pairs(rng: np.random.Generator) -> List[Tuple[str, str]]:
+    """Appel type pour la calibration: une requête et ses candidats"""
+    query = synthetic_texts(1, QUERY_MEDIAN_WORDS, rng)[0]
+    return [(query, candidate) for candidate in synthetic_texts(AUTOTUNE_CALL_ITEMS, CHUNK_MEDIAN_WORDS, rng)]
+
+def build_engine(engine_name: str, model_name: str, startup: bool = False):
+    """Instancie, charge et préchauffe un moteur de reranking, avec ses réglages calibrés"""
+    logger.info(f"Chargement du moteur de reranking: {engine_name}")
     
     try:
-        model = CrossEncoder(RERANKER_MODEL_NAME)
-        
-        load_time = time.time() - start_time
-        logger.info(f"Modèle de reranking chargé en {load_time:.2f}s")
-        
-        # Test du modèle avec un exemple simple
-        test_scores = model.predict([("test query", "test document")])
-        logger.info(f"Test réussi - Score exemple: {test_scores[0]:.4f}")
+        loaded = create_engine(engine_name, model_name)
+        loaded.load()
+        tuning.apply(loaded, scheduler, calibration_pairs, lambda pairs: loaded.score(pairs, StageTimer()), startup)
+        logger.info(f"Moteur {loaded.name} prêt - Modèle: {loaded.model_name}")
+        return loaded
         
     except Exception as e:
         logger.error(f"Erreur lors du chargement du modèle: {e}")
         raise
 
+def load_model():
+    """Charge le moteur configuré au démarrage"""
+    if RERANKER_ENGINE in ENGINES:
+        tuning.prepare(ENGINES[RERANKER_ENGINE], RERANKER_MODEL_NAME)
+    loaded = build_engine(RERANKER_ENGINE, RERANKER_MODEL_NAME, startup=True)
+    if not tuning.calibrating:
+        slot.engine = loaded
+        return
+
+    # Moteur publié à la fin du balayage: pas de trafic pendant les mesures, /health répond 503 d'ici là
+    def publish():
+        slot.engine = loaded
+        logger.info(f"Moteur {loaded.name} publié après calibration")
+    tuning.start_calibration(publish)
+
 @app.on_event("startup")
 async def startup_event():
     """Initialisation au démarrage"""
     logger.info("Démarrage du microservice reranker")
     load_model()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    if slot.engine is not None:
+        slot.engine.close()
+
 @app.get("/health")
 async def health_check():
     """Endpoint de santé"""
-    if model is None:
-        raise HTTPException(status_code=503, detail="Modèle non chargé")
+    engine = slot.engine
+    if engine is None:
+        raise HTTPException(status_code=503, detail="Calibration en cours" if tuning.calibrating else "Modèle non chargé")
+    
+    try:
+        details = engine.health()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Health check failed: {str(e)}")
     
     return {
         "status": "healthy",
-        "model": RERANKER_MODEL_NAME,
+        "engine": engine.name,
+        "model": engine.model_name,
+        **details,
         "timestamp": time.time()
     }
 
 @app.get("/info")
 async def model_info():
     """Informations sur le modèle"""
-    if model is None:
+    engine = slot.engine
+    if engine is None:
         raise HTTPException(status_code=503, detail="Modèle non chargé")
     
     return {
-        "model_name": RERANKER_MODEL_NAME,
-        "model_type": "cross_encoder",
-        "max_length": getattr(model, 'max_length', 'unknown')
+        "engine": engine.name,
+        "model_name": engine.model_name,
+        "model_type": engine.model_type,
+        "max_candidates": engine.max_candidates,
+        "engines": sorted(ENGINES),
+        **engine.info(),
+        "tuning": tuning.info(engine, scheduler)
+    }
+
+@app.get("/metrics")
+async def service_metrics():
+    """Métriques partagées par tous les moteurs: compteurs, latences par étape, cache, ordonnanceur"""
+    engine = slot.engine
+    return {
+        "engine": engine.name if engine is not None else None,
+        "model": engine.model_name if engine is not None else None,
+        **metrics.snapshot(),
+        "cache": cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "scheduler": scheduler.stats()
     }
 
 @app.post("/rerank", response_model=RerankResponse)
 async def rerank_candidates(request: RerankRequest):
     """Réordonne les candidats selon leur pertinence par rapport à la requête"""
-    if model is None:
+    if slot.engine is None:
         raise HTTPException(status_code=503, detail="Modèle non chargé")
     
-    if not request.query.strip():
-        raise HTTPException(status_code=400, detail="Requête vide")
+    # Le moteur reste celui de la requête même si une bascule de modèle survient entre-temps
+    with slot.acquire() as engine:
+        valid_candidates, valid_indices = select_valid_candidates(request.query, request.candidates, engine)
     
-    if not request.candidates:
-        raise HTTPException(status_code=400, detail="Liste de candidats vide")
+        metrics.incr("requests")
+        metrics.incr("candidates", len(valid_candidates))
     
-    if len(request.candidates) > 64:
-        raise HTTPException(status_code=400, detail="Trop de candidats (max 64)")
-    
-    # Rejeter les candidats vides
-    valid_candidates = []
-    valid_indices = []
-    for i, candidate in enumerate(request.candidates):
-        if candidate and candidate.strip():
-            valid_candidates.append(candidate.strip())
-            valid_indices.append(i)
-    
-    if not valid_candidates:
-        raise HTTPException(status_code=400, detail="Aucun candidat valide")
-    
-    try:
-        start_time = time.time()
-        
-        # Préparer les paires (query, candidate) pour le cross-encoder
-        pairs = [(request.query, candidate) for candidate in valid_candidates]
+        try:
+            start_time = time.time()
+            timer = StageTimer()
         
-        # Calculer les scores de pertinence en batch
-        raw_scores = model.predict(pairs)
+            with profiler.track():
+                # Requête proche d'une requête récente sur les mêmes candidats: scores en cache
+                semantic_hit = None
+                if request.query_vector:
+                    with timer.stage("semantic_cache"):
+                        candidate_keys = [text_key(engine.model_name, candidate) for candidate in valid_candidates]
+                        dedup_enabled = DEDUP_ENABLED if request.dedup is None else request.dedup
+                        semantic_hit = semantic_cache.lookup(request.query_vector, candidate_keys, variant=dedup_enabled)
+            
+                # Groupes calculés aussi sur un succès du cache (MinHash, peu coûteux): la réponse les expose
+                with timer.stage("dedup"):
+                    duplicate_groups = find_duplicate_groups(valid_candidates, request.dedup)
+            
+                if semantic_hit is not None:
+                    scores, similarity = semantic_hit
+                    scored_candidates = []
+                    metrics.incr("semantic_cache_hits")
+                else:
+                    scored_candidates = representatives(valid_candidates, duplicate_groups)
+                
+                    # Préparer les paires (query, candidate) pour le cross-encoder
+                    pairs = [(request.query, candidate) for candidate in scored_candidates]
+                
+                    # Calculer les scores de pertinence en batch
+                    scores = await score_pairs(pairs, timer, engine)
+                
+                    with timer.stage("spread"):
+                        if duplicate_groups is not None:
+                            scores = spread_scores(scores, duplicate_groups, len(valid_candidates), DEDUP_MARGIN)
+                
+                    if request.query_vector:
+                        semantic_cache.put(request.query_vector, candidate_keys, scores, variant=dedup_enabled)
+            
+                full_scores = place_scores(scores, valid_indices, len(request.candidates))
+                normalized_scores = full_scores[valid_indices]
+            
+                processing_time = int((time.time() - start_time) * 1000)
+            
+                # Logs de temps par lot
+                avg_time_per_candidate = processing_time / len(valid_candidates) if valid_candidates else 0
+                logger.info(f"Reranking terminé: {len(valid_candidates)}/{len(request.candidates)} candidats valides en {processing_time}ms ({avg_time_per_candidate:.1f}ms/candidat)")
+                logger.debug(f"Scores: min={normalized_scores.min():.4f}, max={normalized_scores.max():.4f}, avg={normalized_scores.mean():.4f}")
+            
+                payload = {
+                    "scores": full_scores,
+                    "processing_time_ms": processing_time,
+                    "model": engine.model_name
+                }
+                if duplicate_groups is not None:
+                    logger.info(f"Dédoublonnage: {len(scored_candidates)}/{len(valid_candidates)} candidats scorés")
+                    payload["groups"] = [[valid_indices[i] for i in group] for group in duplicate_groups]
+                if semantic_hit is not None:
+                    logger.info(f"Cache sémantique: scores réutilisés (similarité {similarity:.4f})")
+                    payload["semantic_cache_similarity"] = similarity
+            
+                response = timed_json_response(RerankResponse, payload, timer, SERVER_TIMING_ENABLED)
+                metrics.observe_timer("rerank", timer)
+                return response
         
-        # Normaliser les scores entre 0 et 1 en utilisant la fonction sigmoid
-        normalized_scores = [float(1 / (1 + np.exp(-score))) for score in raw_scores]
-        
-        # Reconstituer les scores pour tous les candidats originaux (0 pour les vides)
-        full_scores = [0.0] * len(request.candidates)
-        for i, valid_idx in enumerate(valid_indices):
-            full_scores[valid_idx] = normalized_scores[i]
-        
-        processing_time = int((time.time() - start_time) * 1000)
-        
-        # Logs de temps par lot
-        avg_time_per_candidate = processing_time / len(valid_candidates) if valid_candidates else 0
-        logger.info(f"Reranking terminé: {len(valid_candidates)}/{len(request.candidates)} candidats valides en {processing_time}ms ({avg_time_per_candidate:.1f}ms/candidat)")
-        logger.debug(f"Scores: min={min(normalized_scores):.4f}, max={max(normalized_scores):.4f}, avg={np.mean(normalized_scores):.4f}")
-        
-        return RerankResponse(
-            scores=full_scores,
-            processing_time_ms=processing_time,
-            model=RERANKER_MODEL_NAME
-        )
-        
-    except Exception as e:
-        logger.error(f"Erreur lors du reranking: {e}")
-        raise HTTPException(status_code=500, detail=f"Erreur interne: {str(e)}")
+        except EngineUnavailable as e:
+            metrics.incr("errors")
+            logger.error(f"Moteur indisponible: {e}")
+            raise HTTPException(status_code=503, detail=str(e))
+        except Exception as e:
+            metrics.incr("errors")
+            logger.error(f"Erreur lors du reranking: {e}")
+            raise HTTPException(status_code=500, detail=f"Erreur interne: {str(e)}")
 
 @app.post("/rerank/batch")
 async def rerank_batch(request: RerankRequest):
     """Alias pour /rerank pour compatibilité"""
     return await rerank_candidates(request)
 
+@app.post("/rerank/multi", response_model=MultiRerankResponse)
+async def rerank_multi(request: MultiRerankRequest):
+    """Réordonne les candidats de plusieurs requêtes en un seul appel
+    
+    Toutes les paires (requête, candidat) des groupes sont scorées dans des batches partagés
+    triés par longueur; chaque groupe reçoit son tableau de scores, comme /rerank.
+    """
+    if slot.engine is None:
+        raise HTTPException(status_code=503, detail="Modèle non chargé")
+    
+    if not request.groups:
+        raise HTTPException(status_code=400, detail="Liste de groupes vide")
+    
+    if len(request.groups) > MULTI_MAX_GROUPS:
+        raise HTTPException(status_code=400, detail=f"Trop de groupes (max {MULTI_MAX_GROUPS})")
+    
+    with slot.acquire() as engine:
+        selections = [
+            select_valid_candidates(group.query, group.candidates, engine, context=f"Groupe {i}: ")
+            for i, group in enumerate(request.groups)
+        ]
+        total_pairs = sum(len(valid_candidates) for valid_candidates, _ in selections)
+        if total_pairs > MULTI_MAX_PAIRS:
+            raise HTTPException(status_code=400, detail=f"Trop de paires au total (max {MULTI_MAX_PAIRS})")
+    
+        metrics.incr("multi_requests")
+        metrics.incr("candidates", total_pairs)
+    
+        try:
+            start_time = time.time()
+            timer = StageTimer()
+        
+            with profiler.track():
+                with timer.stage("dedup"):
+                    duplicate_groups = [
+                        find_duplicate_groups(valid_candidates, request.dedup)
+                        for valid_candidates, _ in selections
+                    ]
+                scored = [
+                    representatives(valid_candidates, groups)
+                    for (valid_candidates, _), groups in zip(selections, duplicate_groups)
+                ]
+                pairs = [
+                    (group.query, candidate)
+                    for group, scored_candidates in zip(request.groups, scored)
+                    for candidate in scored_candidates
+                ]
+                scores = await score_pairs(pairs, timer, engine)
+            
+                with timer.stage("spread"):
+                    group_scores = []
+                    offset = 0
+                    for group, (valid_candidates, valid_indices), groups, scored_candidates in zip(request.groups, selections, duplicate_groups, scored):
+                        group_part = scores[offset:offset + len(scored_candidates)]
+                        offset += len(scored_candidates)
+                        if groups is not None:
+                            group_part = spread_scores(group_part, groups, len(valid_candidates), DEDUP_MARGIN)
+                        group_scores.append(place_scores(group_part, valid_indices, len(group.candidates)).tolist())
+            
+                processing_time = int((time.time() - start_time) * 1000)
+                logger.info(f"Reranking multi terminé: {len(request.groups)} groupes, {len(pairs)}/{total_pairs} paires scorées en {processing_time}ms ({processing_time / len(pairs):.1f}ms/paire)")
+            
+                payload = {
+                    "scores": group_scores,
+                    "processing_time_ms": processing_time,
+                    "model": engine.model_name
+                }
+                if request.dedup or (request.dedup is None and DEDUP_ENABLED):
+                    payload["duplicate_groups"] = [
+                        [[valid_indices[i] for i in group] for group in groups]
+                        for (_, valid_indices), groups in zip(selections, duplicate_groups)
+                    ]
+            
+                response = timed_json_response(MultiRerankResponse, payload, timer, SERVER_TIMING_ENABLED)
+                metrics.observe_timer("rerank_multi", timer)
+                return response
+        
+        except EngineUnavailable as e:
+            metrics.incr("errors")
+            logger.error(f"Moteur indisponible: {e}")
+            raise HTTPException(status_code=503, detail=str(e))
+        except Exception as e:
+            metrics.incr("errors")
+            logger.error(f"Erreur lors du reranking multi: {e}")
+            raise HTTPException(status_code=500, detail=f"Erreur interne: {str(e)}")
+
+@app.post("/admin/model", status_code=202, dependencies=[Depends(require_admin)])
+async def swap_model(request: ModelSwapRequest):
+    """Charge un nouveau modèle en arrière-plan puis bascule dessus sans interruption de service"""
+    if slot.engine is None:
+        raise HTTPException(status_code=503, detail="Modèle non chargé")
+    
+    engine_name = request.engine or slot.engine.name
+    if engine_name not in ENGINES:
+        raise HTTPException(status_code=400, detail=f"Moteur inconnu (attendu: {', '.join(sorted(ENGINES))})")
+    
+    try:
+        return slot.start_swap(
+            lambda: build_engine(engine_name, request.model_name),
+            {"engine": engine_name, "model": request.model_name}
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/admin/model", dependencies=[Depends(require_admin)])
+async def swap_status():
+    """État du modèle actif et de la dernière bascule (durées, mémoire)"""
+    return slot.status()
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def start_profile(request: ProfileRequest):
+    """Démarre une capture de profil pour les N prochaines requêtes et/ou T secondes"""
+    if request.mode not in PROFILE_MODES:
+        raise HTTPException(status_code=400, detail=f"Mode inconnu (attendu: {', '.join(PROFILE_MODES)})")
+    
+    if not request.requests and not request.seconds:
+        raise HTTPException(status_code=400, detail="Préciser 'requests' et/ou 'seconds'")
+    
+    try:
+        profiler.start(request.mode, request.requests, request.seconds, request.interval_ms)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ImportError as e:
+        raise HTTPException(status_code=400, detail=f"Mode indisponible: {str(e)}")
+    
+    return profiler.status()
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_status():
+    """État de la capture de profil"""
+    return profiler.status()
+
+@app.delete("/admin/profile", dependencies=[Depends(require_admin)])
+async def stop_profile():
+    """Termine la capture en cours sans attendre ses bornes"""
+    profiler.stop()
+    return profiler.status()
+
+@app.get("/admin/profile/artifact", dependencies=[Depends(require_admin)])
+async def download_profile():
+    """Télécharge l'artefact de la dernière capture terminée"""
+    if profiler.artifact is None:
+        raise HTTPException(status_code=404, detail="Aucun profil disponible")
+    
+    return Response(
+        content=profiler.artifact,
+        media_type=profiler.artifact_media_type,
+        headers={"Content-Disposition": f'attachment; filename="{profiler.artifact_name}"'}
+    )
+
 if __name__ == "__main__":
     logger.info(f"Démarrage du serveur reranker sur {HOST}:{PORT}")
     uvicorn.run(
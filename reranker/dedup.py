@@ -0,0 +1,78 @@
+"""
+Regroupement des candidats quasi-dupliqués avant le cross-encoder
+
+Les chunks adjacents se recouvrent fortement: on estime la similarité de Jaccard
+entre candidats par MinHash sur des shingles de mots, on ne score qu'un
+représentant par groupe et on propage son score aux autres membres.
+"""
+
+import re
+import zlib
+from typing import List
+
+import numpy as np
+
+# Nombre premier de Mersenne 2^31 - 1: a * h reste dans un int64 pour h < 2^31
+PRIME = (1 << 31) - 1
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class MinHasher:
+    """Signatures MinHash de shingles de `shingle_size` mots"""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 42):
+        rng = np.random.RandomState(seed)
+        self.shingle_size = shingle_size
+        self.a = rng.randint(1, PRIME, size=num_perm).astype(np.int64)
+        self.b = rng.randint(0, PRIME, size=num_perm).astype(np.int64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        tokens = WORD_RE.findall(text.lower())
+        size = self.shingle_size
+        if len(tokens) <= size:
+            grams = [" ".join(tokens)]
+        else:
+            grams = [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+        hashes = {zlib.crc32(gram.encode('utf-8')) for gram in grams}
+        return np.fromiter(hashes, dtype=np.int64, count=len(hashes)) % PRIME
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = self.shingles(text)
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) % PRIME).min(axis=1)
+
+
+def group_near_duplicates(texts: List[str], threshold: float, hasher: MinHasher) -> List[List[int]]:
+    """Partitionne les textes en groupes de quasi-doublons (Jaccard estimé >= threshold)
+
+    Le premier membre de chaque groupe est son représentant: l'ordre d'entrée (rang de
+    la recherche vectorielle) est conservé, un texte rejoint le groupe du représentant
+    le plus similaire s'il dépasse le seuil.
+    """
+    groups: List[List[int]] = []
+    representative_signatures = []
+
+    for i, text in enumerate(texts):
+        signature = hasher.signature(text)
+        if representative_signatures:
+            similarities = (np.stack(representative_signatures) == signature).mean(axis=1)
+            best = int(np.argmax(similarities))
+            if similarities[best] >= threshold:
+                groups[best].append(i)
+                continue
+        groups.append([i])
+        representative_signatures.append(signature)
+
+    return groups
+
+
+def spread_scores(representative_scores: np.ndarray, groups: List[List[int]], total: int, margin: float = 0.0) -> np.ndarray:
+    """Propage le score de chaque représentant aux membres de son groupe
+
+    `margin` est soustrait au score des doublons (borné à 0) pour départager en faveur du représentant.
+    """
+    scores = np.zeros(total)
+    for score, group in zip(representative_scores, groups):
+        scores[group[0]] = score
+        scores[group[1:]] = max(score - margin, 0.0)
+    return scores
@@ -0,0 +1,343 @@
+"""
+Moteurs de reranking interchangeables
+
+Le serveur commun (app.py) instancie le moteur désigné par RERANKER_ENGINE depuis le
+registre ENGINES; tous les moteurs partagent ainsi l'ordonnanceur de batches, le cache,
+le dédoublonnage et l'instrumentation du serveur. Un nouveau moteur (ONNX Runtime par
+exemple) s'ajoute en sous-classant RerankEngine et en le décorant avec @register_engine("nom").
+"""
+
+import os
+import time
+import random
+import logging
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import numpy as np
+
+from ollama_pool import OllamaPool, OllamaUnavailable
+from profiling import StageTimer
+
+try:
+    import torch
+except ImportError:  # moteurs sans modèle local (ollama, mock)
+    torch = None
+
+logger = logging.getLogger(__name__)
+
+# Configuration cross-encoder
+PREDICT_BATCH_SIZE = int(os.getenv('PREDICT_BATCH_SIZE', 32))
+COMPILE_MODE = os.getenv('COMPILE_MODE', 'none')  # none | torchscript | compile
+COMPILE_BUCKETS = os.getenv('COMPILE_BUCKETS', '64,128,256,512')
+
+# Configuration Ollama (OLLAMA_URLS: plusieurs endpoints séparés par des virgules)
+OLLAMA_URL = os.getenv('OLLAMA_URL', 'http://localhost:11434')
+OLLAMA_URLS = [url.strip() for url in os.getenv('OLLAMA_URLS', OLLAMA_URL).split(',') if url.strip()]
+OLLAMA_TIMEOUT = float(os.getenv('OLLAMA_TIMEOUT', 30))
+OLLAMA_HEDGE_PERCENTILE = float(os.getenv('OLLAMA_HEDGE_PERCENTILE', 95))
+OLLAMA_HEDGE_MIN_MS = float(os.getenv('OLLAMA_HEDGE_MIN_MS', 50))
+OLLAMA_BREAKER_FAILURES = int(os.getenv('OLLAMA_BREAKER_FAILURES', 5))
+OLLAMA_BREAKER_COOLDOWN_S = float(os.getenv('OLLAMA_BREAKER_COOLDOWN_S', 30))
+OLLAMA_CONCURRENCY = int(os.getenv('OLLAMA_CONCURRENCY', 0))  # 0: un appel simultané par endpoint
+
+ENGINES: Dict[str, Type['RerankEngine']] = {}
+
+
+class EngineUnavailable(Exception):
+    """Le backend du moteur (service distant, modèle) est momentanément indisponible"""
+
+
+def register_engine(name: str):
+    """Enregistre une classe de moteur sous `name` dans le registre ENGINES"""
+    def decorator(cls):
+        cls.name = name
+        ENGINES[name] = cls
+        return cls
+    return decorator
+
+
+def create_engine(name: str, model_name: Optional[str] = None) -> 'RerankEngine':
+    """Instancie le moteur `name` (modèle par défaut du moteur si `model_name` est vide)"""
+    if name not in ENGINES:
+        raise ValueError(f"Moteur inconnu: {name} (disponibles: {', '.join(sorted(ENGINES))})")
+    engine_cls = ENGINES[name]
+    return engine_cls(model_name or engine_cls.default_model)
+
+
+def create_ollama_pool() -> OllamaPool:
+    """Client des endpoints OLLAMA_URLS (sélection par latence, couverture, disjoncteurs)"""
+    return OllamaPool(
+        OLLAMA_URLS,
+        OLLAMA_TIMEOUT,
+        hedge_percentile=OLLAMA_HEDGE_PERCENTILE,
+        hedge_min_ms=OLLAMA_HEDGE_MIN_MS,
+        breaker_failures=OLLAMA_BREAKER_FAILURES,
+        breaker_cooldown_s=OLLAMA_BREAKER_COOLDOWN_S,
+        concurrency=OLLAMA_CONCURRENCY
+    )
+
+
+class RerankEngine:
+    """Interface commune des moteurs de reranking"""
+
+    name = 'base'
+    default_model = ''
+    tunable = False  # réglages calibrables au démarrage (voir autotune.py)
+    model_type = 'cross_encoder'
+    max_candidates = 64
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    def load(self):
+        """Charge et préchauffe le modèle"""
+
+    def score(self, pairs: List[Tuple[str, str]], timer: StageTimer, inline: bool = False) -> np.ndarray:
+        """Scores de pertinence dans [0, 1] des paires (requête, candidat), dans l'ordre d'entrée"""
+        raise NotImplementedError
+
+    def health(self) -> Dict[str, Any]:
+        """Lève une exception si le moteur n'est pas opérationnel; retourne des détails éventuels"""
+        return {}
+
+    def info(self) -> Dict[str, Any]:
+        return {}
+
+    def configure(self, batch_size: Optional[int] = None, compile_mode: Optional[str] = None):
+        """Applique les réglages retenus par la calibration (moteurs locaux seulement)"""
+
+    def tuning(self) -> Dict[str, Any]:
+        """Réglages propres au moteur (taille de batch, compilation), vides pour un moteur distant"""
+        return {}
+
+    def close(self):
+        """Libère les ressources du moteur"""
+
+
+@register_engine('sentence-transformers')
+class CrossEncoderEngine(RerankEngine):
+    """Cross-encoder sentence-transformers local, optionnellement compilé par buckets de longueur"""
+
+    default_model = 'BAAI/bge-reranker-v2-m3'
+    tunable = True
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        self.model = None
+        self.runner = None
+        self.batch_size = PREDICT_BATCH_SIZE
+        self.compile_mode = COMPILE_MODE
+
+    def load(self):
+        from sentence_transformers import CrossEncoder
+
+        logger.info(f"Chargement du modèle de reranking: {self.model_name}")
+        start_time = time.time()
+
+        self.model = CrossEncoder(self.model_name)
+        self.model.model.to(self.model._target_device)
+        self.model.model.eval()
+
+        load_time = time.time() - start_time
+        logger.info(f"Modèle de reranking chargé en {load_time:.2f}s")
+
+        self.runner = self._build_runner()
+
+        # Test du modèle avec un exemple simple
+        test_scores = self.score([("test query", "test document")], StageTimer())
+        logger.info(f"Test réussi - Score exemple: {test_scores[0]:.4f}")
+
+    def _build_runner(self):
+        """Prépare l'exécution du modèle (eager ou compilée par buckets selon le mode de compilation)"""
+        from compiled import BucketedRunner, batch_ladder, parse_buckets
+
+        model = self.model
+        tokenizer = model.tokenizer
+        input_names = list(tokenizer("test query", "test document").keys())
+        max_length = model.max_length or tokenizer.model_max_length
+        runner = BucketedRunner(
+            _logits_module(model.model, input_names),
+            input_names,
+            pad_values={'input_ids': tokenizer.pad_token_id or 0},
+            mode=self.compile_mode,
+            buckets=[bucket for bucket in parse_buckets(COMPILE_BUCKETS) if bucket <= max_length]
+        )
+        runner.compile(len(tokenizer), batch_sizes=batch_ladder(self.batch_size), device=model._target_device)
+        return runner
+
+    def predict_pairs(self, pairs: List[Tuple[str, str]], timer: StageTimer) -> np.ndarray:
+        """Équivalent de model.predict(pairs), chronométré par étape
+
+        Les paires sont triées par longueur pour former des batches homogènes (moins de padding),
+        puis les scores sont remis dans l'ordre d'entrée.
+        """
+        model = self.model
+        length_sorted_idx = np.argsort([-(len(query) + len(candidate)) for query, candidate in pairs], kind='stable')
+        sorted_pairs = [pairs[idx] for idx in length_sorted_idx]
+
+        batch_size = self.batch_size
+        batches = []
+        for start in range(0, len(sorted_pairs), batch_size):
+            batch = sorted_pairs[start:start + batch_size]
+            with timer.stage("tokenize"):
+                features = model.tokenizer(
+                    [query.strip() for query, _ in batch],
+                    [candidate.strip() for _, candidate in batch],
+                    padding=True,
+                    truncation='longest_first',
+                    return_tensors="pt",
+                    max_length=model.max_length
+                ).to(model._target_device)
+            with timer.stage("forward"), torch.inference_mode():
+                logits = self.runner(features)
+                batches.append(model.default_activation_function(logits)[:, 0].cpu().numpy())
+
+        scores = np.concatenate(batches)
+        return scores[np.argsort(length_sorted_idx)]
+
+    def score(self, pairs: List[Tuple[str, str]], timer: StageTimer, inline: bool = False) -> np.ndarray:
+        raw_scores = self.predict_pairs(pairs, timer)
+        with timer.stage("normalize"):
+            # Normaliser les scores entre 0 et 1 en utilisant la fonction sigmoid
+            return 1 / (1 + np.exp(-raw_scores))
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "max_length": getattr(self.model, 'max_length', 'unknown'),
+            "compile": self.runner.stats() if self.runner is not None else None
+        }
+
+    def configure(self, batch_size: Optional[int] = None, compile_mode: Optional[str] = None):
+        # Les formes compilées sont préchauffées pour batch_ladder(batch_size): tout changement reconstruit le runner
+        rebuild = compile_mode is not None and compile_mode != self.compile_mode
+        if batch_size is not None and batch_size != self.batch_size:
+            self.batch_size = batch_size
+            rebuild = rebuild or self.compile_mode != 'none'
+        if compile_mode is not None:
+            self.compile_mode = compile_mode
+        if rebuild and self.model is not None:
+            self.runner.compiled.clear()
+            self.runner = self._build_runner()
+
+    def tuning(self) -> Dict[str, Any]:
+        return {"batch_size": self.batch_size, "compile_mode": self.compile_mode}
+
+    def close(self):
+        if self.runner is not None:
+            self.runner.release()
+
+
+def _logits_module(hf_model, input_names: List[str]):
+    """Enveloppe traçable du cross-encoder: tenseurs positionnels -> logits"""
+
+    class LogitsModule(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.hf_model = hf_model
+            self.input_names = input_names
+
+        def forward(self, *tensors):
+            return self.hf_model(**dict(zip(self.input_names, tensors)), return_dict=False)[0]
+
+    return LogitsModule()
+
+
+def create_rerank_prompt(query: str, candidate: str) -> str:
+    """Create a prompt for LLM-based reranking"""
+    return f"""Rate the relevance of the following document to the query on a scale of 0.0 to 1.0.
+
+Query: {query}
+
+Document: {candidate}
+
+Respond with only a number between 0.0 and 1.0 representing the relevance score:"""
+
+
+@register_engine('ollama')
+class OllamaRerankEngine(RerankEngine):
+    """Reranking par un LLM servi par Ollama: un prompt de notation par candidat"""
+
+    default_model = 'qwen2:7b-instruct'
+    model_type = 'llm_reranker'
+    max_candidates = 20  # Limit for LLM processing
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        self.pool = create_ollama_pool()
+
+    def score_pair(self, query: str, candidate: str) -> float:
+        try:
+            response = self.pool.post(
+                "/api/generate",
+                {
+                    "model": self.model_name,
+                    "prompt": create_rerank_prompt(query, candidate),
+                    "stream": False,
+                    "options": {
+                        "temperature": 0.1,
+                        "top_p": 0.9,
+                        "max_tokens": 10
+                    }
+                }
+            )
+        except OllamaUnavailable as e:
+            raise EngineUnavailable(str(e))
+
+        if response.status_code != 200:
+            logger.warning(f"Ollama request failed: {response.text}")
+            return 0.5  # Default score
+
+        generated_text = response.json().get("response", "0.5").strip()
+
+        # Extract score from response
+        try:
+            score = float(generated_text.split('\n')[0].strip())
+            return max(0.0, min(1.0, score))  # Clamp between 0 and 1
+        except (ValueError, IndexError):
+            logger.warning(f"Could not parse score from: {generated_text}")
+            return 0.5  # Default score
+
+    def score(self, pairs: List[Tuple[str, str]], timer: StageTimer, inline: bool = False) -> np.ndarray:
+        with timer.stage("ollama"):
+            return np.array(self.pool.map(lambda pair: self.score_pair(*pair), pairs))
+
+    def health(self) -> Dict[str, Any]:
+        try:
+            endpoints = self.pool.health()
+        except OllamaUnavailable as e:
+            raise EngineUnavailable(str(e))
+        return {"ollama_urls": self.pool.urls, "ollama_endpoints": endpoints}
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "ollama_urls": self.pool.urls,
+            "ollama": self.pool.stats(),
+            "type": "real_reranking"
+        }
+
+    def close(self):
+        self.pool.close()
+
+
+@register_engine('mock')
+class WordOverlapEngine(RerankEngine):
+    """Scores fondés sur les mots communs plus un peu d'aléatoire, pour les tests sans modèle"""
+
+    default_model = 'mock-reranker'
+
+    def score(self, pairs: List[Tuple[str, str]], timer: StageTimer, inline: bool = False) -> np.ndarray:
+        scores = []
+        with timer.stage("score"):
+            for query, candidate in pairs:
+                query_words = set(query.lower().split())
+                candidate_words = set(candidate.lower().split())
+                common_words = len(query_words.intersection(candidate_words))
+                base_score = min(common_words / max(len(query_words), 1), 1.0)
+
+                # Ajouter un peu d'aléatoire et normaliser entre 0 et 1
+                random_factor = random.uniform(0.1, 0.9)
+                scores.append(base_score * 0.7 + random_factor * 0.3)
+        return np.array(scores)
+
+    def info(self) -> Dict[str, Any]:
+        return {"max_length": 512}
@@ -0,0 +1,158 @@
+"""
+Remplacement à chaud du moteur actif
+
+Le nouveau moteur est chargé et préchauffé dans un thread de fond (de priorité réduite)
+pendant que l'ancien continue de servir. La bascule est atomique: les requêtes suivantes
+sont servies par le nouveau moteur, celles déjà en cours terminent sur l'ancien, qui est
+libéré une fois vidé. Durées, mémoire et erreurs de la dernière bascule sont exposées.
+"""
+
+import gc
+import os
+import time
+import ctypes
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def memory_usage() -> Dict[str, Optional[int]]:
+    """Mémoire résidente courante et maximale du processus (Mo), lues dans /proc/self/status"""
+    usage = {"rss_mb": None, "rss_high_water_mb": None}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    usage["rss_mb"] = int(line.split()[1]) // 1024
+                elif line.startswith('VmHWM:'):
+                    usage["rss_high_water_mb"] = int(line.split()[1]) // 1024
+    except OSError:
+        import resource
+        usage["rss_high_water_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+    return usage
+
+
+def release_memory():
+    """Rend au système la mémoire libérée par le moteur remplacé
+
+    Pas de gc.collect() complet ici: il bloquerait le GIL (donc les requêtes en cours sur le
+    nouveau moteur) le temps de parcourir tout le tas. Les moteurs libèrent leurs tenseurs
+    dans close(); seules les jeunes générations sont collectées.
+    """
+    gc.collect(1)
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+    try:
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class EngineSlot:
+    """Moteur actif remplaçable à chaud, avec le nombre de requêtes en cours par moteur"""
+
+    def __init__(self, drain_warning_s: float = 60.0, loader_nice: int = 10):
+        self.engine = None
+        self.drain_warning_s = drain_warning_s
+        self.loader_nice = loader_nice
+        self._inflight: Counter = Counter()
+        self._lock = threading.Lock()
+        self._swap_thread: Optional[threading.Thread] = None
+        self.last_swap: Optional[Dict[str, Any]] = None
+
+    @contextmanager
+    def acquire(self):
+        """Moteur qui servira toute la requête, même si une bascule survient entre-temps"""
+        with self._lock:
+            engine = self.engine
+            self._inflight[id(engine)] += 1
+        try:
+            yield engine
+        finally:
+            with self._lock:
+                self._inflight[id(engine)] -= 1
+                if self._inflight[id(engine)] <= 0:
+                    del self._inflight[id(engine)]
+
+    def inflight(self, engine) -> int:
+        with self._lock:
+            return self._inflight.get(id(engine), 0)
+
+    @property
+    def swapping(self) -> bool:
+        return self._swap_thread is not None and self._swap_thread.is_alive()
+
+    def start_swap(self, factory: Callable[[], Any], target: Dict[str, Any]) -> Dict[str, Any]:
+        """Lance la bascule vers le moteur construit (et chargé) par `factory`; RuntimeError si une bascule est en cours"""
+        with self._lock:
+            if self.swapping:
+                raise RuntimeError("Un changement de modèle est déjà en cours")
+            self.last_swap = {
+                "state": "loading",
+                "from": {"engine": self.engine.name, "model": self.engine.model_name} if self.engine is not None else None,
+                "to": target,
+                "started_at": time.time(),
+                "memory_before": memory_usage()
+            }
+            self._swap_thread = threading.Thread(target=self._swap, args=(factory,), name="engine-swap", daemon=True)
+            self._swap_thread.start()
+        return self.status()
+
+    def _swap(self, factory: Callable[[], Any]):
+        status = self.last_swap
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.loader_nice)
+        except (OSError, AttributeError):
+            pass
+
+        try:
+            start = time.perf_counter()
+            new_engine = factory()
+            status["load_s"] = round(time.perf_counter() - start, 3)
+            status["memory_loaded"] = memory_usage()
+        except Exception as e:
+            logger.error(f"Échec du chargement du nouveau modèle, l'ancien reste actif: {e}")
+            status.update(state="failed", error=str(e), finished_at=time.time())
+            release_memory()
+            return
+
+        with self._lock:
+            old_engine = self.engine
+            self.engine = new_engine
+        status["state"] = "draining"
+        status["swapped_at"] = time.time()
+        logger.info(f"Bascule vers {new_engine.name}/{new_engine.model_name} effectuée en {status['load_s']}s de chargement")
+
+        if old_engine is not None:
+            # Attendre la fin des requêtes en cours sur l'ancien moteur avant de le libérer
+            drain_start = time.perf_counter()
+            warned = False
+            while self.inflight(old_engine):
+                if not warned and time.perf_counter() - drain_start > self.drain_warning_s:
+                    logger.warning(f"{self.inflight(old_engine)} requêtes encore en cours sur l'ancien modèle après {self.drain_warning_s}s")
+                    warned = True
+                time.sleep(0.01)
+            status["drain_s"] = round(time.perf_counter() - drain_start, 3)
+
+            old_engine.close()
+            del old_engine
+            release_memory()
+
+        status.update(state="done", finished_at=time.time(), memory_after=memory_usage())
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "engine": self.engine.name if self.engine is not None else None,
+            "model": self.engine.model_name if self.engine is not None else None,
+            "swapping": self.swapping,
+            "last_swap": self.last_swap,
+            "memory": memory_usage()
+        }
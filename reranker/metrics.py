@@ -0,0 +1,58 @@
+"""
+Métriques du microservice: compteurs et latences par étape (fenêtre glissante)
+"""
+
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Dict
+
+import numpy as np
+
+from profiling import StageTimer
+
+
+class ServiceMetrics:
+    """Compteurs cumulés et percentiles de latence sur les `window` dernières observations"""
+
+    def __init__(self, window: int = 2048):
+        self.window = window
+        self.started_at = time.time()
+        self.counters: Counter = Counter()
+        self._latencies: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def observe(self, name: str, duration_ms: float):
+        with self._lock:
+            self._latencies.setdefault(name, deque(maxlen=self.window)).append(duration_ms)
+
+    def observe_timer(self, endpoint: str, timer: StageTimer):
+        """Enregistre la durée totale et celle de chaque étape d'une requête"""
+        self.observe(f"{endpoint}.total", timer.total_ms())
+        for stage, duration in timer.stages.items():
+            self.observe(f"{endpoint}.{stage}", duration)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = {name: np.array(values) for name, values in self._latencies.items()}
+            counters = dict(self.counters)
+
+        return {
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "counters": counters,
+            "latency_ms": {
+                name: {
+                    "count": int(values.size),
+                    "mean": round(float(values.mean()), 3),
+                    "p50": round(float(np.percentile(values, 50)), 3),
+                    "p95": round(float(np.percentile(values, 95)), 3),
+                    "p99": round(float(np.percentile(values, 99)), 3)
+                }
+                for name, values in sorted(latencies.items())
+                if values.size
+            }
+        }
@@ -0,0 +1,141 @@
+"""
+Cache sémantique des résultats de reranking
+
+Les reformulations d'une même question produisent des embeddings de requête très proches
+et des scores de reranking quasi identiques. Le cache conserve les embeddings des requêtes
+récentes avec les scores de leurs candidats; une requête dont l'embedding a une similarité
+cosinus >= `threshold` avec une entrée couvrant tous ses candidats reçoit les scores en cache
+sans passer par le cross-encoder.
+"""
+
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Bornes de l'histogramme des meilleures similarités observées
+SIMILARITY_BINS = (0.5, 0.8, 0.9, 0.95, 0.98, 0.99)
+
+
+class _Entry:
+    __slots__ = ('scores', 'variant')
+
+    def __init__(self, scores: Dict[Hashable, float], variant: Hashable):
+        self.scores = scores
+        self.variant = variant
+
+
+class SemanticCache:
+    """Cache LRU borné de (embedding de requête, scores par candidat) avec recherche par similarité"""
+
+    def __init__(self, max_entries: int, threshold: float, window: int = 2048):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._similarities: deque = deque(maxlen=window)
+        self._histogram = np.zeros(len(SIMILARITY_BINS) + 1, dtype=np.int64)
+        self._vectors: Optional[np.ndarray] = None  # une ligne par emplacement
+        self._entries: Dict[int, _Entry] = {}
+        self._lru: OrderedDict = OrderedDict()  # emplacement -> None, du plus ancien au plus récent
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def lookup(self, query_vector: Sequence[float], keys: Sequence[Hashable], variant: Hashable = None) -> Optional[Tuple[np.ndarray, float]]:
+        """Scores en cache des candidats `keys` (dans l'ordre) et similarité de l'entrée, ou None"""
+        if not self.enabled:
+            return None
+
+        query = self._normalize(query_vector)
+        with self._lock:
+            best_similarity = None
+            result = None
+
+            if self._entries and query.shape[0] == self._vectors.shape[1]:
+                slots = np.fromiter(self._entries.keys(), dtype=np.int64, count=len(self._entries))
+                similarities = self._vectors[slots] @ query
+                order = np.argsort(-similarities)
+                best_similarity = float(similarities[order[0]])
+
+                for i in order:
+                    similarity = float(similarities[i])
+                    if similarity < self.threshold:
+                        break
+                    entry = self._entries[int(slots[i])]
+                    if entry.variant == variant and all(key in entry.scores for key in keys):
+                        self._lru.move_to_end(int(slots[i]))
+                        result = (np.array([entry.scores[key] for key in keys]), similarity)
+                        break
+
+            if best_similarity is not None:
+                self._similarities.append(best_similarity)
+                self._histogram[np.searchsorted(SIMILARITY_BINS, best_similarity, side='right')] += 1
+
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return result
+
+    def put(self, query_vector: Sequence[float], keys: Sequence[Hashable], scores: Sequence[float], variant: Hashable = None):
+        if not self.enabled:
+            return
+
+        query = self._normalize(query_vector)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != query.shape[0]:
+                # Première entrée ou changement de dimension des embeddings: repartir de zéro
+                self._vectors = np.zeros((self.max_entries, query.shape[0]), dtype=np.float32)
+                self._entries.clear()
+                self._lru.clear()
+
+            if len(self._entries) < self.max_entries:
+                slot = len(self._entries)
+            else:
+                slot, _ = self._lru.popitem(last=False)
+
+            self._vectors[slot] = query
+            self._entries[slot] = _Entry(dict(zip(keys, (float(score) for score in scores))), variant)
+            self._lru[slot] = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._lru.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            similarities = np.array(self._similarities)
+            histogram = self._histogram.tolist()
+            entries = len(self._entries)
+
+        lookups = self.hits + self.misses
+        edges = ('0',) + tuple(str(bound) for bound in SIMILARITY_BINS) + ('1',)
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            # Meilleure similarité trouvée à chaque recherche (fenêtre glissante et histogramme cumulé)
+            "similarity": {
+                "count": int(similarities.size),
+                "p50": round(float(np.percentile(similarities, 50)), 4),
+                "p90": round(float(np.percentile(similarities, 90)), 4),
+                "p99": round(float(np.percentile(similarities, 99)), 4)
+            } if similarities.size else None,
+            "similarity_histogram": {
+                f"{edges[i]}-{edges[i + 1]}": count for i, count in enumerate(histogram)
+            }
+        }
@@ -0,0 +1,25 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Vérifie que les modules partagés par l'embedder et le reranker sont restés identiques.
+# Chaque service est construit depuis son propre répertoire (contexte Docker): les modules
+# communs y sont copiés, et toute modification doit être reportée dans les deux copies.
+cd "$(dirname "$0")/.."
+
+SHARED_MODULES="autotune cache compiled hotswap metrics ollama_pool profiling scheduler"
+DRIFT=0
+
+for module in $SHARED_MODULES; do
+    if ! diff -u "embedder/$module.py" "reranker/$module.py" > /dev/null; then
+        echo "❌ $module.py diffère entre embedder/ et reranker/:"
+        diff -u "embedder/$module.py" "reranker/$module.py" | head -n 40 || true
+        DRIFT=1
+    fi
+done
+
+if [ "$DRIFT" -ne 0 ]; then
+    echo "Reporter la modification dans les deux services (cp embedder/<module>.py reranker/)"
+    exit 1
+fi
+
+echo "✅ Modules partagés identiques ($SHARED_MODULES)"
@@ -0,0 +1,83 @@
+#!/usr/bin/env bash
+# Fonctions communes aux tests qui démarrent eux-mêmes les microservices avec les moteurs
+# de test (EMBED_ENGINE=mock / RERANKER_ENGINE=mock), sans Docker ni modèle à télécharger.
+# À sourcer depuis un script de test: source "$(dirname "$0")/lib_services.sh"
+
+REPO_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
+PYTHON="${PYTHON:-python3}"
+SERVICE_PIDS=()
+SERVICE_LOGDIR=$(mktemp -d)
+
+stop_services() {
+    for pid in "${SERVICE_PIDS[@]:-}"; do
+        [ -n "$pid" ] && kill "$pid" 2> /dev/null || true
+    done
+    wait 2> /dev/null || true
+    rm -rf "$SERVICE_LOGDIR"
+}
+trap stop_services EXIT
+
+# Port TCP libre sur l'interface locale
+free_port() {
+    "$PYTHON" -c 'import socket; s = socket.socket(); s.bind(("", 0)); print(s.getsockname()[1]); s.close()'
+}
+
+# launch_service <embedder|reranker|gateway> <port> [VAR=valeur ...]
+# Démarre le service en arrière-plan sans attendre (pid dans LAST_SERVICE_PID)
+launch_service() {
+    local service=$1 port=$2
+    shift 2
+    (cd "$REPO_ROOT/$service" && exec env HOST=127.0.0.1 PORT="$port" "$@" "$PYTHON" app.py) \
+        > "$SERVICE_LOGDIR/$service-$port.log" 2>&1 &
+    SERVICE_PIDS+=($!)
+    LAST_SERVICE_PID=$!
+}
+
+# start_service <embedder|reranker|gateway> <port> [VAR=valeur ...]
+# Démarre le service en arrière-plan et attend que /health réponde
+start_service() {
+    launch_service "$@"
+    wait_healthy "http://127.0.0.1:$2" "$SERVICE_LOGDIR/$1-$2.log"
+}
+
+# stop_service <pid>
+stop_service() {
+    kill "$1" 2> /dev/null || true
+    wait "$1" 2> /dev/null || true
+}
+
+wait_healthy() {
+    local url=$1 log=$2
+    for _ in $(seq 1 120); do
+        if curl -sf "$url/health" > /dev/null 2>&1; then
+            return 0
+        fi
+        sleep 0.5
+    done
+    echo "❌ Service $url injoignable, journal:"
+    tail -n 30 "$log"
+    exit 1
+}
+
+# wait_listening <url>: attend une réponse HTTP quelconque de /health (service démarré mais pas forcément prêt)
+wait_listening() {
+    for _ in $(seq 1 120); do
+        if [ "$(curl -s -o /dev/null -w '%{http_code}' "$1/health")" != "000" ]; then
+            return 0
+        fi
+        sleep 0.5
+    done
+    echo "❌ Service $1 injoignable"
+    exit 1
+}
+
+# check <description> <expression jq> <json>
+check() {
+    if echo "$3" | jq -e "$2" > /dev/null; then
+        echo "✅ $1"
+    else
+        echo "❌ $1 failed"
+        echo "Réponse: $3"
+        exit 1
+    fi
+}
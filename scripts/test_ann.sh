@@ -0,0 +1,195 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Test de l'index vectoriel co-localisé (ANN) avec le moteur de test de l'embedder, dont les
+# vecteurs sont stables par texte: entraînement en arrière-plan, rappel après redémarrage,
+# compactage des lignes mortes et ré-entraînement quand l'index grossit
+source "$(dirname "$0")/lib_services.sh"
+
+EMBED_PORT=$(free_port)
+EMBEDDER_URL="http://127.0.0.1:$EMBED_PORT"
+ANN_DIR="$SERVICE_LOGDIR/ann"
+INDEX="notebook_test"
+ANN_ENV=(EMBED_ENGINE=mock ANN_ENABLED=true ANN_DIR="$ANN_DIR" ANN_TRAIN_SIZE=300 ANN_RETRAIN_FACTOR=2 ANN_COMPACT_RATIO=0.3 ADMIN_TOKEN=secret)
+
+echo "Test de l'index vectoriel"
+echo "========================="
+
+echo ""
+echo "Démarrage de l'embedder (moteur de test, ANN_TRAIN_SIZE=300)..."
+start_service embedder "$EMBED_PORT" "${ANN_ENV[@]}"
+echo "✅ Embedder démarré"
+
+# index_chunks <premier> <dernier>: indexe les chunks "chunk <i>" sous l'identifiant "doc-<i>", par lots de 100
+index_chunks() {
+    local body start end
+    for start in $(seq "$1" 100 "$2"); do
+        end=$(( start + 99 < $2 ? start + 99 : $2 ))
+        body=$(jq -cn --arg index "$INDEX" --argjson first "$start" --argjson last "$end" \
+            '{index: $index, texts: [range($first; $last + 1) | "chunk \(.)"], ids: [range($first; $last + 1) | "doc-\(.)"]}')
+        curl -sf -o /dev/null -H "Content-Type: application/json" -H "X-Admin-Token: secret" -d "$body" "$EMBEDDER_URL/embed"
+    done
+}
+
+index_stats() {
+    curl -s "$EMBEDDER_URL/index" | jq -c --arg index "$INDEX" '.indexes[] | select(.name == $index)'
+}
+
+# wait_index <expression jq>: attend que l'état de l'index vérifie l'expression (maintenance en arrière-plan)
+wait_index() {
+    for _ in $(seq 1 120); do
+        if index_stats | jq -e "$1 and .maintenance.state != \"running\"" > /dev/null; then
+            return 0
+        fi
+        sleep 0.5
+    done
+    echo "❌ Index: '$1' jamais atteint"
+    index_stats
+    exit 1
+}
+
+# recall <premier> <dernier>: part des chunks retrouvés en tête de /search avec leur propre texte
+recall() {
+    local hits=0 total=0
+    for i in $(seq "$1" 5 "$2"); do
+        TOP=$(curl -s -H "Content-Type: application/json" \
+            -d "{\"index\": \"$INDEX\", \"query\": \"chunk $i\", \"k\": 5}" "$EMBEDDER_URL/search" | jq -r '.ids[0]')
+        [ "$TOP" == "doc-$i" ] && hits=$((hits + 1))
+        total=$((total + 1))
+    done
+    python3 -c "print(round($hits / $total, 3))"
+}
+
+# Test 1: Recherche exacte sous le seuil d'entraînement
+echo ""
+echo "1. Test de la recherche exacte..."
+index_chunks 1 200
+RESPONSE=$(curl -s -H "Content-Type: application/json" -d "{\"index\": \"$INDEX\", \"query\": \"chunk 42\", \"k\": 3}" "$EMBEDDER_URL/search")
+check "Recherche exacte, chunk retrouvé" '.exact == true and .ids[0] == "doc-42" and (.scores[0] > 0.999)' "$RESPONSE"
+
+# Test 2: Le franchissement du seuil n'entraîne pas dans l'appel /embed mais en arrière-plan
+echo ""
+echo "2. Test de l'entraînement en arrière-plan..."
+index_chunks 201 400
+wait_index '.trained == true'
+STATS=$(index_stats)
+echo "Index: $STATS"
+check "Index entraîné dès ANN_TRAIN_SIZE éléments, ajouts suivants encodés" '.trained_rows >= 300 and .items == 400 and .rows == 400' "$STATS"
+
+RECALL=$(recall 1 400)
+echo "Rappel@1 IVF-PQ: $RECALL"
+if python3 -c "import sys; sys.exit(0 if $RECALL >= 0.9 else 1)"; then
+    echo "✅ Rappel OK"
+else
+    echo "❌ Rappel trop faible"
+    exit 1
+fi
+
+# Test 3: Rappel identique après redémarrage (index rouvert depuis le disque)
+echo ""
+echo "3. Test du rappel après redémarrage..."
+stop_service "$LAST_SERVICE_PID"
+start_service embedder "$EMBED_PORT" "${ANN_ENV[@]}"
+RESPONSE=$(curl -s -H "Content-Type: application/json" -d "{\"index\": \"$INDEX\", \"query\": \"chunk 7\", \"k\": 3}" "$EMBEDDER_URL/search")
+check "Recherche IVF-PQ après réouverture" '.exact == false and .ids[0] == "doc-7"' "$RESPONSE"
+
+RECALL_AFTER=$(recall 1 400)
+echo "Rappel@1 après redémarrage: $RECALL_AFTER"
+if [ "$RECALL_AFTER" == "$RECALL" ]; then
+    echo "✅ Rappel conservé"
+else
+    echo "❌ Rappel modifié par le redémarrage ($RECALL -> $RECALL_AFTER)"
+    exit 1
+fi
+
+# Test 4: Les suppressions au-delà de ANN_COMPACT_RATIO déclenchent un compactage
+echo ""
+echo "4. Test du compactage..."
+REMOVE=$(jq -cn '{ids: [range(1; 151) | "doc-\(.)"]}')
+curl -sf -o /dev/null -H "Content-Type: application/json" -H "X-Admin-Token: secret" -d "$REMOVE" "$EMBEDDER_URL/index/$INDEX/remove"
+wait_index '.dead_rows == 0'
+STATS=$(index_stats)
+echo "Index: $STATS"
+check "Lignes mortes retirées" '.items == 250 and .rows == 250' "$STATS"
+
+RESPONSE=$(curl -s -H "Content-Type: application/json" -d "{\"index\": \"$INDEX\", \"query\": \"chunk 10\", \"k\": 250}" "$EMBEDDER_URL/search")
+check "Chunk supprimé absent des résultats" '(.ids | index("doc-10")) == null' "$RESPONSE"
+RECALL=$(recall 151 400)
+echo "Rappel@1 après compactage: $RECALL"
+if python3 -c "import sys; sys.exit(0 if $RECALL >= 0.9 else 1)"; then
+    echo "✅ Rappel OK"
+else
+    echo "❌ Rappel trop faible"
+    exit 1
+fi
+
+# Test 5: Ré-entraînement quand l'index dépasse ANN_RETRAIN_FACTOR fois sa taille d'entraînement
+echo ""
+echo "5. Test du ré-entraînement..."
+index_chunks 401 1000
+wait_index '.items == 850 and .trained_rows > 300'
+STATS=$(index_stats)
+echo "Index: $STATS"
+check "Index ré-entraîné au-delà de 2 fois sa taille d'entraînement" '.trained_rows > 600' "$STATS"
+
+# Test 6: Écritures dans l'index et ré-entraînement explicite protégés par ADMIN_TOKEN
+echo ""
+echo "6. Test de /index/{name}/train et des écritures sans jeton..."
+for request in "index/$INDEX/train|" "index/$INDEX/remove|{\"ids\": [\"doc-400\"]}" \
+    "embed|{\"texts\": [\"chunk 1\"], \"index\": \"$INDEX\", \"ids\": [\"doc-1\"]}" \
+    "embed|{\"texts\": [\"chunk 1\"], \"index\": \"autre_index\", \"ids\": [\"doc-1\"]}"; do
+    CODE=$(curl -s -o /dev/null -w '%{http_code}' -X POST -H "Content-Type: application/json" -d "${request#*|}" "$EMBEDDER_URL/${request%%|*}")
+    if [ "$CODE" == "403" ]; then
+        echo "✅ /${request%%|*} sans jeton refusé"
+    else
+        echo "❌ /${request%%|*} sans jeton accepté ($CODE)"
+        exit 1
+    fi
+done
+check "Index inchangé, aucun autre index créé" \
+    "[.indexes[] | .name] == [\"$INDEX\"] and (.indexes[0].items == 850)" "$(curl -s "$EMBEDDER_URL/index")"
+check "Embeddings sans index toujours ouverts" '.vectors | length == 1' \
+    "$(curl -s -H "Content-Type: application/json" -d '{"texts": ["texte libre"]}' "$EMBEDDER_URL/embed")"
+RESPONSE=$(curl -s -X POST -H "X-Admin-Token: secret" "$EMBEDDER_URL/index/$INDEX/train?wait=true")
+check "Ré-entraînement explicite" '.trained == true and .trained_rows == 850 and .dead_rows == 0' "$RESPONSE"
+
+# Test 7: Compactage interrompu, terminé ou annulé à la réouverture
+echo ""
+echo "7. Test de reprise d'un compactage interrompu..."
+PYTHONPATH="$REPO_ROOT/embedder" python3 - "$SERVICE_LOGDIR/recovery" <<'PY'
+import os, shutil, sys
+import numpy as np
+from ann import VectorIndex
+
+directory = sys.argv[1]
+rng = np.random.default_rng(0)
+vectors = rng.standard_normal((50, 32)).astype(np.float32)
+vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+index = VectorIndex(directory, dim=32, model="test", train_size=1000, background=False)
+index.upsert([f"doc-{i}" for i in range(50)], vectors)
+index.remove([f"doc-{i}" for i in range(20)])
+
+# Arrêt après le point de validation: compact/ complet mais pas encore déplacé
+index.rebuild(retrain=False)
+shutil.copytree(directory, directory + ".compacted")
+index.upsert(["doc-new"], vectors[:1])
+os.makedirs(os.path.join(directory, "compact"))
+for filename in os.listdir(directory + ".compacted"):
+    if os.path.isfile(os.path.join(directory + ".compacted", filename)):
+        shutil.copy(os.path.join(directory + ".compacted", filename), os.path.join(directory, "compact", filename))
+reopened = VectorIndex(directory)
+assert len(reopened) == 30 and reopened.stats()["rows"] == 30, reopened.stats()
+assert not os.path.exists(os.path.join(directory, "compact"))
+
+# Arrêt avant le point de validation: compact.tmp/ ignoré
+os.makedirs(os.path.join(directory, "compact.tmp"))
+open(os.path.join(directory, "compact.tmp", "meta.json"), "w").write("{}")
+reopened = VectorIndex(directory)
+assert len(reopened) == 30 and not os.path.exists(os.path.join(directory, "compact.tmp"))
+ids, scores, exact = reopened.search(vectors[25], 1)
+assert ids == ["doc-25"] and exact, ids
+print("✅ Compactage validé terminé, compactage incomplet annulé")
+PY
+
+echo ""
+echo "🎉 Tous les tests de l'index vectoriel sont passés !"
@@ -0,0 +1,116 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Test de la calibration au démarrage (autotune.py) avec un moteur dont le coût d'un batch
+# est connu: moteur publié seulement après le balayage, profil enregistré puis relu, et
+# réglages par défaut rétablis quand la calibration échoue
+cd "$(dirname "$0")/.."
+
+echo "Test de la calibration"
+echo "======================"
+echo ""
+
+AUTOTUNE_DIR=$(mktemp -d)
+trap 'rm -rf "$AUTOTUNE_DIR"' EXIT
+
+PYTHONPATH=embedder python3 - "$AUTOTUNE_DIR" <<'PY'
+import os
+import sys
+import time
+
+import torch
+
+from autotune import EngineTuning
+from scheduler import BatchScheduler
+
+DIRECTORY = sys.argv[1]
+TRIAL_S = 0.2
+
+
+def check(description, condition):
+    if not condition:
+        print(f"❌ {description} failed")
+        sys.exit(1)
+    print(f"✅ {description}")
+
+
+class BatchCostEngine:
+    """Moteur local dont chaque batch coûte 20ms plus 1ms par élément: les grands batches vont plus vite"""
+
+    name = 'batch-cost'
+    tunable = True
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.batch_size = 8
+        self.compile_mode = 'none'
+
+    def call(self, items):
+        for start in range(0, len(items), self.batch_size):
+            time.sleep(0.02 + 0.001 * len(items[start:start + self.batch_size]))
+        return items
+
+    def configure(self, batch_size=None, compile_mode=None):
+        self.batch_size = batch_size or self.batch_size
+        self.compile_mode = compile_mode or self.compile_mode
+
+    def tuning(self):
+        return {"batch_size": self.batch_size, "compile_mode": self.compile_mode}
+
+
+def workload(rng):
+    return [f"texte {i}" for i in range(32)]
+
+
+def tuning(mode, directory=DIRECTORY):
+    return EngineTuning(mode, directory, latency_target_ms=1000, trial_s=TRIAL_S, call_items=32,
+                        batch_sizes=[8, 16, 32], compile_modes=[])
+
+
+scheduler = BatchScheduler(lambda items, timer, key: items)
+
+# Test 1: Moteur publié seulement à la fin du balayage (aucune requête pendant les mesures)
+print("1. Test de la calibration avant mise en service...")
+engine = BatchCostEngine("modele-a")
+tuner = tuning('auto')
+tuner.apply(engine, scheduler, workload, engine.call, startup=True)
+check("Calibration préparée, pas encore lancée", tuner.calibrating and tuner.thread is None and engine.batch_size == 8)
+
+published = []
+tuner.start_calibration(lambda: published.append(engine.batch_size))
+time.sleep(TRIAL_S / 2)
+check("Moteur non publié pendant le balayage", published == [] and tuner.calibrating)
+
+check("Calibration terminée", tuner.wait(30))
+info = tuner.info(engine, scheduler)
+print(f"Réglages: {info['settings']} ({info['items_per_s']} éléments/s)")
+check("Moteur publié une fois, avec le profil mesuré", published == [32] and not tuner.calibrating)
+check("Profil mesuré appliqué et enregistré", info["source"] == "calibrated" and os.path.exists(info["profile"]))
+
+# Test 2: Démarrage suivant, profil relu sans balayage
+print("")
+print("2. Test du profil relu...")
+engine = BatchCostEngine("modele-a")
+tuner = tuning('auto')
+tuner.apply(engine, scheduler, workload, engine.call, startup=True)
+check("Profil relu et appliqué immédiatement",
+      not tuner.calibrating and tuner.info(engine, scheduler)["source"] == "profile" and engine.batch_size == 32)
+
+# Test 3: Échec après le balayage (profil non enregistrable): réglages par défaut rétablis, moteur publié
+print("")
+print("3. Test d'une calibration en échec...")
+threads = torch.get_num_threads()
+unwritable = os.path.join(DIRECTORY, "fichier")
+open(unwritable, "w").close()
+engine = BatchCostEngine("modele-b")
+tuner = tuning('force', directory=unwritable)
+tuner.apply(engine, scheduler, workload, engine.call, startup=True)
+published = []
+tuner.start_calibration(lambda: published.append(engine.batch_size))
+check("Calibration terminée", tuner.wait(30))
+check("Moteur publié avec ses réglages par défaut",
+      published == [8] and tuner.info(engine, scheduler)["source"] == "defaults" and torch.get_num_threads() == threads)
+PY
+
+echo ""
+echo "🎉 Tous les tests de la calibration sont passés !"
@@ -0,0 +1,54 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Test du regroupement des candidats quasi-dupliqués avec le moteur de test du reranker
+source "$(dirname "$0")/lib_services.sh"
+
+RERANK_PORT=$(free_port)
+RERANKER_URL="http://127.0.0.1:$RERANK_PORT"
+
+echo "Test du dédoublonnage des candidats"
+echo "==================================="
+
+echo ""
+echo "Démarrage du reranker (moteur de test, DEDUP_MARGIN=0.05)..."
+start_service reranker "$RERANK_PORT" RERANKER_ENGINE=mock DEDUP_MARGIN=0.05
+echo "✅ Reranker démarré"
+
+# Deux chunks adjacents qui ne diffèrent que par leur dernier mot, une copie exacte et un texte distinct
+CHUNK="la recherche vectorielle retrouve les passages proches de la question puis le reranker les réordonne selon leur pertinence réelle pour produire un contexte compact et fiable destiné au modèle de langage"
+PAYLOAD=$(jq -cn --arg chunk "$CHUNK" '{
+    query: "recherche vectorielle et reranker",
+    candidates: [$chunk, ($chunk + " final"), "une recette de tarte aux pommes sans gluten", $chunk],
+    dedup: true
+}')
+
+# Test 1: Les quasi-doublons sont regroupés derrière le premier (le représentant)
+echo ""
+echo "1. Test de regroupement sur /rerank..."
+RESPONSE=$(curl -s -H "Content-Type: application/json" -d "$PAYLOAD" "$RERANKER_URL/rerank")
+echo "Réponse: $RESPONSE"
+
+check "Doublons regroupés" '.groups == [[0, 1, 3], [2]]' "$RESPONSE"
+check "Score du représentant propagé aux doublons (moins la marge)" \
+    '((.scores[0] - 0.05 - .scores[1]) | fabs) < 1e-9 and ((.scores[0] - 0.05 - .scores[3]) | fabs) < 1e-9' "$RESPONSE"
+check "Un score par candidat" '.scores | length == 4' "$RESPONSE"
+
+# Test 2: Sans dédoublonnage, aucun groupe n'est renvoyé
+echo ""
+echo "2. Test sans dédoublonnage..."
+RESPONSE=$(curl -s -H "Content-Type: application/json" -d "$(echo "$PAYLOAD" | jq -c '.dedup = false')" "$RERANKER_URL/rerank")
+check "Pas de groupes quand dedup=false" 'has("groups") | not' "$RESPONSE"
+
+# Test 3: Groupes par requête sur /rerank/multi
+echo ""
+echo "3. Test de regroupement sur /rerank/multi..."
+MULTI=$(echo "$PAYLOAD" | jq -c '{groups: [{query, candidates}, {query: "tarte", candidates: ["tarte aux pommes", "tarte aux pommes"]}], dedup: true}')
+RESPONSE=$(curl -s -H "Content-Type: application/json" -d "$MULTI" "$RERANKER_URL/rerank/multi")
+echo "Réponse: $RESPONSE"
+
+check "Groupes de doublons par requête" '.duplicate_groups == [[[0, 1, 3], [2]], [[0, 1]]]' "$RESPONSE"
+check "Scores des doublons alignés sur le représentant" '((.scores[1][0] - 0.05 - .scores[1][1]) | fabs) < 1e-9' "$RESPONSE"
+
+echo ""
+echo "🎉 Tous les tests de dédoublonnage sont passés !"
@@ -0,0 +1,79 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Test de la couche moteur commune: ordonnanceur, cache, métriques et moteur indisponible
+source "$(dirname "$0")/lib_services.sh"
+
+EMBED_PORT=$(free_port)
+RERANK_PORT=$(free_port)
+OLLAMA_PORT=$(free_port)
+EMBEDDER_URL="http://127.0.0.1:$EMBED_PORT"
+RERANKER_URL="http://127.0.0.1:$RERANK_PORT"
+
+echo "Test de la couche moteur"
+echo "========================"
+
+# Test 0: Modules partagés identiques entre les deux services
+echo ""
+echo "0. Test des modules partagés..."
+bash "$REPO_ROOT/scripts/check_shared_modules.sh"
+
+echo ""
+echo "Démarrage des services (moteurs de test)..."
+start_service embedder "$EMBED_PORT" EMBED_ENGINE=mock SCHEDULER_MAX_WAIT_MS=200
+start_service reranker "$RERANK_PORT" RERANKER_ENGINE=mock
+echo "✅ Services démarrés"
+
+# Test 1: Le moteur choisi est exposé par /info et /metrics
+echo ""
+echo "1. Test du moteur actif..."
+check "Moteur de test de l'embedder" '.engine == "mock" and .model == "mock-embedder"' "$(curl -s "$EMBEDDER_URL/metrics")"
+check "Moteur de test du reranker" '.engine == "mock"' "$(curl -s "$RERANKER_URL/metrics")"
+
+# Test 2: Requêtes simultanées regroupées en un seul batch par l'ordonnanceur
+echo ""
+echo "2. Test du regroupement des requêtes simultanées..."
+PIDS=()
+for i in 1 2 3 4; do
+    curl -s -o /dev/null -H "Content-Type: application/json" -d "{\"texts\": [\"texte $i\", \"texte commun\"]}" "$EMBEDDER_URL/embed" &
+    PIDS+=($!)
+done
+wait "${PIDS[@]}"
+METRICS=$(curl -s "$EMBEDDER_URL/metrics")
+echo "Ordonnanceur: $(echo "$METRICS" | jq -c '.scheduler')"
+check "Requêtes regroupées (moins de batches que de requêtes)" '.scheduler.batches < 4 and .scheduler.coalesced_requests >= 1' "$METRICS"
+check "Compteurs de requêtes et de textes" '.counters.requests == 4 and .counters.texts == 8' "$METRICS"
+check "Percentiles par étape" '.latency_ms["embed.total"].count == 4 and (.latency_ms["embed.total"] | has("p95"))' "$METRICS"
+
+# Test 3: Cache des vecteurs (même texte, même vecteur, sans repasser par le moteur)
+echo ""
+echo "3. Test du cache..."
+FIRST=$(curl -s -H "Content-Type: application/json" -d '{"texts": ["texte 1"]}' "$EMBEDDER_URL/embed")
+SECOND=$(curl -s -H "Content-Type: application/json" -d '{"texts": ["texte 1"]}' "$EMBEDDER_URL/embed")
+check "Vecteur identique" "(.vectors == $(echo "$FIRST" | jq -c '.vectors'))" "$SECOND"
+METRICS=$(curl -s "$EMBEDDER_URL/metrics")
+check "Lectures servies par le cache" '.cache.hits >= 2 and .scheduler.items == 8' "$METRICS"
+
+RERANK='{"query": "chat noir", "candidates": ["le chat noir", "un chien"]}'
+FIRST=$(curl -s -H "Content-Type: application/json" -d "$RERANK" "$RERANKER_URL/rerank")
+SECOND=$(curl -s -H "Content-Type: application/json" -d "$RERANK" "$RERANKER_URL/rerank")
+check "Scores de reranking en cache (moteur aléatoire, mêmes scores)" "(.scores == $(echo "$FIRST" | jq -c '.scores'))" "$SECOND"
+
+# Test 4: Moteur injoignable -> 503 et service non prêt
+echo ""
+echo "4. Test d'un moteur indisponible (Ollama injoignable)..."
+launch_service embedder "$OLLAMA_PORT" EMBED_ENGINE=ollama OLLAMA_URLS="http://127.0.0.1:9" OLLAMA_TIMEOUT=1
+wait_listening "http://127.0.0.1:$OLLAMA_PORT"
+CODE=$(curl -s -o /dev/null -w '%{http_code}' "http://127.0.0.1:$OLLAMA_PORT/health")
+EMBED_CODE=$(curl -s -o /dev/null -w '%{http_code}' -H "Content-Type: application/json" -d '{"texts": ["a"]}' "http://127.0.0.1:$OLLAMA_PORT/embed")
+echo "Health: $CODE, /embed: $EMBED_CODE"
+
+if [ "$CODE" == "503" ] && [ "$EMBED_CODE" == "503" ]; then
+    echo "✅ Indisponibilité du moteur signalée par 503"
+else
+    echo "❌ Moteur indisponible mal signalé"
+    exit 1
+fi
+
+echo ""
+echo "🎉 Tous les tests de la couche moteur sont passés !"
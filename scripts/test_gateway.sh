@@ -0,0 +1,175 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Test de la passerelle de répartition devant des réplicas lancés avec les moteurs de test:
+# charge bornée, routage du reranking par candidats, index vectoriels sans repli (503 quand
+# le réplica propriétaire est arrêté), diffusion de /admin/model à tous les réplicas, corps
+# invalides refusés en 422 et réplica par défaut selon GATEWAY_SERVICE
+source "$(dirname "$0")/lib_services.sh"
+
+EMBED_PORTS=($(free_port) $(free_port) $(free_port))
+RERANK_PORTS=($(free_port) $(free_port))
+EMBED_GATEWAY_PORT=$(free_port)
+RERANK_GATEWAY_PORT=$(free_port)
+EMBED_GATEWAY="http://127.0.0.1:$EMBED_GATEWAY_PORT"
+RERANK_GATEWAY="http://127.0.0.1:$RERANK_GATEWAY_PORT"
+declare -A REPLICA_PIDS
+
+echo "Test de la passerelle"
+echo "====================="
+
+echo ""
+echo "Démarrage des réplicas et des passerelles (moteurs de test)..."
+EMBED_URLS=""
+for port in "${EMBED_PORTS[@]}"; do
+    # Chaque requête attend 300ms dans l'ordonnanceur: le travail en cours s'accumule
+    start_service embedder "$port" EMBED_ENGINE=mock SCHEDULER_MAX_WAIT_MS=300 ANN_ENABLED=true ANN_DIR="$SERVICE_LOGDIR/ann-$port" ADMIN_TOKEN=secret
+    REPLICA_PIDS["http://127.0.0.1:$port"]=$LAST_SERVICE_PID
+    EMBED_URLS="$EMBED_URLS,http://127.0.0.1:$port"
+done
+RERANK_URLS=""
+for port in "${RERANK_PORTS[@]}"; do
+    start_service reranker "$port" RERANKER_ENGINE=mock
+    RERANK_URLS="$RERANK_URLS,http://127.0.0.1:$port"
+done
+GATEWAY_ENV=(GATEWAY_HEALTH_INTERVAL_S=0.5 GATEWAY_EJECT_AFTER=1 GATEWAY_LOAD_FACTOR=1.25)
+start_service gateway "$EMBED_GATEWAY_PORT" GATEWAY_SERVICE=embedder GATEWAY_REPLICAS="${EMBED_URLS#,}" "${GATEWAY_ENV[@]}"
+start_service gateway "$RERANK_GATEWAY_PORT" GATEWAY_SERVICE=reranker GATEWAY_REPLICAS="${RERANK_URLS#,}" "${GATEWAY_ENV[@]}"
+echo "✅ 3 réplicas embedder, 2 réplicas reranker, 2 passerelles"
+
+# Test 1: Lot découpé par réplica propriétaire puis réassemblé dans l'ordre
+echo ""
+echo "1. Test du découpage de /embed..."
+TEXTS=$(jq -cn '[range(30) | "texte \(.)"]')
+VIA_GATEWAY=$(curl -s -H "Content-Type: application/json" -d "{\"texts\": $TEXTS}" "$EMBED_GATEWAY/embed")
+DIRECT=$(curl -s -H "Content-Type: application/json" -d "{\"texts\": $TEXTS}" "http://127.0.0.1:${EMBED_PORTS[0]}/embed")
+if [ "$(echo "$VIA_GATEWAY" | jq -c '.vectors' | md5sum)" == "$(echo "$DIRECT" | jq -c '.vectors' | md5sum)" ]; then
+    echo "✅ Vecteurs dans l'ordre des textes"
+else
+    echo "❌ Vecteurs réassemblés dans le désordre"
+    exit 1
+fi
+STATS=$(curl -s "$EMBED_GATEWAY/metrics" | jq -c '.gateway')
+check "Lot réparti sur plusieurs réplicas" '[.replicas[] | select(.requests > 0)] | length >= 2' "$STATS"
+
+# Test 2: Charge bornée, une clé très demandée déborde sur les autres réplicas
+echo ""
+echo "2. Test de la charge bornée..."
+BEFORE=$(curl -s "$EMBED_GATEWAY/metrics" | jq -c '[.gateway.replicas[].requests]')
+PIDS=()
+for _ in $(seq 1 12); do
+    curl -s -o /dev/null -H "Content-Type: application/json" -d '{"texts": ["clé très demandée"]}' "$EMBED_GATEWAY/embed" &
+    PIDS+=($!)
+done
+wait "${PIDS[@]}"
+STATS=$(curl -s "$EMBED_GATEWAY/metrics" | jq -c --argjson before "$BEFORE" \
+    '{spills: .gateway.spills, requests: [.gateway.replicas | to_entries[] | .value.requests - $before[.key]]}')
+echo "Requêtes par réplica: $STATS"
+check "Débordements vers d'autres réplicas" '.spills > 0' "$STATS"
+check "Aucun réplica au-delà de la borne (1.25 x 12 / 3 = 5 requêtes simultanées)" '(.requests | max) <= 5 and (.requests | add) == 12' "$STATS"
+
+# Test 3: Routage du reranking par candidats, indépendamment de la formulation et de l'ordre
+echo ""
+echo "3. Test du routage de /rerank..."
+BEFORE=$(curl -s "$RERANK_GATEWAY/metrics" | jq -c '[.gateway.replicas[].requests]')
+for query in "qu'est-ce qu'un index ivfflat" "comment fonctionne ivfflat" "ivfflat, c'est quoi" "explique l'index ivfflat"; do
+    curl -sf -o /dev/null -H "Content-Type: application/json" \
+        -d "$(jq -cn --arg query "$query" '{query: $query, candidates: (["ivfflat partitionne les vecteurs", "les listes sont sondées", "hnsw est un graphe"] | if ($query | length) % 2 == 0 then reverse else . end)}')" \
+        "$RERANK_GATEWAY/rerank"
+done
+STATS=$(curl -s "$RERANK_GATEWAY/metrics" | jq -c --argjson before "$BEFORE" '[.gateway.replicas | to_entries[] | .value.requests - $before[.key]]')
+echo "Requêtes par réplica: $STATS"
+check "Reformulations sur le même réplica" 'sort == [0, 4]' "$STATS"
+
+# Test 4: Index vectoriel, 503 sans repli quand le réplica propriétaire est arrêté
+echo ""
+echo "4. Test d'un index dont le réplica est arrêté..."
+curl -sf -o /dev/null -H "Content-Type: application/json" -H "X-Admin-Token: secret" \
+    -d '{"texts": ["premier chunk", "second chunk", "chunk retiré"], "index": "notebook_gw", "ids": ["c1", "c2", "c9"]}' "$EMBED_GATEWAY/embed"
+OWNER=$(curl -s "$EMBED_GATEWAY/index" | jq -r '.indexes[] | select(.name == "notebook_gw") | .replica')
+echo "Réplica propriétaire: $OWNER"
+SEARCH='{"query": "premier chunk", "index": "notebook_gw", "k": 1}'
+check "Recherche sur le propriétaire" '.ids == ["c1"]' "$(curl -s -H "Content-Type: application/json" -d "$SEARCH" "$EMBED_GATEWAY/search")"
+CODE=$(curl -s -o /dev/null -w '%{http_code}' -H "Content-Type: application/json" -d '{"ids": ["c9"]}' "$EMBED_GATEWAY/index/notebook_gw/remove")
+[ "$CODE" == "403" ] && echo "✅ Retrait sans jeton refusé" || { echo "❌ Retrait sans jeton: $CODE au lieu de 403"; exit 1; }
+check "Jeton transmis au propriétaire pour le retrait" '.removed == 1 and .items == 2' \
+    "$(curl -s -H "Content-Type: application/json" -H "X-Admin-Token: secret" -d '{"ids": ["c9"]}' "$EMBED_GATEWAY/index/notebook_gw/remove")"
+
+stop_service "${REPLICA_PIDS[$OWNER]}"
+for endpoint in search "index/notebook_gw/remove" embed; do
+    case "$endpoint" in
+        search) BODY="$SEARCH" ;;
+        embed) BODY='{"texts": ["troisième chunk"], "index": "notebook_gw", "ids": ["c3"]}' ;;
+        *) BODY='{"ids": ["c1"]}' ;;
+    esac
+    CODE=$(curl -s -o /dev/null -w '%{http_code}' -H "Content-Type: application/json" -H "X-Admin-Token: secret" -d "$BODY" "$EMBED_GATEWAY/$endpoint")
+    if [ "$CODE" == "503" ]; then
+        echo "✅ /$endpoint: 503 sans repli"
+    else
+        echo "❌ /$endpoint: $CODE au lieu de 503"
+        exit 1
+    fi
+done
+sleep 1.5
+CODE=$(curl -s -o /dev/null -w '%{http_code}' -H "Content-Type: application/json" -d "$SEARCH" "$EMBED_GATEWAY/search")
+INDEXES=$(curl -s "$EMBED_GATEWAY/index")
+if [ "$CODE" == "503" ] && echo "$INDEXES" | jq -e '[.indexes[] | select(.name == "notebook_gw")] | length == 0' > /dev/null; then
+    echo "✅ Toujours 503 après éjection, index créé sur aucun autre réplica"
+else
+    echo "❌ Repli sur un autre réplica ($CODE, $INDEXES)"
+    exit 1
+fi
+check "Embeddings sans index toujours servis" '.vectors | length == 1' \
+    "$(curl -s -H "Content-Type: application/json" -d '{"texts": ["texte libre"]}' "$EMBED_GATEWAY/embed")"
+
+# Test 5: /admin/model diffusé à tous les réplicas, échecs et divergence signalés
+echo ""
+echo "5. Test de la diffusion de /admin/model..."
+RESPONSE=$(curl -s -w '\n%{http_code}' -H "Content-Type: application/json" -H "X-Admin-Token: secret" -d '{"model_name": "mock-embedder-v2"}' "$EMBED_GATEWAY/admin/model")
+CODE=$(echo "$RESPONSE" | tail -n 1)
+RESPONSE=$(echo "$RESPONSE" | head -n 1)
+check "Réplica arrêté signalé en échec" "(.failed == [\"$OWNER\"]) and (.replicas | length == 3)" "$RESPONSE"
+[ "$CODE" == "502" ] && echo "✅ Statut 502" || { echo "❌ Statut $CODE au lieu de 502"; exit 1; }
+
+sleep 1
+STATUS=$(curl -s -H "X-Admin-Token: secret" "$EMBED_GATEWAY/admin/model")
+echo "Modèles: $(echo "$STATUS" | jq -c '.models')"
+check "Divergence des réplicas signalée" \
+    "(.consistent == false) and (.models[\"mock-embedder-v2\"] | length == 2) and (.models[\"indisponible\"] == [\"$OWNER\"])" "$STATUS"
+
+# Test 6: Corps illisibles ou qui ne sont pas des objets: 422 sans toucher aux réplicas
+echo ""
+echo "6. Test des corps invalides..."
+for target in "$EMBED_GATEWAY/embed" "$EMBED_GATEWAY/search" "$EMBED_GATEWAY/index/docs/remove" "$EMBED_GATEWAY/admin/model" \
+        "$RERANK_GATEWAY/rerank" "$RERANK_GATEWAY/rerank/multi"; do
+    for body in '{"texts": [' '["texte"]'; do
+        RESPONSE=$(curl -s -w '\n%{http_code}' -H "Content-Type: application/json" -H "X-Admin-Token: secret" -d "$body" "$target")
+        CODE=$(echo "$RESPONSE" | tail -n 1)
+        if [ "$CODE" != "422" ] || ! echo "$RESPONSE" | head -n 1 | jq -e '.detail | type == "string"' > /dev/null; then
+            echo "❌ Corps invalide $body sur $target: statut $CODE au lieu de 422"
+            exit 1
+        fi
+    done
+done
+echo "✅ Corps invalides refusés en 422 sur toutes les routes"
+
+# Test 7: Sans GATEWAY_REPLICAS, le réplica par défaut correspond au service
+echo ""
+echo "7. Test du réplica par défaut..."
+for service in embedder reranker; do
+    port=$(free_port)
+    launch_service gateway "$port" GATEWAY_SERVICE=$service
+    wait_listening "http://127.0.0.1:$port"
+    stop_service "$LAST_SERVICE_PID"
+done
+EXPECTED_EMBEDDER="devant 1 réplicas: http://embedder:8000"
+EXPECTED_RERANKER="devant 1 réplicas: http://reranker:8001"
+if grep -qh "$EXPECTED_EMBEDDER" "$SERVICE_LOGDIR"/gateway-*.log && grep -qh "$EXPECTED_RERANKER" "$SERVICE_LOGDIR"/gateway-*.log; then
+    echo "✅ Réplicas par défaut: embedder:8000 et reranker:8001"
+else
+    echo "❌ Réplica par défaut failed"
+    exit 1
+fi
+
+echo ""
+echo "🎉 Tous les tests de la passerelle sont passés !"
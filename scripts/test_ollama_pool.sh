@@ -0,0 +1,167 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Test du pool Ollama (ollama_pool.py) contre de petits serveurs HTTP locaux qui imitent
+# l'API Ollama: couverture d'un serveur bloqué, disjoncteurs, puis l'embedder complet
+# (EMBED_ENGINE=ollama) devant un serveur sain et un serveur en erreur
+source "$(dirname "$0")/lib_services.sh"
+
+EMBED_PORT=$(free_port)
+EMBEDDER_URL="http://127.0.0.1:$EMBED_PORT"
+STUB_OK_PORT=$(free_port)
+STUB_FAIL_PORT=$(free_port)
+
+# Serveur imitant Ollama: /api/tags, /api/embeddings (vecteur stable par texte, 404 pour un
+# modèle inconnu), avec un mode par serveur modifiable à chaud: ok, stall (1s) ou fail (500)
+cat > "$SERVICE_LOGDIR/ollama_stub.py" <<'PY'
+import json
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.reply(200, {"models": [{"name": "nomic-embed-text:latest"}]})
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.calls += 1
+        if self.server.mode == "fail":
+            return self.reply(500, {"error": "panne"})
+        time.sleep(1.0 if self.server.mode == "stall" else 0.005)
+        if payload.get("model") == "inconnu":
+            return self.reply(404, {"error": "model not found"})
+        rng = np.random.default_rng(zlib.crc32(payload["prompt"].encode()))
+        self.reply(200, {"embedding": rng.standard_normal(16).tolist()})
+
+
+def start(port=0, mode="ok"):
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.mode = mode
+    server.calls = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    return server
+
+
+if __name__ == "__main__":
+    servers = [start(int(port), mode) for port, mode in (arg.split(":") for arg in sys.argv[1:])]
+    threading.Event().wait()
+PY
+
+echo "Test du pool Ollama"
+echo "==================="
+echo ""
+
+PYTHONPATH="$REPO_ROOT/embedder:$SERVICE_LOGDIR" python3 - <<'PY'
+import sys
+import time
+
+from ollama_pool import OllamaPool, OllamaUnavailable
+import ollama_stub
+
+
+def check(description, condition):
+    if not condition:
+        print(f"❌ {description} failed")
+        sys.exit(1)
+    print(f"✅ {description}")
+
+
+def embed(pool, text="texte", model="nomic-embed-text:latest"):
+    return pool.post("/api/embeddings", {"model": model, "prompt": text})
+
+
+# Test 1: Couverture, un serveur qui se bloque ne retient pas la requête au-delà du seuil
+print("1. Test de la couverture d'un serveur bloqué...")
+a, b = ollama_stub.start(), ollama_stub.start()
+pool = OllamaPool([a.url, b.url], timeout=5, hedge_min_ms=20, hedge_min_samples=20)
+for i in range(30):
+    embed(pool, f"préchauffage {i}")
+check("Seuil de couverture établi après 20 appels", pool.hedge_delay_s() is not None)
+
+a.mode = "stall"
+slow = next(endpoint for endpoint in pool.endpoints if endpoint.url == a.url)
+fast = next(endpoint for endpoint in pool.endpoints if endpoint.url == b.url)
+slow.ewma_ms, fast.ewma_ms = 1.0, 10.0  # le serveur bloqué reste le premier choix
+start = time.perf_counter()
+response = embed(pool, "requête couverte")
+elapsed_ms = (time.perf_counter() - start) * 1000
+print(f"Latence avec un serveur bloqué 1s: {elapsed_ms:.0f}ms (seuil: {pool.hedge_delay_s() * 1000:.0f}ms)")
+check("Réponse de la copie avant la fin du blocage", response.status_code == 200 and elapsed_ms < 500)
+check("Copie envoyée au second serveur et gagnante", fast.hedges == 1 and fast.hedges_won == 1)
+pool.close()
+
+# Test 2: Disjoncteur ouvert après N échecs, reprise sur l'autre serveur sans erreur pour l'appelant
+print("")
+print("2. Test du disjoncteur...")
+a, b = ollama_stub.start(mode="fail"), ollama_stub.start()
+pool = OllamaPool([a.url, b.url], timeout=5, breaker_failures=3, breaker_cooldown_s=0.5)
+failing = pool.endpoints[0]
+codes = [embed(pool, f"texte {i}").status_code for i in range(10)]
+check("Toutes les requêtes servies par le serveur sain", codes == [200] * 10)
+check("Disjoncteur ouvert après 3 échecs, serveur en panne écarté ensuite",
+      failing.breaker.state == "open" and failing.errors == 3 and a.calls == 3)
+
+# Après le refroidissement, un seul appel d'essai; en échec, le disjoncteur se rouvre aussitôt
+time.sleep(0.6)
+embed(pool)
+check("Appel d'essai en échec, disjoncteur rouvert", failing.breaker.state == "open" and failing.breaker.trips == 2 and a.calls == 4)
+
+# Serveur rétabli: l'appel d'essai réussi referme le disjoncteur
+a.mode = "ok"
+time.sleep(0.6)
+embed(pool)
+check("Appel d'essai réussi, disjoncteur refermé", failing.breaker.state == "closed" and a.calls == 5)
+
+# Test 3: 4xx rendues à l'appelant sans compter comme échec, 5xx partout -> OllamaUnavailable
+print("")
+print("3. Test des erreurs...")
+response = embed(pool, model="inconnu")
+check("404 rendue telle quelle", response.status_code == 404)
+check("404 sans effet sur les disjoncteurs", all(endpoint.breaker.failures == 0 for endpoint in pool.endpoints))
+
+a.mode = b.mode = "fail"
+try:
+    embed(pool)
+    check("OllamaUnavailable quand tous les serveurs échouent", False)
+except OllamaUnavailable as e:
+    check("OllamaUnavailable quand tous les serveurs échouent", "HTTP 500" in str(e))
+pool.close()
+PY
+
+# Test 4: Embedder complet devant un serveur sain et un serveur en panne
+echo ""
+echo "4. Test de l'embedder devant un serveur en panne..."
+PYTHONPATH="$SERVICE_LOGDIR" python3 "$SERVICE_LOGDIR/ollama_stub.py" "$STUB_OK_PORT:ok" "$STUB_FAIL_PORT:fail" &
+SERVICE_PIDS+=($!)
+start_service embedder "$EMBED_PORT" EMBED_ENGINE=ollama OLLAMA_TIMEOUT=5 OLLAMA_BREAKER_FAILURES=2 \
+    OLLAMA_URLS="http://127.0.0.1:$STUB_FAIL_PORT,http://127.0.0.1:$STUB_OK_PORT"
+TEXTS=$(jq -cn '[range(8) | "texte \(.)"]')
+RESPONSE=$(curl -s -H "Content-Type: application/json" -d "{\"texts\": $TEXTS}" "$EMBEDDER_URL/embed")
+check "Lot servi malgré le serveur en panne" '(.vectors | length == 8) and (.vectors[0] | length == 16)' "$RESPONSE"
+INFO=$(curl -s "$EMBEDDER_URL/info")
+echo "Endpoints: $(echo "$INFO" | jq -c '[.ollama.endpoints[] | {url, state, errors}]')"
+# Deux appels simultanés par lot (un par serveur): un appel déjà parti peut échouer après l'ouverture
+check "Disjoncteur du serveur en panne ouvert dans /info, serveur écarté du reste du lot" \
+    "(.ollama.endpoints[] | select(.url == \"http://127.0.0.1:$STUB_FAIL_PORT\") | .state == \"open\" and .trips == 1 and .errors < 8)" "$INFO"
+
+echo ""
+echo "🎉 Tous les tests du pool Ollama sont passés !"
@@ -0,0 +1,86 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Test du pipeline par étapes de l'embedder (embedder/pipeline.py) avec des étapes
+# qui attendent sans tenir le GIL, comme les opérations torch et la tokenisation rapide
+cd "$(dirname "$0")/.."
+
+echo "Test du pipeline par étapes"
+echo "==========================="
+echo ""
+
+PYTHONPATH=embedder python3 - <<'PY'
+import sys
+import threading
+import time
+from pipeline import StagedPipeline
+
+STAGE_S = 0.05
+BATCHES = 8
+
+
+def check(description, condition):
+    if not condition:
+        print(f"❌ {description} failed")
+        sys.exit(1)
+    print(f"✅ {description}")
+
+
+def stage(tag):
+    def run(payload):
+        time.sleep(STAGE_S)
+        if payload == "erreur" and tag == "forward":
+            raise ValueError("batch invalide")
+        return payload if payload == "erreur" else payload + [tag]
+    return run
+
+
+pipeline = StagedPipeline([(name, stage(name)) for name in ("tokenize", "forward", "normalize")], queue_size=2)
+
+# Test 1: Résultats dans l'ordre, chaque batch traversant toutes les étapes
+start = time.perf_counter()
+outputs, durations = pipeline.run([[i] for i in range(BATCHES)])
+elapsed = time.perf_counter() - start
+check("Résultats dans l'ordre d'entrée", outputs == [[i, "tokenize", "forward", "normalize"] for i in range(BATCHES)])
+check("Durées par étape pour chaque batch", all(set(d) == {"tokenize", "forward", "normalize"} for d in durations))
+
+# Test 2: Les étapes se chevauchent (séquentiel: 3 * 8 * 50ms = 1.2s, pipeline: (8 + 2) * 50ms = 0.5s)
+sequential = 3 * BATCHES * STAGE_S
+print(f"Durée: {elapsed:.2f}s (séquentiel: {sequential:.2f}s)")
+check("Étapes exécutées en parallèle", elapsed < 0.75 * sequential)
+
+# Test 3: Appels concurrents, chacun récupère ses propres batches
+results = {}
+
+def caller(name):
+    results[name] = pipeline.run([[f"{name}-{i}"] for i in range(3)])[0]
+
+threads = [threading.Thread(target=caller, args=(name,)) for name in ("a", "b")]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+check("Appels concurrents séparés",
+      all(results[name] == [[f"{name}-{i}", "tokenize", "forward", "normalize"] for i in range(3)] for name in ("a", "b")))
+
+# Test 4: Une erreur d'étape remonte à l'appelant sans bloquer le pipeline
+try:
+    pipeline.run([[0], "erreur", [2]])
+    check("Erreur propagée", False)
+except ValueError as e:
+    check(f"Erreur propagée ({e})", True)
+check("Pipeline toujours utilisable après une erreur", pipeline.run([[9]])[0] == [[9, "tokenize", "forward", "normalize"]])
+
+# Test 5: Occupation par étape
+occupancy = pipeline.occupancy()
+print(f"Occupation: {occupancy}")
+check("Batches et erreurs comptés par étape",
+      occupancy["tokenize"]["batches"] == BATCHES + 10 and occupancy["forward"]["errors"] == 1
+      and occupancy["normalize"]["batches"] == BATCHES + 9)
+
+pipeline.close()
+check("Threads arrêtés", not any(thread.is_alive() for thread in pipeline.threads))
+PY
+
+echo ""
+echo "🎉 Tous les tests du pipeline sont passés !"
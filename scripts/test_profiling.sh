@@ -0,0 +1,100 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Test de l'en-tête Server-Timing et du profilage à la demande (embedder et reranker)
+# avec les moteurs de test, sans Docker
+source "$(dirname "$0")/lib_services.sh"
+
+EMBED_PORT=$(free_port)
+RERANK_PORT=$(free_port)
+EMBEDDER_URL="http://127.0.0.1:$EMBED_PORT"
+RERANKER_URL="http://127.0.0.1:$RERANK_PORT"
+
+echo "Test du profilage et de Server-Timing"
+echo "====================================="
+
+echo ""
+echo "Démarrage des services (moteurs de test)..."
+start_service embedder "$EMBED_PORT" EMBED_ENGINE=mock SERVER_TIMING_ENABLED=true ADMIN_TOKEN=secret
+start_service reranker "$RERANK_PORT" RERANKER_ENGINE=mock SERVER_TIMING_ENABLED=true ADMIN_TOKEN=secret
+echo "✅ Services démarrés"
+
+# Durées Server-Timing d'une réponse, sous forme d'objet {étape: [durées]}
+server_timing() {
+    grep -i '^server-timing:' "$1" | cut -d: -f2- | tr ',' '\n' \
+        | sed -E 's/^ *([a-z_]+);dur=([0-9.]+).*/{"\1": \2}/' \
+        | jq -cs 'map(to_entries[0]) | group_by(.key) | map({key: .[0].key, value: map(.value)}) | from_entries'
+}
+
+# Test 1: Server-Timing sur /embed (une seule entrée serialize, somme des étapes <= total)
+echo ""
+echo "1. Test Server-Timing /embed..."
+HEADERS=$(mktemp)
+BODY=$(curl -s -D "$HEADERS" -H "Content-Type: application/json" \
+    -d '{"texts": ["Bonjour le monde", "Hello world"]}' "$EMBEDDER_URL/embed")
+TIMING=$(server_timing "$HEADERS")
+echo "Server-Timing: $TIMING"
+
+check "Une seule étape serialize" '.serialize | length == 1' "$TIMING"
+check "Somme des étapes <= total" '(to_entries | map(select(.key != "total") | .value | add) | add) <= (.total[0] + 0.1)' "$TIMING"
+check "Réponse conforme à EmbedResponse" '(.vectors | length == 2) and (.dim | type == "number") and (keys == ["dim", "model", "processing_time_ms", "vectors"])' "$BODY"
+
+# Test 2: Server-Timing sur /rerank (champs optionnels absents quand ils ne servent pas)
+echo ""
+echo "2. Test Server-Timing /rerank..."
+BODY=$(curl -s -D "$HEADERS" -H "Content-Type: application/json" \
+    -d '{"query": "chat noir", "candidates": ["un chat noir", "un chien blanc"], "dedup": false}' "$RERANKER_URL/rerank")
+TIMING=$(server_timing "$HEADERS")
+echo "Server-Timing: $TIMING"
+
+check "Une seule étape serialize" '.serialize | length == 1' "$TIMING"
+check "Réponse conforme à RerankResponse" '(.scores | length == 2) and (has("groups") | not) and (.scores[0] > .scores[1])' "$BODY"
+rm -f "$HEADERS"
+
+# Test 3: Endpoints d'administration protégés par ADMIN_TOKEN
+echo ""
+echo "3. Test protection /admin/profile..."
+CODE=$(curl -s -o /dev/null -w '%{http_code}' "$EMBEDDER_URL/admin/profile")
+if [ "$CODE" == "401" ] || [ "$CODE" == "403" ]; then
+    echo "✅ Requête sans jeton refusée ($CODE)"
+else
+    echo "❌ Requête sans jeton acceptée ($CODE)"
+    exit 1
+fi
+
+# Test 4: Capture bornée en nombre de requêtes puis téléchargement de l'artefact. Chaque requête
+# porte assez de candidats pour durer plusieurs intervalles d'échantillonnage
+echo ""
+echo "4. Test capture de profil CPU sur 3 requêtes..."
+STATUS=$(curl -s -H "X-Admin-Token: secret" -H "Content-Type: application/json" \
+    -d '{"mode": "cpu", "requests": 3, "interval_ms": 1}' "$RERANKER_URL/admin/profile")
+check "Capture démarrée" '.active == true and .mode == "cpu"' "$STATUS"
+
+for i in 1 2 3; do
+    jq -cn --arg query "requête $i" '{query: $query, candidates: [range(64) | "texte \(.) autre mot " * 1000]}' \
+        | curl -s -H "Content-Type: application/json" -d @- "$RERANKER_URL/rerank" > /dev/null
+done
+
+STATUS=$(curl -s -H "X-Admin-Token: secret" "$RERANKER_URL/admin/profile")
+echo "État: $(echo "$STATUS" | jq -c '{active, requests_seen, samples_taken, artifact_bytes}')"
+check "Capture terminée après 3 requêtes, piles échantillonnées" \
+    '.active == false and .requests_seen == 3 and .samples_taken > 0 and .artifact_bytes > 1' "$STATUS"
+
+ARTIFACT=$(mktemp)
+CODE=$(curl -s -o "$ARTIFACT" -w '%{http_code}' -H "X-Admin-Token: secret" "$RERANKER_URL/admin/profile/artifact")
+echo "Pile la plus fréquente: $(head -n 1 "$ARTIFACT" | tr ';' '\n' | tail -n 2 | tr '\n' ' ')"
+# Format folded: "thread;fonction (fichier:ligne);... nombre", une pile par ligne
+if [ "$CODE" == "200" ] && grep -Evq '^[^;]+(;[^;]+ \([^:]+:[0-9]+\))+ [0-9]+$' "$ARTIFACT"; then
+    echo "❌ Artefact mal formé ($CODE):"
+    head -n 5 "$ARTIFACT"
+    exit 1
+elif [ "$CODE" == "200" ] && grep -Eq ' \((app|engines)\.py:[0-9]+\)' "$ARTIFACT"; then
+    echo "✅ Artefact folded téléchargé, piles du reranker présentes"
+else
+    echo "❌ Téléchargement de l'artefact failed ($CODE) ou pile du reranker absente"
+    exit 1
+fi
+rm -f "$ARTIFACT"
+
+echo ""
+echo "🎉 Tous les tests de profilage sont passés !"
@@ -0,0 +1,65 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Test de /rerank/multi avec le moteur de test du reranker (scores fondés sur les mots communs)
+source "$(dirname "$0")/lib_services.sh"
+
+RERANK_PORT=$(free_port)
+RERANKER_URL="http://127.0.0.1:$RERANK_PORT"
+
+echo "Test de /rerank/multi"
+echo "====================="
+
+echo ""
+echo "Démarrage du reranker (moteur de test)..."
+start_service reranker "$RERANK_PORT" RERANKER_ENGINE=mock MULTI_MAX_GROUPS=4
+echo "✅ Reranker démarré"
+
+# Test 1: Un tableau de scores par groupe, dans l'ordre des candidats
+echo ""
+echo "1. Test de plusieurs groupes en un appel..."
+RESPONSE=$(curl -s -H "Content-Type: application/json" -d '{
+    "groups": [
+        {"query": "chat noir", "candidates": ["un oiseau bleu", "le chat noir dort", "une voiture"]},
+        {"query": "base de données", "candidates": ["index de la base de données", "recette de cuisine"]},
+        {"query": "gare", "candidates": ["", "la gare du nord"]}
+    ]
+}' "$RERANKER_URL/rerank/multi")
+echo "Réponse: $RESPONSE"
+
+check "Un tableau de scores par groupe" '.scores | map(length) == [3, 2, 2]' "$RESPONSE"
+check "Scores dans [0, 1]" '[.scores[][] | select(. < 0 or . > 1)] | length == 0' "$RESPONSE"
+check "Candidat pertinent en tête dans chaque groupe" \
+    '(.scores[0][1] > .scores[0][0]) and (.scores[0][1] > .scores[0][2]) and (.scores[1][0] > .scores[1][1]) and (.scores[2][1] > .scores[2][0])' "$RESPONSE"
+check "Candidat vide noté 0" '.scores[2][0] == 0' "$RESPONSE"
+
+# Test 2: Mêmes scores que /rerank pour un groupe donné
+echo ""
+echo "2. Test de cohérence avec /rerank..."
+SINGLE=$(curl -s -H "Content-Type: application/json" \
+    -d '{"query": "base de données", "candidates": ["index de la base de données", "recette de cuisine"]}' \
+    "$RERANKER_URL/rerank")
+check "Scores identiques à /rerank" "(.scores == $(echo "$RESPONSE" | jq -c '.scores[1]'))" "$SINGLE"
+
+# Test 3: Validation
+echo ""
+echo "3. Test de validation..."
+CODE=$(curl -s -o /dev/null -w '%{http_code}' -H "Content-Type: application/json" -d '{"groups": []}' "$RERANKER_URL/rerank/multi")
+if [ "$CODE" == "400" ]; then
+    echo "✅ Liste de groupes vide refusée"
+else
+    echo "❌ Liste de groupes vide acceptée ($CODE)"
+    exit 1
+fi
+
+GROUPS_JSON=$(jq -cn '{groups: [range(5) | {query: "q", candidates: ["c"]}]}')
+CODE=$(curl -s -o /dev/null -w '%{http_code}' -H "Content-Type: application/json" -d "$GROUPS_JSON" "$RERANKER_URL/rerank/multi")
+if [ "$CODE" == "400" ]; then
+    echo "✅ Trop de groupes refusé (MULTI_MAX_GROUPS=4)"
+else
+    echo "❌ Trop de groupes accepté ($CODE)"
+    exit 1
+fi
+
+echo ""
+echo "🎉 Tous les tests de /rerank/multi sont passés !"
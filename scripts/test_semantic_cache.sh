@@ -0,0 +1,77 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Test du cache sémantique du reranker avec le moteur de test: succès au-dessus du seuil de
+# similarité, absence en dessous, candidats différents, variante dédoublonnée et changement de modèle
+source "$(dirname "$0")/lib_services.sh"
+
+RERANK_PORT=$(free_port)
+RERANKER_URL="http://127.0.0.1:$RERANK_PORT"
+
+echo "Test du cache sémantique"
+echo "========================"
+
+echo ""
+echo "Démarrage du reranker (moteur de test, SEMANTIC_CACHE_THRESHOLD=0.95)..."
+start_service reranker "$RERANK_PORT" RERANKER_ENGINE=mock SEMANTIC_CACHE_THRESHOLD=0.95
+echo "✅ Reranker démarré"
+
+CHUNK="la recherche vectorielle retrouve les passages proches de la question puis le reranker les réordonne selon leur pertinence réelle pour produire un contexte compact et fiable"
+CANDIDATES=$(jq -cn --arg chunk "$CHUNK" '[$chunk, ($chunk + " final"), "une recette de tarte aux pommes", "les index ivfflat partitionnent les vecteurs"]')
+
+# rerank <requête> <vecteur> [candidats] [dedup]
+rerank() {
+    curl -s -H "Content-Type: application/json" \
+        -d "$(jq -cn --arg query "$1" --argjson vector "$2" --argjson candidates "${3:-$CANDIDATES}" --argjson dedup "${4:-false}" \
+            '{query: $query, query_vector: $vector, candidates: $candidates, dedup: $dedup}')" \
+        "$RERANKER_URL/rerank"
+}
+
+# Test 1: Reformulation au-dessus du seuil (cosinus 0.995): scores en cache
+echo ""
+echo "1. Test d'un succès au-dessus du seuil..."
+FIRST=$(rerank "qu'est-ce que la recherche vectorielle" '[1, 0, 0, 0]')
+check "Première requête calculée" '.semantic_cache_similarity == null and (.scores | length == 4)' "$FIRST"
+SECOND=$(rerank "recherche vectorielle, définition" '[1, 0.1, 0, 0]')
+check "Reformulation servie par le cache" \
+    "(.semantic_cache_similarity > 0.99) and (.scores == $(echo "$FIRST" | jq -c '.scores'))" "$SECOND"
+
+# Test 2: Requête sous le seuil (cosinus 0.707)
+echo ""
+echo "2. Test d'une absence sous le seuil..."
+check "Requête éloignée recalculée" '.semantic_cache_similarity == null' "$(rerank "comment indexer des vecteurs" '[1, 1, 0, 0]')"
+
+# Test 3: Candidats différents: un candidat absent de l'entrée empêche le succès
+echo ""
+echo "3. Test de candidats différents..."
+OTHER=$(echo "$CANDIDATES" | jq -c '. + ["hnsw est un graphe de proximité"]')
+check "Candidat supplémentaire: recalcul" '.semantic_cache_similarity == null' "$(rerank "recherche vectorielle" '[1, 0.05, 0, 0]' "$OTHER")"
+
+# Test 4: Variante dédoublonnée: entrée distincte, groupes renvoyés aussi sur un succès
+echo ""
+echo "4. Test de la variante dédoublonnée..."
+DEDUP=$(rerank "recherche vectorielle" '[0, 0, 1, 0]' "$CANDIDATES" true)
+check "Variante dédoublonnée recalculée, doublons regroupés" '.semantic_cache_similarity == null and .groups == [[0, 1], [2], [3]]' "$DEDUP"
+check "Variante non dédoublonnée: pas de succès sur l'entrée dédoublonnée" \
+    '.semantic_cache_similarity == null' "$(rerank "recherche vectorielle" '[0, 0, 1, 0.1]')"
+check "Succès dédoublonné avec les groupes" \
+    "(.semantic_cache_similarity > 0.99) and .groups == [[0, 1], [2], [3]] and (.scores == $(echo "$DEDUP" | jq -c '.scores'))" \
+    "$(rerank "la recherche vectorielle" '[0, 0, 1, 0.05]' "$CANDIDATES" true)"
+
+# Test 5: Changement de modèle: les entrées de l'ancien modèle ne servent plus
+echo ""
+echo "5. Test après un changement de modèle..."
+curl -sf -o /dev/null -H "Content-Type: application/json" -d '{"model_name": "mock-reranker-v2"}' "$RERANKER_URL/admin/model"
+for _ in $(seq 1 40); do
+    [ "$(curl -s "$RERANKER_URL/info" | jq -r '.model_name')" == "mock-reranker-v2" ] && break
+    sleep 0.25
+done
+RESPONSE=$(rerank "qu'est-ce que la recherche vectorielle" '[1, 0, 0, 0]')
+check "Même requête recalculée par le nouveau modèle" '.semantic_cache_similarity == null and .model == "mock-reranker-v2"' "$RESPONSE"
+
+METRICS=$(curl -s "$RERANKER_URL/metrics" | jq -c '.semantic_cache')
+echo "Cache sémantique: $(echo "$METRICS" | jq -c '{hits, misses, entries}')"
+check "Succès et absences comptés" '.hits == 2 and .misses == 6' "$METRICS"
+
+echo ""
+echo "🎉 Tous les tests du cache sémantique sont passés !"